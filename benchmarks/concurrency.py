@@ -0,0 +1,97 @@
+"""
+Compare how the WSGI and ASGI deployments hold up with many concurrent, slow clients.
+
+Every client trickles its request (the request line, then the headers after --client-delay seconds), which keeps a
+connection open on the server the way slow mobile clients do, and then waits for the full response.
+
+Usage:
+    python benchmarks/concurrency.py --url wsgi=http://localhost:8000/api/quote/?rental_property=1&... \
+        --url asgi=http://localhost:8001/api/async/quote/?rental_property=1&... --concurrency 10 100 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+
+class LevelResult(NamedTuple):
+    name: str
+    concurrency: int
+    requests: int
+    errors: int
+    requests_per_second: float
+    p50_ms: float
+    p95_ms: float
+
+
+async def fetch(url: str, client_delay: float, timeout: float) -> float:
+    """Time a GET request, in seconds. Raises on connection errors and non 2xx answers."""
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    started = time.perf_counter()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(parts.hostname, parts.port or 80), timeout)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\n'.encode())
+        await writer.drain()
+        await asyncio.sleep(client_delay)
+        writer.write(f'Host: {parts.netloc}\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    status = response.split(b' ', 2)[1] if response else b'000'
+    if not status.startswith(b'2'):
+        raise ValueError(f'HTTP {status.decode()}')
+    return time.perf_counter() - started
+
+
+async def run_level(name: str, url: str, concurrency: int, duration: float, client_delay: float,
+                    timeout: float) -> LevelResult:
+    """Keep concurrency clients requesting url in a loop for duration seconds."""
+    latencies = list()
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            try:
+                latencies.append(await fetch(url=url, client_delay=client_delay, timeout=timeout))
+            except (OSError, ValueError, asyncio.TimeoutError):
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=20) if len(latencies) > 1 else [0.0] * 19
+    return LevelResult(name=name, concurrency=concurrency, requests=len(latencies), errors=errors,
+                       requests_per_second=len(latencies) / elapsed, p50_ms=statistics.median(latencies or [0]) * 1000,
+                       p95_ms=quantiles[18] * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', action='append', required=True, metavar='NAME=URL',
+                        help='Endpoint to be measured, can be repeated (e.g. the WSGI and the ASGI one).')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per concurrency level.')
+    parser.add_argument('--client-delay', type=float, default=0.5,
+                        help='Seconds each client waits between the request line and the headers.')
+    parser.add_argument('--timeout', type=float, default=30)
+    args = parser.parse_args()
+
+    print(f'{"name":<8}{"clients":>8}{"requests":>10}{"errors":>8}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}')
+    for concurrency in args.concurrency:
+        for target in args.url:
+            name, _, url = target.partition('=')
+            result = asyncio.run(run_level(name=name, url=url, concurrency=concurrency, duration=args.duration,
+                                           client_delay=args.client_delay, timeout=args.timeout))
+            print(f'{result.name:<8}{result.concurrency:>8}{result.requests:>10}{result.errors:>8}'
+                  f'{result.requests_per_second:>10.1f}{result.p50_ms:>10.1f}{result.p95_ms:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
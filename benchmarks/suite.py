@@ -0,0 +1,205 @@
+"""
+Pricing and availability benchmark suite, compared against stored baselines.
+
+Every case runs on synthetic data in a throwaway test database, over a grid of rules per property, stay length
+and bookings per property. The best time per call is compared with benchmarks/baselines.json, and the run fails
+when a case is slower than its baseline by more than --threshold. Baselines depend on the machine, record them
+on the machine that runs the check with --update-baselines.
+
+Usage:
+    DJANGO_SETTINGS_MODULE=settings.production SECRET_KEY=... python benchmarks/suite.py [--quick]
+        [--threshold 0.25] [--only apply_rules] [--update-baselines]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import date, timedelta
+from itertools import product
+from pathlib import Path
+from typing import Callable, Iterator, NamedTuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings.local')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from core.booking_helpers.availability import check_availability  # noqa: E402
+from core.booking_helpers.dates import date_range  # noqa: E402
+from core.booking_helpers.occupancy import occupancy_cache  # noqa: E402
+from core.booking_helpers.pricing_rules import apply_rules, get_rules_to_apply  # noqa: E402
+from core.booking_helpers.rule_index import PricingRuleIndex  # noqa: E402
+from core.models import Booking, PricingRule, RentalProperty  # noqa: E402
+
+BASELINES_PATH = Path(__file__).resolve().parent / 'baselines.json'
+FIRST_DAY = date(date.today().year + 1, 1, 1)
+"""FIRST_DAY: Start of the synthetic rules and of the posted bookings, in the future as bookings can not start
+in the past."""
+
+RULES_PER_PROPERTY = (10, 100, 1000, 10000)
+STAY_LENGTHS = (1, 7, 30, 365)
+BOOKINGS_PER_PROPERTY = (10, 1000, 100000)
+QUICK_GRID = {'rules': (10, 1000), 'stay': (1, 30), 'bookings': (10, 1000)}
+
+
+class Case(NamedTuple):
+    name: str
+    params: dict
+    run: Callable[[], object]
+
+    @property
+    def key(self) -> str:
+        return self.name + ''.join(f' {param}={value}' for param, value in self.params.items())
+
+
+def make_rules(rental_property_id: int, total_rules: int) -> list[PricingRule]:
+    """Synthetic rule sheet: 80% specific_day rules on consecutive days from FIRST_DAY (a fixed price every
+    third day, a modifier otherwise) and 20% min_stay_length rules, some of them also on a specific_day."""
+    special_days = total_rules * 4 // 5
+    rules = [PricingRule(rental_property_id=rental_property_id, specific_day=FIRST_DAY + timedelta(days=day),
+                         fixed_price=20 if day % 3 == 0 else None, price_modifier=None if day % 3 == 0 else 15)
+             for day in range(special_days)]
+    rules += [PricingRule(rental_property_id=rental_property_id, min_stay_length=1 + position % 365,
+                          price_modifier=-(position % 50),
+                          specific_day=FIRST_DAY + timedelta(days=position) if position % 10 == 0 else None)
+              for position in range(total_rules - special_days)]
+    return rules
+
+
+def make_bookings(rental_property_id: int, total_bookings: int) -> list[Booking]:
+    """One night Bookings every other day, ending the day before FIRST_DAY."""
+    return [Booking(rental_property_id=rental_property_id, final_price=10,
+                    date_start=FIRST_DAY - timedelta(days=2 * position + 1),
+                    date_end=FIRST_DAY - timedelta(days=2 * position + 1))
+            for position in range(total_bookings)]
+
+
+def pricing_cases(rules_grid: tuple, stay_grid: tuple) -> Iterator[Case]:
+    for total_rules, stay_length in product(rules_grid, stay_grid):
+        rule_index = PricingRuleIndex.from_rules(make_rules(rental_property_id=1, total_rules=total_rules))
+        days_list = date_range(date_start=FIRST_DAY, date_end=FIRST_DAY + timedelta(days=stay_length - 1))
+        rules_to_apply = get_rules_to_apply(days_list=days_list, pricing_rules=rule_index)
+        params = {'rules': total_rules, 'stay': stay_length}
+
+        yield Case(name='get_rules_to_apply', params=params,
+                   run=lambda days_list=days_list, rule_index=rule_index: get_rules_to_apply(
+                       days_list=days_list, pricing_rules=rule_index))
+        yield Case(name='apply_rules', params=params,
+                   run=lambda days_list=days_list, rules_to_apply=rules_to_apply: apply_rules(
+                       days_list=days_list, base_price=10, rules_to_apply=rules_to_apply))
+
+
+def availability_cases(bookings_grid: tuple, stay_grid: tuple) -> Iterator[Case]:
+    for rental_property_id, total_bookings in enumerate(bookings_grid, start=100):
+        RentalProperty.objects.create(id=rental_property_id, name=f'Availability {total_bookings}', base_price=10)
+        Booking.objects.bulk_create(make_bookings(rental_property_id=rental_property_id,
+                                                  total_bookings=total_bookings), batch_size=5000)
+        for stay_length in stay_grid:
+            date_end = FIRST_DAY - timedelta(days=1)
+            request_data = {'rental_property': rental_property_id,
+                            'date_start': date_end - timedelta(days=stay_length - 1), 'date_end': date_end}
+            params = {'bookings': total_bookings, 'stay': stay_length}
+
+            def cold(request_data=request_data):
+                occupancy_cache.clear()
+                return check_availability(request_data=request_data)
+
+            yield Case(name='check_availability_cold', params=params, run=cold)
+            yield Case(name='check_availability', params=params,
+                       run=lambda request_data=request_data: check_availability(request_data=request_data))
+
+
+def booking_post_cases(rules_grid: tuple, bookings_grid: tuple) -> Iterator[Case]:
+    client = APIClient()
+    for rental_property_id, (total_rules, total_bookings) in enumerate(product(rules_grid, bookings_grid),
+                                                                       start=200):
+        RentalProperty.objects.create(id=rental_property_id, name=f'Booking {total_rules}', base_price=10)
+        PricingRule.objects.bulk_create(make_rules(rental_property_id=rental_property_id, total_rules=total_rules),
+                                        batch_size=5000)
+        Booking.objects.bulk_create(make_bookings(rental_property_id=rental_property_id,
+                                                  total_bookings=total_bookings), batch_size=5000)
+        next_day = [FIRST_DAY]
+
+        def post(rental_property_id=rental_property_id, next_day=next_day):
+            date_start, next_day[0] = next_day[0], next_day[0] + timedelta(days=7)
+            response = client.post('/api/booking/', {
+                'rental_property': rental_property_id, 'date_start': date_start.strftime('%m-%d-%Y'),
+                'date_end': (date_start + timedelta(days=6)).strftime('%m-%d-%Y')})
+            assert response.status_code == 201, response.content
+            return response
+
+        yield Case(name='booking_post', params={'rules': total_rules, 'bookings': total_bookings}, run=post)
+
+
+def measure(case: Case, min_time: float, repeat: int) -> float:
+    """Best time per call in seconds, each sample running the case for at least min_time seconds."""
+    timer = timeit.Timer(case.run)
+    number = 1
+    while timer.timeit(number) < min_time and number < 100000:
+        number *= 10
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown over the baseline, 0.25 is 25%% slower.')
+    parser.add_argument('--only', action='append', help='Run only the cases with this name, can be repeated.')
+    parser.add_argument('--quick', action='store_true', help='Run the small end of the grid only.')
+    parser.add_argument('--min-time', type=float, default=0.05)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--update-baselines', action='store_true', help='Store the results as the new baselines.')
+    args = parser.parse_args()
+
+    grid = QUICK_GRID if args.quick else {'rules': RULES_PER_PROPERTY, 'stay': STAY_LENGTHS,
+                                          'bookings': BOOKINGS_PER_PROPERTY}
+    baselines = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else dict()
+
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    regressions = list()
+    try:
+        cases = [pricing_cases(rules_grid=grid['rules'], stay_grid=grid['stay']),
+                 availability_cases(bookings_grid=grid['bookings'], stay_grid=grid['stay']),
+                 booking_post_cases(rules_grid=grid['rules'], bookings_grid=grid['bookings'])]
+        print(f'{"case":<58}{"best (us)":>12}{"baseline":>12}{"change":>10}')
+        for case_group in cases:
+            for case in case_group:
+                if args.only and case.name not in args.only:
+                    continue
+                seconds = measure(case=case, min_time=args.min_time, repeat=args.repeat)
+                baseline = baselines.get(case.key)
+                change = ''
+                if baseline:
+                    change = f'{seconds / baseline - 1:+.0%}'
+                    if seconds > baseline * (1 + args.threshold):
+                        regressions.append(case.key)
+                        change += ' !'
+                baseline_us = f'{baseline * 1e6:.1f}' if baseline else '-'
+                print(f'{case.key:<58}{seconds * 1e6:>12.1f}{baseline_us:>12}{change:>10}')
+                baselines[case.key] = seconds if args.update_baselines else baselines.get(case.key)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    if args.update_baselines:
+        BASELINES_PATH.write_text(json.dumps({key: value for key, value in sorted(baselines.items())
+                                              if value is not None}, indent=2) + '\n')
+        print(f'Baselines stored in {BASELINES_PATH}.')
+        return 0
+    if regressions:
+        print(f'{len(regressions)} case(s) slower than their baseline by more than {args.threshold:.0%}:')
+        print('\n'.join(f'    {key}' for key in regressions))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
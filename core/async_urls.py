@@ -0,0 +1,14 @@
+from django.urls import path
+
+from core import async_views
+
+urlpatterns = [
+    path('pricing-rule/', async_views.pricing_rule_list),
+    path('pricing-rule/<int:pk>', async_views.pricing_rule_detail),
+    path('property/', async_views.property_list),
+    path('property/<int:pk>', async_views.property_detail),
+    path('property/<int:pk>/availability', async_views.property_availability),
+    path('booking/', async_views.booking_list),
+    path('booking/<int:pk>', async_views.booking_detail),
+    path('quote/', async_views.quote),
+]
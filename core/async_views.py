@@ -0,0 +1,169 @@
+"""
+Async read endpoints, mounted under api/async/.
+
+They mirror the read side of core.views with the async ORM, so an ASGI deployment serves slow clients from the
+event loop instead of holding a worker thread per connection. DRF views are synchronous, these are plain Django
+async views rendering with the same serializers.
+"""
+from asgiref.sync import sync_to_async
+from django.db.models import Model, QuerySet
+from django.http import HttpRequest, JsonResponse
+from rest_framework import serializers
+
+from core.serializer import BookingSerializer, PricingRuleSerializer, PropertySerializer, StayQuoteSerializer
+from .booking_helpers.availability import get_overlapping_bookings
+from .booking_helpers.dates import date_range
+from .booking_helpers.price_calendar import price_stay
+from .booking_helpers.pricing_cache import aget_pricing_snapshot
+from .booking_helpers.quote_search import StayQuote
+from .filters import BookingFilter
+from .models import Booking, PricingRule, RentalProperty
+from .pagination import IdCursorPagination
+
+
+def bad_request(detail) -> JsonResponse:
+    return JsonResponse({'detail': detail}, status=400)
+
+
+def not_found() -> JsonResponse:
+    return JsonResponse({'detail': 'Not found.'}, status=404)
+
+
+async def get_page(request: HttpRequest, queryset: QuerySet, serializer_class: type) -> JsonResponse:
+    """Keyset page of the queryset in id order: the rows with an id greater than the after parameter.
+    Args:
+        request: The request, with the optional after and page_size parameters.
+        queryset: The (filtered) rows to be listed.
+        serializer_class: Serializer of the rows.
+    Returns:
+        JsonResponse with the results and the url of the next page, null on the last one.
+    """
+    try:
+        after = int(request.GET.get('after', 0))
+        page_size = int(request.GET.get('page_size', IdCursorPagination.page_size))
+    except ValueError:
+        return bad_request('after and page_size must be integers.')
+    if not 0 < page_size <= IdCursorPagination.max_page_size:
+        return bad_request(f'page_size must be between 1 and {IdCursorPagination.max_page_size}.')
+
+    rows = [row async for row in queryset.filter(pk__gt=after).order_by('pk')[:page_size]]
+    next_page = None
+    if len(rows) == page_size:
+        params = request.GET.copy()
+        params['after'] = rows[-1].pk
+        next_page = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    return JsonResponse({'next': next_page, 'results': serializer_class(rows, many=True).data})
+
+
+async def get_detail(model: type[Model], pk: int, serializer_class: type) -> JsonResponse:
+    try:
+        instance = await model.objects.aget(pk=pk)
+    except model.DoesNotExist:
+        return not_found()
+    return JsonResponse(serializer_class(instance).data)
+
+
+async def property_list(request: HttpRequest) -> JsonResponse:
+    """
+        :[GET]:
+    Description: List the Properties, filtered by id and name like PropertyListView.
+    """
+    queryset = RentalProperty.objects.all()
+    if 'name' in request.GET:
+        queryset = queryset.filter(name=request.GET['name'])
+    if 'id' in request.GET:
+        try:
+            queryset = queryset.filter(id=int(request.GET['id']))
+        except ValueError:
+            return bad_request('id must be an integer.')
+    return await get_page(request=request, queryset=queryset, serializer_class=PropertySerializer)
+
+
+async def property_detail(request: HttpRequest, pk: int) -> JsonResponse:
+    return await get_detail(model=RentalProperty, pk=pk, serializer_class=PropertySerializer)
+
+
+async def pricing_rule_list(request: HttpRequest) -> JsonResponse:
+    return await get_page(request=request, queryset=PricingRule.objects.all(),
+                          serializer_class=PricingRuleSerializer)
+
+
+async def pricing_rule_detail(request: HttpRequest, pk: int) -> JsonResponse:
+    return await get_detail(model=PricingRule, pk=pk, serializer_class=PricingRuleSerializer)
+
+
+async def booking_list(request: HttpRequest) -> JsonResponse:
+    """
+        :[GET]:
+    Description: List the Bookings, with the filters of BookingListView.
+    Summary:
+        . The filters are validated in a thread, the rental_property filter looks the property up.
+        . The page is read with the async ORM.
+    """
+    filterset = BookingFilter(data=request.GET, queryset=Booking.objects.all())
+    if not await sync_to_async(filterset.is_valid)():
+        return JsonResponse(filterset.errors, status=400)
+    return await get_page(request=request, queryset=filterset.qs, serializer_class=BookingSerializer)
+
+
+async def booking_detail(request: HttpRequest, pk: int) -> JsonResponse:
+    return await get_detail(model=Booking, pk=pk, serializer_class=BookingSerializer)
+
+
+async def quote(request: HttpRequest) -> JsonResponse:
+    """
+        :[GET]:
+    Description: Same as QuoteView, the pricing snapshot is read from the cache or the database without blocking,
+    the stay is priced from the price calendar in a thread.
+    Parameters:
+        rental_property, date_start, date_end.
+    """
+    params = request.GET
+    try:
+        rental_property_id = int(params['rental_property'])
+        days_list = date_range(date_start=params['date_start'], date_end=params['date_end'])
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return bad_request('rental_property, date_start and date_end are required.')
+    if not days_list:
+        return bad_request('date_end must not be before date_start.')
+
+    try:
+        snapshot = await aget_pricing_snapshot(rental_property_id=rental_property_id)
+    except RentalProperty.DoesNotExist:
+        return not_found()
+    if snapshot.base_price is None:
+        return bad_request('The property has no base_price.')
+
+    final_price = await sync_to_async(price_stay)(rental_property_id=rental_property_id, days_list=days_list,
+                                                  base_price=snapshot.base_price, rule_index=snapshot.rules)
+    stay_quote = StayQuote(date_start=days_list.start, date_end=days_list.end, stay_length=len(days_list),
+                           final_price=final_price)
+    return JsonResponse(StayQuoteSerializer(stay_quote).data)
+
+
+async def property_availability(request: HttpRequest, pk: int) -> JsonResponse:
+    """
+        :[GET]:
+    Description: Same as PropertyAvailabilityView, answered with an indexed overlap query on the async ORM
+    instead of the in-process occupancy bitmaps.
+    Parameters:
+        date_start, date_end.
+    """
+    try:
+        days_list = date_range(date_start=request.GET['date_start'], date_end=request.GET['date_end'])
+    except (KeyError, ValueError, OverflowError):
+        return bad_request('date_start and date_end are required.')
+    if not days_list:
+        return bad_request('date_end must not be before date_start.')
+
+    if not await RentalProperty.objects.filter(pk=pk).aexists():
+        return not_found()
+
+    overlapping = await get_overlapping_bookings(rental_property_id=pk, check_in=days_list.start,
+                                                 check_out=days_list.end).aexists()
+    return JsonResponse({
+        'rental_property': pk,
+        'date_start': serializers.DateField().to_representation(days_list.start),
+        'date_end': serializers.DateField().to_representation(days_list.end),
+        'available': not overlapping,
+    })
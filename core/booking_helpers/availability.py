@@ -1,40 +1,94 @@
-from datetime import datetime
+from datetime import date, timedelta
+from typing import NamedTuple
 
-from dateutil.parser import parse
+from django.db import connections
+from django.db.models import Func, QuerySet
 
 from core.models import Booking
+from .dates import merge_date_intervals, to_date
+from .occupancy import is_available
 
+FREE = 'free'
+BUSY = 'busy'
 
-def check_availability(request_data:Booking) -> bool:
-    """Check that Booking is available for that Property.
-    TODO: REFACTOR WITH LIST OF DAYS APPROACH............. line 15. add filter with dates.
-                                                            if
+
+class BookingDateRange(Func):
+    """PostgreSQL daterange of a Booking, both ends included. Matches the booking_no_overlap constraint."""
+    function = 'DATERANGE'
+    template = "%(function)s(%(expressions)s, '[]')"
+
+
+def get_overlapping_bookings(rental_property_id: int, check_in: date, check_out: date) -> QuerySet:
+    """Bookings of the property sharing at least one day with the check_in - check_out range.
+    On PostgreSQL the overlap is expressed as a daterange so it is answered by the GiST index of the
+    booking_no_overlap exclusion constraint. Other backends use the (rental_property, date_start, date_end) index.
+    Args:
+        rental_property_id: The property to be checked.
+        check_in: First day of the range.
+        check_out: Last day of the range.
+    Returns:
+        QuerySet of the overlapping Bookings.
     """
-    reservations_checked = []
-    check_in = parse(request_data.get('date_start')).date()
-    check_out = parse(request_data.get('date_end')).date()
-    booking_list = Booking.objects.filter(rental_property=request_data.get('rental_property'))
+    bookings = Booking.objects.filter(rental_property=rental_property_id)
+
+    if connections[bookings.db].vendor == 'postgresql':
+        from django.contrib.postgres.fields import DateRangeField
 
-    for booking in booking_list:
-        if booking.date_start > check_out or booking.date_end < check_in:
-            reservations_checked.append(True)
-        else:
-            reservations_checked.append(False)
+        return bookings.annotate(
+            stay=BookingDateRange('date_start', 'date_end', output_field=DateRangeField())
+        ).filter(stay__overlap=(check_in, check_out + timedelta(days=1)))
 
-    return all(reservations_checked)
+    return bookings.filter(date_start__lte=check_out, date_end__gte=check_in)
 
 
-def check_reservation_is_valid(request_data:Booking) -> bool:
-    """Check that Booking is correct and in the future.
+def check_availability(request_data: Booking) -> bool:
+    """Check that Booking is available for that Property, against the cached occupancy bitmaps.
+    The bitmaps can lag behind the writes of other workers for a few seconds, booking creation checks the
+    database with get_overlapping_bookings instead.
     Args:
-        request_data: The first parameter.
+        request_data: The booking request, with rental_property, date_start and date_end.
     Returns:
-        True for success, False otherwise.
+        True if no other Booking of the property overlaps the requested days, False otherwise.
     """
-    check_in = request_data.get('date_start')
-    check_out = request_data.get('date_end')
-    if check_in > check_out:
-        return False
-    if parse(check_in).date() < datetime.now().date():
-        return False
-    return True
+    check_in = to_date(request_data.get('date_start'))
+    check_out = to_date(request_data.get('date_end'))
+    return is_available(rental_property_id=int(request_data.get('rental_property')), check_in=check_in,
+                        check_out=check_out)
+
+
+class CalendarSpan(NamedTuple):
+    """Run of consecutive days (both ends included) with the same status."""
+    date_start: date
+    date_end: date
+    status: str
+
+    @property
+    def days(self) -> int:
+        return (self.date_end - self.date_start).days + 1
+
+
+def get_availability_calendar(rental_property_id: int, window_start: date, window_end: date) -> list[CalendarSpan]:
+    """Free and busy spans of a property between window_start and window_end (both included).
+    The Bookings overlapping the window are read with a single ordered query and merged into busy runs,
+    the gaps between them are the free runs.
+    Args:
+        rental_property_id: The property.
+        window_start: First day of the calendar.
+        window_end: Last day of the calendar.
+    Returns:
+        Consecutive CalendarSpans covering the whole window.
+    """
+    bookings = get_overlapping_bookings(rental_property_id=rental_property_id, check_in=window_start,
+                                        check_out=window_end).order_by('date_start')
+    spans = list()
+    next_free_day = window_start
+    for date_start, date_end in merge_date_intervals(bookings.values_list('date_start', 'date_end')):
+        date_start, date_end = max(date_start, window_start), min(date_end, window_end)
+        if date_start > next_free_day:
+            spans.append(CalendarSpan(date_start=next_free_day, date_end=date_start - timedelta(days=1), status=FREE))
+        spans.append(CalendarSpan(date_start=date_start, date_end=date_end, status=BUSY))
+        next_free_day = date_end + timedelta(days=1)
+
+    if next_free_day <= window_end:
+        spans.append(CalendarSpan(date_start=next_free_day, date_end=window_end, status=FREE))
+    return spans
@@ -0,0 +1,229 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date
+from functools import reduce
+from operator import or_
+from typing import NamedTuple, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.metrics import timed_stage
+from core.models import Booking, RentalProperty
+from .availability import get_overlapping_bookings
+from .dates import date_range, merge_date_intervals
+from .exceptions import BookingConflictError, BookingError, InvalidBookingError
+from .occupancy import add_booked_days
+from .price_calendar import price_stay
+from .rule_index import PricingRuleIndex
+
+
+def get_first_bookable_day() -> date:
+    """Bookings can not start before today."""
+    return timezone.localdate()
+
+
+def lock_rental_property(rental_property_id: int) -> RentalProperty:
+    """Lock the RentalProperty row until the end of the current transaction.
+    Bookings of the same property are serialized on this lock, bookings of other properties run in parallel.
+    Raises:
+        InvalidBookingError: The property does not exist.
+    """
+    try:
+        return RentalProperty.objects.select_for_update().get(pk=rental_property_id)
+    except (RentalProperty.DoesNotExist, ValueError, TypeError):
+        raise InvalidBookingError(f'Property {rental_property_id} does not exist.')
+
+
+def create_booking(rental_property_id: int, date_start: date, date_end: date) -> Booking:
+    """Check availability, price and save a Booking atomically.
+    Summary:
+        . Lock the property row, so concurrent bookings for the same property wait for each other.
+        . Check availability of time_slots for the Booking.
+        . Select and apply the PricingRules of the property, read under the lock so a concurrent change of the
+          rules is either fully seen or waits for the Booking.
+        . Save the Booking. On PostgreSQL the booking_no_overlap constraint is the last line of defence.
+    Args:
+        rental_property_id: The property to be booked.
+        date_start: First day of the booking.
+        date_end: Last day of the booking.
+    Returns:
+        The created Booking.
+    Raises:
+        InvalidBookingError: Unknown property, property without base_price, date_start in the past or date_end
+            before date_start.
+        BookingConflictError: The days overlap an existing Booking of the property.
+    """
+    days_list = date_range(date_start=date_start, date_end=date_end)
+    if not days_list:
+        raise InvalidBookingError('date_end must not be before date_start.')
+    if days_list.start < get_first_bookable_day():
+        raise InvalidBookingError('date_start must not be in the past.')
+
+    with transaction.atomic():
+        with timed_stage('booking.lock'):
+            selected_property = lock_rental_property(rental_property_id=rental_property_id)
+        if selected_property.base_price is None:
+            raise InvalidBookingError(f'Property {selected_property.id} has no base_price.')
+
+        with timed_stage('booking.availability'):
+            overlapping = get_overlapping_bookings(rental_property_id=selected_property.id, check_in=date_start,
+                                                   check_out=date_end).exists()
+        if overlapping:
+            raise BookingConflictError('The property is not available for the requested days.')
+
+        with timed_stage('booking.rules'):
+            pricing_rules = PricingRuleIndex.for_property(rental_property_id=selected_property.id)
+        final_price = price_stay(rental_property_id=selected_property.id, days_list=days_list,
+                                 base_price=selected_property.base_price, rule_index=pricing_rules)
+
+        try:
+            with timed_stage('booking.save'), transaction.atomic():
+                return Booking.objects.create(rental_property=selected_property, date_start=date_start,
+                                              date_end=date_end, final_price=final_price)
+        except IntegrityError:
+            raise BookingConflictError('The property is not available for the requested days.')
+
+
+def check_booking_change(booking: Booking, rental_property_id: int, date_start: date, date_end: date) -> None:
+    """Check a Booking can be moved to other days or to another property. Call it inside the transaction saving
+    the Booking: the property it moves to is locked, so the change waits for the Bookings being created there.
+    Args:
+        booking: The Booking being changed.
+        rental_property_id: Its new property.
+        date_start: Its new first day.
+        date_end: Its new last day.
+    Raises:
+        InvalidBookingError: Unknown property or date_end before date_start.
+        BookingConflictError: The new days overlap another Booking of the property.
+    """
+    if date_end < date_start:
+        raise InvalidBookingError('date_end must not be before date_start.')
+    lock_rental_property(rental_property_id=rental_property_id)
+    if get_overlapping_bookings(rental_property_id=rental_property_id, check_in=date_start,
+                                check_out=date_end).exclude(pk=booking.pk).exists():
+        raise BookingConflictError('The property is not available for the requested days.')
+
+
+class BookingRequest(NamedTuple):
+    rental_property_id: int
+    date_start: date
+    date_end: date
+
+
+class BookingResult(NamedTuple):
+    """Outcome of one BookingRequest of a batch: the created Booking, or the reason it was rejected."""
+    booking: Optional[Booking] = None
+    error: Optional[BookingError] = None
+
+
+class BookedDays:
+    """Sorted, disjoint ranges of days taken in a property, to check a batch against itself and the database."""
+    __slots__ = ('_starts', '_ends')
+
+    def __init__(self, intervals: list[tuple[date, date]]):
+        merged = merge_date_intervals(intervals)
+        self._starts = [start for start, _ in merged]
+        self._ends = [end for _, end in merged]
+
+    def overlaps(self, date_start: date, date_end: date) -> bool:
+        position = bisect_right(self._starts, date_end)
+        return bool(position) and self._ends[position - 1] >= date_start
+
+    def add(self, date_start: date, date_end: date) -> None:
+        """Take a range of days that does not overlap the ranges already taken."""
+        position = bisect_right(self._starts, date_start)
+        self._starts.insert(position, date_start)
+        self._ends.insert(position, date_end)
+
+
+def get_booked_days(requested_days: dict[int, tuple[date, date]]) -> dict[int, BookedDays]:
+    """Load, with a single query, the existing Bookings of every property overlapping its requested span of days.
+    Args:
+        requested_days: First and last requested day for each property.
+    Returns:
+        BookedDays of each property.
+    """
+    intervals = {rental_property_id: list() for rental_property_id in requested_days}
+    if requested_days:
+        overlapping = reduce(or_, (Q(rental_property=rental_property_id, date_start__lte=date_end,
+                                     date_end__gte=date_start)
+                                   for rental_property_id, (date_start, date_end) in requested_days.items()))
+        rows = Booking.objects.filter(overlapping).values_list('rental_property', 'date_start', 'date_end')
+        for rental_property_id, date_start, date_end in rows:
+            intervals[rental_property_id].append((date_start, date_end))
+    return {rental_property_id: BookedDays(property_intervals)
+            for rental_property_id, property_intervals in intervals.items()}
+
+
+def create_bookings(booking_requests: list[BookingRequest]) -> list[BookingResult]:
+    """Create a batch of Bookings in a single transaction, with a constant number of queries to check them and one
+    price calendar aggregate per accepted Booking inside the horizon.
+    Summary:
+        . Lock all the requested properties at once, in id order so concurrent batches can not deadlock.
+        . Load the PricingRules and the overlapping Bookings of all the properties with one query each.
+        . Check every request against the existing Bookings and the previous requests of the batch.
+        . Price the accepted requests like single Bookings (price_stay) and save them with bulk_create.
+    Args:
+        booking_requests: The Bookings to be created.
+    Returns:
+        One BookingResult per request, in the same order.
+    """
+    results = [BookingResult() for _ in booking_requests]
+    requests_by_property = defaultdict(list)
+    first_bookable_day = get_first_bookable_day()
+    for position, booking_request in enumerate(booking_requests):
+        if booking_request.date_end < booking_request.date_start:
+            results[position] = BookingResult(error=InvalidBookingError('date_end must not be before date_start.'))
+        elif booking_request.date_start < first_bookable_day:
+            results[position] = BookingResult(error=InvalidBookingError('date_start must not be in the past.'))
+        else:
+            requests_by_property[booking_request.rental_property_id].append(position)
+
+    with transaction.atomic():
+        properties = RentalProperty.objects.select_for_update().filter(pk__in=requests_by_property).order_by('pk')
+        base_prices = dict(properties.values_list('id', 'base_price'))
+
+        requested_days = dict()
+        for rental_property_id, positions in list(requests_by_property.items()):
+            if base_prices.get(rental_property_id) is None:
+                error = InvalidBookingError(f'Property {rental_property_id} does not exist or has no base_price.')
+                for position in requests_by_property.pop(rental_property_id):
+                    results[position] = BookingResult(error=error)
+                continue
+            requested_days[rental_property_id] = (
+                min(booking_requests[position].date_start for position in positions),
+                max(booking_requests[position].date_end for position in positions))
+
+        booked_days = get_booked_days(requested_days=requested_days)
+        rule_indexes = PricingRuleIndex.for_properties(rental_property_ids=requests_by_property)
+
+        accepted = dict()
+        for rental_property_id, positions in requests_by_property.items():
+            for position in positions:
+                booking_request = booking_requests[position]
+                if booked_days[rental_property_id].overlaps(booking_request.date_start, booking_request.date_end):
+                    results[position] = BookingResult(
+                        error=BookingConflictError('The property is not available for the requested days.'))
+                    continue
+                booked_days[rental_property_id].add(booking_request.date_start, booking_request.date_end)
+                days_list = date_range(date_start=booking_request.date_start, date_end=booking_request.date_end)
+                accepted[position] = Booking(
+                    rental_property_id=rental_property_id, date_start=booking_request.date_start,
+                    date_end=booking_request.date_end,
+                    final_price=price_stay(rental_property_id=rental_property_id, days_list=days_list,
+                                           base_price=base_prices[rental_property_id],
+                                           rule_index=rule_indexes[rental_property_id]))
+
+        try:
+            with transaction.atomic():
+                Booking.objects.bulk_create(accepted.values())
+        except IntegrityError:
+            raise BookingConflictError('The batch overlaps existing Bookings.')
+
+    for position, booking in accepted.items():
+        add_booked_days(rental_property_id=booking.rental_property_id, date_start=booking.date_start,
+                        date_end=booking.date_end)
+        results[position] = BookingResult(booking=booking)
+    return results
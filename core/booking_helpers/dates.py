@@ -0,0 +1,114 @@
+from collections.abc import Sequence
+from datetime import date, datetime
+from typing import Iterable, Iterator, Union, overload
+
+from dateutil.parser import parse
+
+DateLike = Union[str, date]
+
+
+def to_date(value: DateLike) -> date:
+    """Parse a date the same way the booking endpoints do (dateutil), or drop the time of a datetime."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return parse(value).date()
+
+
+class DateRange(Sequence):
+    """Lightweight, immutable range of consecutive days (both ends included).
+    Stores only the ordinals of the first and last day, days are built on demand as datetime.date.
+    """
+    __slots__ = ('_first_ordinal', '_last_ordinal')
+
+    def __init__(self, start: date, end: date):
+        self._first_ordinal = start.toordinal()
+        self._last_ordinal = max(end.toordinal(), self._first_ordinal - 1)
+
+    @property
+    def first_ordinal(self) -> int:
+        return self._first_ordinal
+
+    @property
+    def last_ordinal(self) -> int:
+        return self._last_ordinal
+
+    @property
+    def start(self) -> date:
+        return date.fromordinal(self._first_ordinal)
+
+    @property
+    def end(self) -> date:
+        return date.fromordinal(self._last_ordinal)
+
+    def __len__(self) -> int:
+        return self._last_ordinal - self._first_ordinal + 1
+
+    @overload
+    def __getitem__(self, position: int) -> date: ...
+
+    @overload
+    def __getitem__(self, position: slice) -> list[date]: ...
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [date.fromordinal(ordinal) for ordinal in self.ordinals()[position]]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError('DateRange index out of range')
+        return date.fromordinal(self._first_ordinal + position)
+
+    def __iter__(self) -> Iterator[date]:
+        return map(date.fromordinal, self.ordinals())
+
+    def __contains__(self, day: object) -> bool:
+        if not isinstance(day, date):
+            return False
+        if isinstance(day, datetime):
+            day = day.date()
+        return self._first_ordinal <= day.toordinal() <= self._last_ordinal
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DateRange):
+            return NotImplemented
+        return (self._first_ordinal, self._last_ordinal) == (other._first_ordinal, other._last_ordinal)
+
+    def __hash__(self) -> int:
+        return hash((self._first_ordinal, self._last_ordinal))
+
+    def __repr__(self) -> str:
+        return f'DateRange({self.start.isoformat()}, {self.end.isoformat()})'
+
+    def ordinals(self) -> range:
+        """Ordinals of every day in the range."""
+        return range(self._first_ordinal, self._last_ordinal + 1)
+
+
+def date_range(date_start: DateLike, date_end: DateLike) -> DateRange:
+    """All the days from date_start to date_end (both included).
+    Args:
+        date_start: First day, as a date or a string parsed like the booking endpoints.
+        date_end: Last day, as a date or a string parsed like the booking endpoints.
+    Returns:
+        DateRange of the days, empty if date_end is before date_start.
+    """
+    return DateRange(start=to_date(date_start), end=to_date(date_end))
+
+
+def merge_date_intervals(intervals: Iterable[tuple[date, date]]) -> list[tuple[date, date]]:
+    """Merge ranges of days (both ends included) into sorted, disjoint ranges. Consecutive ranges are joined.
+    Args:
+        intervals: Pairs of first and last day, in any order.
+    Returns:
+        Sorted list of disjoint (first day, last day) pairs.
+    """
+    merged = list()
+    for start, end in sorted(intervals):
+        if merged and start.toordinal() <= merged[-1][1].toordinal() + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
@@ -0,0 +1,26 @@
+class BookingError(Exception):
+    """Base class of the errors raised when a Booking can not be created."""
+
+
+class InvalidBookingError(BookingError):
+    """The booking request is not valid: unknown property, property without base_price, dates in wrong order..."""
+
+
+class BookingConflictError(BookingError):
+    """The requested days overlap an existing Booking of the property."""
+
+
+class InvalidRuleImportError(Exception):
+    """A sheet of PricingRules has invalid rows, nothing is imported. errors lists what is wrong."""
+
+    def __init__(self, errors: list[str]):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+class InvalidPricingProposalError(Exception):
+    """The rules proposed to a pricing simulation are invalid. errors lists what is wrong."""
+
+    def __init__(self, errors: list[str]):
+        super().__init__('; '.join(errors))
+        self.errors = errors
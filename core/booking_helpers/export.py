@@ -0,0 +1,62 @@
+import csv
+import json
+from datetime import date
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+EXPORT_FIELDS = ('id', 'rental_property', 'date_start', 'date_end', 'final_price')
+EXPORT_CHUNK_SIZE = 2000
+"""EXPORT_CHUNK_SIZE: Rows fetched from the database per round trip while exporting."""
+
+
+class LineBuffer:
+    """File-like object that hands back what is written to it, so csv.writer can produce one line at a time."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_booking_rows(bookings: QuerySet, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[tuple]:
+    """Stream the EXPORT_FIELDS of the Bookings in id order, without building model instances.
+    Dates are formatted like the API does, with the DRF DATE_FORMAT.
+    """
+    date_format = settings.REST_FRAMEWORK['DATE_FORMAT']
+    rows = bookings.order_by('id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield tuple(value.strftime(date_format) if isinstance(value, date) else value for value in row)
+
+
+def iter_csv(rows: Iterable[tuple]) -> Iterator[str]:
+    """CSV lines of the rows, header first."""
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_jsonl(rows: Iterable[tuple]) -> Iterator[str]:
+    """JSON Lines of the rows, one object per Booking."""
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row))) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv'),
+    'jsonl': (iter_jsonl, 'application/x-ndjson'),
+}
+"""EXPORT_FORMATS: Line generator and content type of each export format."""
+
+
+def export_bookings(bookings: QuerySet, export_format: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """Lines of the Bookings in the given format, read from the database chunk_size rows at a time.
+    Args:
+        bookings: The (filtered) Bookings to be exported.
+        export_format: One of EXPORT_FORMATS.
+        chunk_size: Rows fetched per round trip.
+    Returns:
+        Iterator of text lines, memory does not grow with the number of Bookings.
+    """
+    iter_lines, _ = EXPORT_FORMATS[export_format]
+    return iter_lines(iter_booking_rows(bookings=bookings, chunk_size=chunk_size))
@@ -0,0 +1,193 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Hashable, Optional
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+
+from core.db_router import use_primary
+from core.models import Booking
+
+ENTRY_OVERHEAD_BYTES = 160
+"""ENTRY_OVERHEAD_BYTES: Approximate memory taken by an entry besides its bitmap: key tuple, expiry and LRU links."""
+
+
+def get_days_mask(first_ordinal: int, last_ordinal: int, offset: int) -> int:
+    """Bitmask with one bit set per day from first_ordinal to last_ordinal (both included), bit 0 being offset."""
+    if last_ordinal < first_ordinal:
+        return 0
+    return ((1 << (last_ordinal - first_ordinal + 1)) - 1) << (first_ordinal - offset)
+
+
+def get_year_span(year: int) -> tuple[int, int]:
+    """Ordinals of the first and last day of the year."""
+    return date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal()
+
+
+class OccupancyCache:
+    """In-process LRU of occupancy bitmaps, one per property and year, with one bit set per booked night.
+    The memory taken by the entries is accounted and the least recently used ones are evicted above max_bytes.
+    Entries also expire after timeout seconds, which bounds how long a worker can miss the writes of other workers.
+    """
+
+    def __init__(self, max_bytes: int, timeout: float):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+
+    def get(self, key: Hashable) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, bitmap: int) -> None:
+        with self._lock:
+            self._remove(key)
+            self._insert(key, bitmap, time.monotonic() + self.timeout)
+            while self._size_bytes > self.max_bytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def add_days(self, key: Hashable, days_mask: int) -> None:
+        """Set the bits of days_mask in the cached bitmap, if there is one. Missing bitmaps are built on demand."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._remove(key)
+                self._insert(key, entry[0] | days_mask, entry[1])
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size_bytes = 0
+
+    def stats(self) -> dict:
+        return {'entries': len(self._entries), 'size_bytes': self._size_bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def _insert(self, key: Hashable, bitmap: int, expires_at: float) -> None:
+        size = sys.getsizeof(bitmap) + ENTRY_OVERHEAD_BYTES
+        self._entries[key] = (bitmap, expires_at, size)
+        self._size_bytes += size
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size_bytes -= entry[2]
+
+
+occupancy_cache = OccupancyCache(max_bytes=settings.OCCUPANCY_CACHE_MAX_BYTES,
+                                 timeout=settings.OCCUPANCY_CACHE_TIMEOUT)
+
+
+def get_shared_cache() -> Optional[BaseCache]:
+    """Optional cache shared by all the workers (OCCUPANCY_SHARED_CACHE alias), behind the in-process one."""
+    if not settings.OCCUPANCY_SHARED_CACHE:
+        return None
+    return caches[settings.OCCUPANCY_SHARED_CACHE]
+
+
+def get_shared_key(rental_property_id: int, year: int) -> str:
+    return f'occupancy:{rental_property_id}:{year}'
+
+
+@use_primary()
+def load_year_bitmap(rental_property_id: int, year: int) -> int:
+    """Build the occupancy bitmap of a property for a year from its Bookings, read from the primary as the bitmap
+    is cached."""
+    first_ordinal, last_ordinal = get_year_span(year=year)
+    bookings = Booking.objects.filter(rental_property=rental_property_id, date_start__lte=date(year, 12, 31),
+                                      date_end__gte=date(year, 1, 1)).values_list('date_start', 'date_end')
+    bitmap = 0
+    for date_start, date_end in bookings:
+        bitmap |= get_days_mask(first_ordinal=max(date_start.toordinal(), first_ordinal),
+                                last_ordinal=min(date_end.toordinal(), last_ordinal), offset=first_ordinal)
+    return bitmap
+
+
+def get_year_bitmap(rental_property_id: int, year: int) -> int:
+    """Occupancy bitmap of a property for a year: from the in-process cache, the shared cache or the database."""
+    key = (rental_property_id, year)
+    bitmap = occupancy_cache.get(key)
+    if bitmap is not None:
+        return bitmap
+
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        bitmap = shared_cache.get(get_shared_key(rental_property_id=rental_property_id, year=year))
+    if bitmap is None:
+        bitmap = load_year_bitmap(rental_property_id=rental_property_id, year=year)
+        if shared_cache is not None:
+            shared_cache.set(get_shared_key(rental_property_id=rental_property_id, year=year), bitmap,
+                             timeout=settings.OCCUPANCY_CACHE_TIMEOUT)
+
+    occupancy_cache.set(key, bitmap)
+    return bitmap
+
+
+def get_occupied_days_mask(rental_property_id: int, check_in: date, check_out: date) -> int:
+    """Bitmask of the booked days from check_in to check_out (both included), bit 0 being check_in."""
+    offset = check_in.toordinal()
+    occupied_days = 0
+    for year in range(check_in.year, check_out.year + 1):
+        first_ordinal, last_ordinal = get_year_span(year=year)
+        requested_days = get_days_mask(first_ordinal=max(check_in.toordinal(), first_ordinal),
+                                       last_ordinal=min(check_out.toordinal(), last_ordinal), offset=first_ordinal)
+        booked_days = get_year_bitmap(rental_property_id=rental_property_id, year=year) & requested_days
+        if first_ordinal >= offset:
+            occupied_days |= booked_days << (first_ordinal - offset)
+        else:
+            occupied_days |= booked_days >> (offset - first_ordinal)
+    return occupied_days
+
+
+def is_available(rental_property_id: int, check_in: date, check_out: date) -> bool:
+    """True if no night from check_in to check_out (both included) is booked, as a bitmask AND per year."""
+    return not get_occupied_days_mask(rental_property_id=rental_property_id, check_in=check_in, check_out=check_out)
+
+
+def add_booked_days(rental_property_id: int, date_start: date, date_end: date) -> None:
+    """Keep the bitmaps up to date after a Booking is created."""
+    shared_cache = get_shared_cache()
+    for year in range(date_start.year, date_end.year + 1):
+        first_ordinal, last_ordinal = get_year_span(year=year)
+        booked_days = get_days_mask(first_ordinal=max(date_start.toordinal(), first_ordinal),
+                                    last_ordinal=min(date_end.toordinal(), last_ordinal), offset=first_ordinal)
+        occupancy_cache.add_days((rental_property_id, year), booked_days)
+        if shared_cache is not None:
+            shared_cache.delete(get_shared_key(rental_property_id=rental_property_id, year=year))
+
+
+def invalidate_booked_days(rental_property_id: int, date_start: date, date_end: date) -> None:
+    """Drop the bitmaps touched by a Booking that is changed or deleted, they are rebuilt on the next lookup."""
+    shared_cache = get_shared_cache()
+    for year in range(date_start.year, date_end.year + 1):
+        occupancy_cache.discard((rental_property_id, year))
+        if shared_cache is not None:
+            shared_cache.delete(get_shared_key(rental_property_id=rental_property_id, year=year))
@@ -0,0 +1,211 @@
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from core.db_router import use_primary
+from core.metrics import timed_stage
+from core.models import PricePoint, RentalProperty
+from .dates import DateRange, date_range
+from .pricing_rules import calculate_final_price
+from .quote_search import get_day_price
+from .rule_index import CompiledRule, PricingRuleIndex
+
+
+def get_horizon() -> tuple[date, date]:
+    """First and last night of the rolling horizon kept in the PricePoint table."""
+    first_day = timezone.localdate()
+    return first_day, first_day + timedelta(days=settings.PRICE_CALENDAR_DAYS - 1)
+
+
+def build_price_points(rental_property_id: int, base_price: float, rule_index: PricingRuleIndex,
+                       days: Iterable[date]) -> list[PricePoint]:
+    """Unsaved PricePoints of the nights, priced like apply_rules prices the nights of a stay."""
+    price_points = list()
+    for day in days:
+        rule = rule_index.special_days.get(day)
+        if rule is None:
+            price = base_price
+        elif rule.fixed_price:
+            price = rule.fixed_price
+        else:
+            price = base_price + ((base_price / 100) * (rule.price_modifier or 0.0))
+        price_points.append(PricePoint(rental_property_id=rental_property_id, day=day, price=price,
+                                       rule_id=rule.id if rule else None))
+    return price_points
+
+
+def refresh_price_points(rental_property_id: int, days: Optional[Iterable[date]] = None) -> int:
+    """Recompute the materialized nights of a property. The property row is locked, so concurrent refreshes of
+    the same property wait for each other.
+    Args:
+        rental_property_id: The property.
+        days: Nights whose rules changed, None when the base_price changed and every night is affected.
+            Nights outside the horizon are ignored.
+    Returns:
+        Number of PricePoints written.
+    """
+    first_day, last_day = get_horizon()
+    price_points = PricePoint.objects.filter(rental_property=rental_property_id)
+    if days is None:
+        days = date_range(date_start=first_day, date_end=last_day)
+    else:
+        days = sorted(day for day in set(days) if first_day <= day <= last_day)
+        if not days:
+            return 0
+        price_points = price_points.filter(day__in=days)
+
+    with transaction.atomic():
+        base_price = (RentalProperty.objects.select_for_update().filter(pk=rental_property_id)
+                      .values_list('base_price', flat=True).first())
+        price_points.delete()
+        if base_price is None:
+            return 0
+        rule_index = PricingRuleIndex.for_property(rental_property_id=rental_property_id)
+        return len(PricePoint.objects.bulk_create(
+            build_price_points(rental_property_id=rental_property_id, base_price=base_price, rule_index=rule_index,
+                               days=days)))
+
+
+def drop_price_points(rental_property_id: int) -> int:
+    """Drop every materialized night of a property whose base_price changed, with a single DELETE instead of
+    rewriting the whole horizon in the request. Its stays are priced from the rules until extend_price_points
+    materializes the nights again. Returns the number of PricePoints deleted."""
+    return PricePoint.objects.filter(rental_property=rental_property_id).delete()[0]
+
+
+@use_primary()
+def extend_price_points(rental_property_id: int) -> int:
+    """Roll the horizon of a property forward: materialize the nights up to the end of the horizon that are
+    missing, and drop the nights already past. Returns the number of PricePoints written."""
+    first_day, last_day = get_horizon()
+    PricePoint.objects.filter(rental_property=rental_property_id, day__lt=first_day).delete()
+    existing_days = set(PricePoint.objects.filter(rental_property=rental_property_id, day__gte=first_day)
+                        .values_list('day', flat=True))
+    missing_days = [day for day in date_range(date_start=first_day, date_end=last_day) if day not in existing_days]
+    if not missing_days:
+        return 0
+    return refresh_price_points(rental_property_id=rental_property_id, days=missing_days)
+
+
+def get_materialized_price(rental_property_id: int, days_list: DateRange, base_price: float,
+                           rule_index: PricingRuleIndex) -> Optional[float]:
+    """Price of a stay from the PricePoint table, with a single indexed aggregate over its nights.
+    Summary:
+        . Nights set by a specific_day rule are summed as they are.
+        . The other nights are charged the base_price with the min_stay_length modifier of the stay length.
+        . A min_stay_length rule that also has a specific_day overrides the price of that night.
+    Args:
+        rental_property_id: The property.
+        days_list: DateRange of the stay.
+        base_price: The base_price of the Property.
+        rule_index: PricingRuleIndex of the Property, only its min_stay_length tiers are used.
+    Returns:
+        The final price, or None when some night of the stay is not materialized.
+    """
+    first_day, last_day = get_horizon()
+    if not days_list or days_list.start < first_day or days_list.end > last_day:
+        return None
+
+    total_days = len(days_list)
+    rule = rule_index.min_stay_length_rule(total_days=total_days)
+    override_day = rule.specific_day if rule and rule.specific_day in days_list else None
+
+    special_nights = Q(rule__isnull=False)
+    nights = PricePoint.objects.filter(rental_property=rental_property_id, day__range=(days_list.start, days_list.end))
+    totals = nights.aggregate(
+        nights=Count('id'), special_nights=Count('id', filter=special_nights),
+        special_total=Sum('price', filter=special_nights),
+        override_price=Max('price', filter=special_nights & Q(day=override_day)))
+    if totals['nights'] != total_days:
+        return None
+
+    final_price = add_up_nights(base_price=base_price, rule=rule, total_days=total_days,
+                                special_nights=totals['special_nights'], special_total=totals['special_total'])
+    if override_day:
+        regular_price = get_regular_price(base_price=base_price, rule=rule)
+        current_price = totals['override_price'] if totals['override_price'] is not None else regular_price
+        final_price += get_day_price(base_price=base_price, rule=rule) - current_price
+    return final_price
+
+
+def get_regular_price(base_price: float, rule: Optional[CompiledRule]) -> float:
+    """Price of a night without specific_day rule, with the min_stay_length modifier of the stay."""
+    price_modifier = (rule.price_modifier or 0.0) if rule else 0.0
+    return base_price + ((base_price / 100) * price_modifier)
+
+
+def add_up_nights(base_price: float, rule: Optional[CompiledRule], total_days: int, special_nights: int,
+                  special_total: Optional[float]) -> float:
+    """Price of a stay from the aggregate of its materialized nights."""
+    regular_price = get_regular_price(base_price=base_price, rule=rule)
+    return float((special_total or 0.0) + (total_days - special_nights) * regular_price)
+
+
+def get_materialized_prices(days_list: DateRange, base_prices: dict[int, float],
+                            rule_indexes: dict[int, PricingRuleIndex]) -> dict[int, float]:
+    """Price of the same stay in several properties from the PricePoint table, with one grouped aggregate.
+    Args:
+        days_list: DateRange of the stay.
+        base_prices: The base_price of each Property.
+        rule_indexes: PricingRuleIndex of each Property, only its min_stay_length tiers are used.
+    Returns:
+        The final price of the properties whose nights are all materialized. The others, and the ones whose
+        min_stay_length rule overrides a night of the stay, are left out.
+    """
+    first_day, last_day = get_horizon()
+    if not days_list or days_list.start < first_day or days_list.end > last_day:
+        return dict()
+
+    total_days = len(days_list)
+    special_nights = Q(rule__isnull=False)
+    rows = (PricePoint.objects.filter(rental_property__in=base_prices, day__range=(days_list.start, days_list.end))
+            .values('rental_property')
+            .annotate(nights=Count('id'), special_nights=Count('id', filter=special_nights),
+                      special_total=Sum('price', filter=special_nights)))
+    final_prices = dict()
+    for row in rows:
+        rental_property_id = row['rental_property']
+        rule = rule_indexes[rental_property_id].min_stay_length_rule(total_days=total_days)
+        if row['nights'] != total_days or (rule and rule.specific_day in days_list):
+            continue
+        final_prices[rental_property_id] = add_up_nights(
+            base_price=base_prices[rental_property_id], rule=rule, total_days=total_days,
+            special_nights=row['special_nights'], special_total=row['special_total'])
+    return final_prices
+
+
+def price_stay(rental_property_id: int, days_list: DateRange, base_price: float,
+               rule_index: PricingRuleIndex) -> float:
+    """Final price of a stay: from the materialized nights inside the horizon, from the rules otherwise."""
+    with timed_stage('pricing.price_calendar'):
+        final_price = get_materialized_price(rental_property_id=rental_property_id, days_list=days_list,
+                                             base_price=base_price, rule_index=rule_index)
+    if final_price is None:
+        final_price = calculate_final_price(days_list=days_list, base_price=base_price, pricing_rules=rule_index)
+    return final_price
+
+
+def price_stays(days_list: DateRange, base_prices: dict[int, float],
+                rule_indexes: dict[int, PricingRuleIndex]) -> dict[int, float]:
+    """Final price of the same stay in several properties, like price_stay but with one aggregate query for all
+    the properties whose nights are materialized.
+    Args:
+        days_list: DateRange of the stay.
+        base_prices: The base_price of each Property.
+        rule_indexes: PricingRuleIndex of each Property.
+    Returns:
+        The final price of the stay in each Property.
+    """
+    with timed_stage('pricing.price_calendar'):
+        final_prices = get_materialized_prices(days_list=days_list, base_prices=base_prices,
+                                               rule_indexes=rule_indexes)
+    for rental_property_id, base_price in base_prices.items():
+        if rental_property_id not in final_prices:
+            final_prices[rental_property_id] = price_stay(rental_property_id=rental_property_id, days_list=days_list,
+                                                          base_price=base_price,
+                                                          rule_index=rule_indexes[rental_property_id])
+    return final_prices
@@ -0,0 +1,125 @@
+import uuid
+from typing import Iterable, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from core.db_router import use_primary
+from core.models import RentalProperty
+from .rule_index import PricingRuleIndex
+
+
+class PricingSnapshot(NamedTuple):
+    """Everything needed to price a stay in a property: its base_price and its compiled PricingRules."""
+    rental_property_id: int
+    base_price: Optional[float]
+    rules: PricingRuleIndex
+
+
+def is_shared_cache() -> bool:
+    """Versions are bumped in the cache of the process that handled the write. A per-process cache (LocMemCache, the
+    default CACHE_URL) never sees the bumps of the other workers and would serve them outdated snapshots, so
+    snapshots are only cached with a backend shared by every process (Redis, Memcached, database, ...)."""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def new_pricing_version() -> str:
+    """A version never used before. Bumps write a new one with a plain set instead of an increment, which is a get
+    and a set on the file and database backends: concurrent bumps overwrite each other, but each of them leaves a
+    version no snapshot was ever cached under."""
+    return uuid.uuid4().hex
+
+
+def get_version_key(rental_property_id: int) -> str:
+    return f'pricing-version:{rental_property_id}'
+
+
+def get_snapshot_key(rental_property_id: int, version: str) -> str:
+    return f'pricing-snapshot:{rental_property_id}:{version}'
+
+
+def get_pricing_version(rental_property_id: int) -> str:
+    """Current pricing version of a property, started on first use.
+    A version lost by the cache restarts with a new one, so it can not come back to older snapshots.
+    """
+    key = get_version_key(rental_property_id=rental_property_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_pricing_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_pricing_version(rental_property_id: int) -> str:
+    """Async version of get_pricing_version."""
+    key = get_version_key(rental_property_id=rental_property_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, new_pricing_version(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+@use_primary()
+def load_pricing_snapshot(rental_property_id: int) -> PricingSnapshot:
+    """Load the PricingSnapshot of a property from the primary database, as it is cached under the latest version.
+    Raises:
+        RentalProperty.DoesNotExist: The property does not exist.
+    """
+    base_price = RentalProperty.objects.values_list('base_price', flat=True).get(pk=rental_property_id)
+    return PricingSnapshot(rental_property_id=rental_property_id, base_price=base_price,
+                           rules=PricingRuleIndex.for_property(rental_property_id=rental_property_id))
+
+
+async def aload_pricing_snapshot(rental_property_id: int) -> PricingSnapshot:
+    """Async version of load_pricing_snapshot, with the async ORM."""
+    with use_primary():
+        base_price = await RentalProperty.objects.values_list('base_price', flat=True).aget(pk=rental_property_id)
+        return PricingSnapshot(rental_property_id=rental_property_id, base_price=base_price,
+                               rules=await PricingRuleIndex.afor_property(rental_property_id=rental_property_id))
+
+
+def get_pricing_snapshot(rental_property_id: int) -> PricingSnapshot:
+    """PricingSnapshot of a property, from the cache or loaded and cached on a miss.
+    Snapshots are cached under the pricing version of the property, which is bumped whenever the property or its
+    PricingRules change (see core.signals), so an outdated snapshot is never read again and simply expires.
+    Without a shared cache the snapshot is loaded on every call.
+    Raises:
+        RentalProperty.DoesNotExist: The property does not exist.
+    """
+    if not is_shared_cache():
+        return load_pricing_snapshot(rental_property_id=rental_property_id)
+    key = get_snapshot_key(rental_property_id=rental_property_id,
+                           version=get_pricing_version(rental_property_id=rental_property_id))
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = load_pricing_snapshot(rental_property_id=rental_property_id)
+        cache.set(key, snapshot, timeout=settings.PRICING_CACHE_TIMEOUT)
+    return snapshot
+
+
+async def aget_pricing_snapshot(rental_property_id: int) -> PricingSnapshot:
+    """Async version of get_pricing_snapshot, sharing the same cache entries.
+    Raises:
+        RentalProperty.DoesNotExist: The property does not exist.
+    """
+    if not is_shared_cache():
+        return await aload_pricing_snapshot(rental_property_id=rental_property_id)
+    key = get_snapshot_key(rental_property_id=rental_property_id,
+                           version=await aget_pricing_version(rental_property_id=rental_property_id))
+    snapshot = await cache.aget(key)
+    if snapshot is None:
+        snapshot = await aload_pricing_snapshot(rental_property_id=rental_property_id)
+        await cache.aset(key, snapshot, timeout=settings.PRICING_CACHE_TIMEOUT)
+    return snapshot
+
+
+def invalidate_pricing_snapshots(rental_property_ids: Iterable[int]) -> None:
+    """Bump the pricing version of the properties to new ones, with one get_many and one set_many.
+    Properties without a version yet have nothing cached to invalidate.
+    """
+    keys = [get_version_key(rental_property_id=rental_property_id) for rental_property_id in rental_property_ids]
+    versioned = cache.get_many(keys)
+    if versioned:
+        cache.set_many({key: new_pricing_version() for key in versioned}, timeout=None)
@@ -1,109 +1,33 @@
-from itertools import groupby
-from typing import Tuple, List
-
-from pandas import DatetimeIndex
+from typing import Iterable, List, Tuple, Union
 
+from core.metrics import timed_stage
 from core.models import PricingRule
+from .dates import DateRange
+from .rule_index import CompiledRule, PricingRuleIndex
 
 
-def filter_from_similar_rules(rules: list[PricingRule]) -> list[PricingRule]:
-    """Select the rules with the biggest price_modifier or fixed_price.
-    Args:
-        rules: List of PricingRules to be filtered.
-    Returns:
-        List of PricingRules filtered.
-    """
-    groups = []
-    key_func = lambda x: x.get_key_field
-
-    for _, g in groupby(rules, key_func):
-        groups.append(list(g))  # Store group iterator as a list
-
-    min_stay_length_rules = list()
-    for group in groups:
-        if len(group) > 1:
-            min_stay_length_rules.append(max(group, key=key_func))
-        min_stay_length_rules.append(group[0])
-    return min_stay_length_rules
-
-
-def process_min_stay_length_rule(min_stay_length_rules: list[PricingRule], total_days: int,
-                                 valid_rules: list[PricingRule]) -> list[PricingRule]:
-    """ Select the Min Stay Length rule that has priority.
-    Args:
-        total_days: total days to be booked.
-        min_stay_length_rules: List of PricingRules to be processed.
-        valid_rules: List of valid rules according to booking request, placeholder for the new valid rules.
-    Returns:
-        valid_rules: List of PricingRules to be processed.
-    """
-
-    if min_stay_length_rules:
-        rules = list(filter(lambda rule: rule.min_stay_length <= total_days, min_stay_length_rules))
-        rules = filter_from_similar_rules(rules=rules)
-        if rules:
-            filtered_rule = max(rules, key=lambda rule: abs(rule.price_modifier))
-            if filtered_rule:
-                valid_rules.append(filtered_rule)
-    return valid_rules
-
-
-def process_specific_day_rule(days_list: DatetimeIndex, specific_day_rules: list[PricingRule],
-                              valid_rules: list[PricingRule]) -> list[PricingRule]:
-    """ Select the specific_day rule that has priority.
-    Args:
-        days_list: DatetimeIndex of all dates to be booked.
-        specific_day_rules: List of PricingRules to be processed.
-        valid_rules: List of valid rules according to booking request, placeholder for the new valid rules.
-    Returns:
-        valid_rules: List of PricingRules to be processed.
-
-    """
-    days_list = [day.date() for day in days_list]
-
-    if specific_day_rules:
-        rules = [rule for rule in specific_day_rules if rule.specific_day in days_list]
-        filtered_rules = filter_from_similar_rules(rules=rules)
-        if filtered_rules:
-            for rule in filtered_rules:
-                valid_rules.append(rule)
-    return valid_rules
-
-
-def identify_rules(pricing_rules: list[PricingRule]) -> Tuple[list[PricingRule], list[PricingRule]]:
-    """
-    Args:
-        pricing_rules: List of PricingRules to be filtered.
-    Returns:
-        min_stay_length_rules
-        specific_day_rules
-
-    """
-
-    min_stay_length_rules = list(filter(lambda rule: rule.min_stay_length is not None, pricing_rules))
-    specific_day_rules = list(set(pricing_rules) - set(min_stay_length_rules))
-
-    return min_stay_length_rules, specific_day_rules
-
-
-def get_rules_to_apply(days_list: DatetimeIndex, pricing_rules: list[PricingRule]) -> list[PricingRule]:
+def get_rules_to_apply(days_list: DateRange,
+                       pricing_rules: Union[PricingRuleIndex, Iterable[PricingRule]]) -> list[CompiledRule]:
     """Select the Pricing Rules that are relevant to apply for each day. More info at: README.md:MOST RELEVANT RULE
     Args:
-        days_list: DatetimeIndex of all dates to be booked.
-        pricing_rules: List of PricingRules to be filtered.
+        days_list: DateRange of all dates to be booked.
+        pricing_rules: PricingRuleIndex of the property, or the PricingRules to be compiled into one.
     Returns:
-        List of PricingRules selected to be applied.
+        List of PricingRules selected to be applied: the specific_day rules inside the stay sorted by date,
+        followed by the most relevant min_stay_length rule.
     """
+    if not isinstance(pricing_rules, PricingRuleIndex):
+        pricing_rules = PricingRuleIndex.from_rules(pricing_rules)
+
     valid_rules: List = list()
     total_days = len(days_list)
 
-    min_stay_length_rules, specific_day_rules = identify_rules(pricing_rules=pricing_rules)
-
-    valid_rules = process_specific_day_rule(days_list=days_list, specific_day_rules=specific_day_rules,
-                                            valid_rules=valid_rules)
+    if total_days:
+        valid_rules.extend(pricing_rules.special_day_rules(check_in=days_list[0], check_out=days_list[-1]))
 
-    valid_rules = process_min_stay_length_rule(min_stay_length_rules=min_stay_length_rules, total_days=total_days,
-                                               valid_rules=valid_rules)
+    min_stay_length_rule = pricing_rules.min_stay_length_rule(total_days=total_days)
+    if min_stay_length_rule:
+        valid_rules.append(min_stay_length_rule)
 
     return valid_rules
 
@@ -128,10 +52,10 @@ def get_booking_prices(rules_to_apply: list[PricingRule]) -> Tuple[float, dict]:
     return price_modifier, special_day_dict
 
 
-def apply_rules(days_list: DatetimeIndex, base_price: float, rules_to_apply: list[PricingRule]) -> float:
+def apply_rules(days_list: DateRange, base_price: float, rules_to_apply: list[PricingRule]) -> float:
     """Apply the appropriate rule for each day.
     Args:
-        days_list: DatetimeIndex of all dates to be booked.
+        days_list: DateRange of all dates to be booked.
         rules_to_apply: List of PricingRules selected to be applied
         base_price: The base_price of the Property to be booked.
     Returns:
@@ -143,8 +67,8 @@ def apply_rules(days_list: DatetimeIndex, base_price: float, rules_to_apply: lis
 
     for day in days_list:
 
-        if day.date() in special_day_dict.keys():
-            rule = special_day_dict[day.date()]
+        if day in special_day_dict:
+            rule = special_day_dict[day]
             if rule.fixed_price:
 
                 total.append(rule.fixed_price)
@@ -153,3 +77,22 @@ def apply_rules(days_list: DatetimeIndex, base_price: float, rules_to_apply: lis
         else:
             total.append(base_price + ((base_price / 100) * price_modifier))
     return float(sum(total))
+
+
+def calculate_final_price(days_list: DateRange, base_price: float,
+                          pricing_rules: Union[PricingRuleIndex, Iterable[PricingRule]]) -> float:
+    """Select and apply the relevant PricingRules to get the final price of a stay.
+    Args:
+        days_list: DateRange of all dates to be booked.
+        base_price: The base_price of the Property to be booked.
+        pricing_rules: PricingRuleIndex of the property, or its PricingRules.
+    Returns:
+        The final price of the stay.
+    """
+    with timed_stage('pricing.rule_selection'):
+        rules_to_apply = get_rules_to_apply(days_list=days_list, pricing_rules=pricing_rules)
+
+    if not rules_to_apply:
+        return float(len(days_list) * base_price)
+    with timed_stage('pricing.apply_rules'):
+        return apply_rules(days_list=days_list, base_price=base_price, rules_to_apply=rules_to_apply)
@@ -0,0 +1,53 @@
+"""
+Process pool for CPU bound pricing jobs over many Bookings.
+
+Workers only run pure functions of the pricing engine on the data they are sent, they never use the database:
+the caller reads the rows, sends them in chunks and writes the results. Kept free of model imports, so it can be
+loaded by workers started with spawn before Django is set up.
+"""
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from typing import Callable, Iterable, Iterator, Optional
+
+import django
+from django.conf import settings
+
+
+def init_worker() -> None:
+    """Set Django up in workers that do not inherit it from a fork."""
+    django.setup()
+
+
+def get_workers(workers: Optional[int] = None) -> int:
+    """Number of worker processes: workers, REPRICING_WORKERS, or one per CPU when both are 0."""
+    workers = settings.REPRICING_WORKERS if workers is None else workers
+    return workers if workers > 0 else os.cpu_count() or 1
+
+
+def imap_unordered(func: Callable, tasks: Iterable[tuple], workers: Optional[int] = None) -> Iterator:
+    """Run func(*task) for every task in a pool of processes and yield the results as they complete.
+    Tasks are read lazily with at most two in flight per worker, so the caller can stream them from the database
+    and consume the results while the workers are busy.
+    Args:
+        func: Module level function, it is pickled by reference.
+        tasks: Picklable arguments of each call.
+        workers: Number of processes, see get_workers. With one worker everything runs in this process.
+    Returns:
+        Iterator of the results, in completion order.
+    """
+    workers = get_workers(workers=workers)
+    if workers == 1:
+        for task in tasks:
+            yield func(*task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        pending = set()
+        for task in tasks:
+            pending.add(executor.submit(func, *task))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
@@ -0,0 +1,59 @@
+from datetime import date
+from typing import Iterable, NamedTuple, Optional
+
+from django.db.models import Exists, OuterRef, QuerySet
+
+from core.models import RentalProperty
+from .availability import get_overlapping_bookings
+from .dates import date_range
+from .price_calendar import price_stays
+from .rule_index import PricingRuleIndex
+
+
+class PropertyOffer(NamedTuple):
+    """An available property and the final price of the requested stay."""
+    rental_property: int
+    name: Optional[str]
+    base_price: float
+    final_price: float
+
+
+def get_available_properties(check_in: date, check_out: date) -> QuerySet:
+    """RentalProperties with a base_price and without Bookings between check_in and check_out (both included).
+    The availability is a single anti-join against the overlapping Bookings. The rows are (id, name, base_price),
+    ordered by base_price so the pages can be taken before pricing them.
+    """
+    overlapping_bookings = get_overlapping_bookings(rental_property_id=OuterRef('pk'), check_in=check_in,
+                                                    check_out=check_out)
+    return (RentalProperty.objects.filter(base_price__isnull=False).filter(~Exists(overlapping_bookings))
+            .order_by('base_price', 'pk').values_list('pk', 'name', 'base_price'))
+
+
+def price_offers(properties: Iterable[tuple[int, Optional[str], float]], check_in: date, check_out: date,
+                 max_price: Optional[float] = None) -> list[PropertyOffer]:
+    """Price the stay in a page of available properties, with two queries whatever the size of the page.
+    Summary:
+        . Load the PricingRules of all of them that can apply to the stay with one query.
+        . Price the stay in every property with price_stay, the materialized nights of all of them with one query.
+        . Drop the ones above max_price.
+    Args:
+        properties: (id, name, base_price) of the properties, see get_available_properties.
+        check_in: First day of the stay.
+        check_out: Last day of the stay.
+        max_price: Optional price ceiling of the stay.
+    Returns:
+        List of PropertyOffers sorted by final_price.
+    """
+    properties = list(properties)
+    rule_indexes = PricingRuleIndex.for_properties(rental_property_ids=[pk for pk, _, _ in properties],
+                                                   check_in=check_in, check_out=check_out)
+    final_prices = price_stays(days_list=date_range(date_start=check_in, date_end=check_out),
+                               base_prices={pk: base_price for pk, _, base_price in properties},
+                               rule_indexes=rule_indexes)
+
+    offers = [PropertyOffer(rental_property=rental_property_id, name=name, base_price=base_price,
+                            final_price=final_prices[rental_property_id])
+              for rental_property_id, name, base_price in properties
+              if max_price is None or final_prices[rental_property_id] <= max_price]
+    offers.sort(key=lambda offer: offer.final_price)
+    return offers
@@ -0,0 +1,129 @@
+from datetime import date, timedelta
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+
+from .occupancy import get_occupied_days_mask
+from .rule_index import CompiledRule, PricingRuleIndex
+
+
+class StayQuote(NamedTuple):
+    """Price of a candidate stay. date_end is the last day of the stay, as in Booking."""
+    date_start: date
+    date_end: date
+    stay_length: int
+    final_price: float
+
+
+def get_day_price(base_price: float, rule: CompiledRule) -> float:
+    """Price of a day charged with a specific_day rule, same as apply_rules."""
+    if rule.fixed_price:
+        return rule.fixed_price
+    return base_price + ((base_price / 100) * rule.price_modifier)
+
+
+def build_nightly_prices(window_start: date, window_end: date, base_price: float,
+                         rule_index: PricingRuleIndex) -> tuple[np.ndarray, np.ndarray]:
+    """Build the nightly price array of a property for a window of days (both included).
+    Args:
+        window_start: First day of the window.
+        window_end: Last day of the window.
+        base_price: The base_price of the Property.
+        rule_index: PricingRuleIndex of the Property.
+    Returns:
+        special_prices: Price of each day charged with a specific_day rule, 0 for regular days.
+        is_special_day: True for the days charged with a specific_day rule.
+    """
+    total_days = (window_end - window_start).days + 1
+    special_prices = np.zeros(total_days, dtype=np.float64)
+    is_special_day = np.zeros(total_days, dtype=bool)
+
+    for rule in rule_index.special_day_rules(check_in=window_start, check_out=window_end):
+        position = (rule.specific_day - window_start).days
+        special_prices[position] = get_day_price(base_price=base_price, rule=rule)
+        is_special_day[position] = True
+
+    return special_prices, is_special_day
+
+
+def get_occupied_days(rental_property_id: int, window_start: date, window_end: date) -> np.ndarray:
+    """Flag the days of the window already taken by a Booking of the property, from the occupancy bitmaps."""
+    total_days = (window_end - window_start).days + 1
+    occupied_days = get_occupied_days_mask(rental_property_id=rental_property_id, check_in=window_start,
+                                           check_out=window_end)
+    flags = np.unpackbits(np.frombuffer(occupied_days.to_bytes((total_days + 7) // 8, 'little'), dtype=np.uint8),
+                          bitorder='little')
+    return flags[:total_days].astype(bool)
+
+
+def search_stay_quotes(window_start: date, window_end: date, stay_lengths: Iterable[int], base_price: float,
+                       rule_index: PricingRuleIndex, occupied_days: Optional[np.ndarray] = None,
+                       limit: Optional[int] = None) -> list[StayQuote]:
+    """Price every stay of the given lengths fitting inside the window, cheapest first.
+
+    The window is priced once and every candidate stay is answered with prefix sums, following the semantics of
+    get_rules_to_apply/apply_rules: specific_day days keep their own price, the remaining days are charged the
+    base_price with the min_stay_length modifier for that stay length, and a min_stay_length rule that also has a
+    specific_day overrides the price of that day.
+    Args:
+        window_start: First day a stay can start.
+        window_end: Last day a stay can end.
+        stay_lengths: Stay lengths (in days) to be priced.
+        base_price: The base_price of the Property.
+        rule_index: PricingRuleIndex of the Property.
+        occupied_days: Optional flags of days already booked, stays touching them are skipped.
+        limit: Optional max number of quotes to return.
+    Returns:
+        List of StayQuotes sorted by final_price and date_start.
+    """
+    special_prices, is_special_day = build_nightly_prices(window_start=window_start, window_end=window_end,
+                                                          base_price=base_price, rule_index=rule_index)
+    total_days = len(special_prices)
+    special_price_sums = np.concatenate(([0.0], np.cumsum(special_prices)))
+    special_day_counts = np.concatenate(([0], np.cumsum(is_special_day)))
+    if occupied_days is not None:
+        occupied_day_counts = np.concatenate(([0], np.cumsum(occupied_days)))
+
+    candidates = list()
+    for stay_length in sorted(set(stay_lengths)):
+        if stay_length < 1 or stay_length > total_days:
+            continue
+        starts = np.arange(total_days - stay_length + 1)
+        ends = starts + stay_length
+
+        price_modifier = 0.0
+        rule = rule_index.min_stay_length_rule(total_days=stay_length)
+        if rule:
+            price_modifier = rule.price_modifier or 0.0
+        regular_price = base_price + ((base_price / 100) * price_modifier)
+
+        special_days = special_day_counts[ends] - special_day_counts[starts]
+        prices = special_price_sums[ends] - special_price_sums[starts] + (stay_length - special_days) * regular_price
+
+        if rule and rule.specific_day and window_start <= rule.specific_day <= window_end:
+            position = (rule.specific_day - window_start).days
+            current_price = special_prices[position] if is_special_day[position] else regular_price
+            includes_day = (starts <= position) & (position < ends)
+            prices[includes_day] += get_day_price(base_price=base_price, rule=rule) - current_price
+
+        if occupied_days is not None:
+            available = occupied_day_counts[ends] == occupied_day_counts[starts]
+            starts, prices = starts[available], prices[available]
+
+        candidates.append((prices, starts, np.full(len(starts), stay_length)))
+
+    if not candidates:
+        return []
+
+    prices = np.concatenate([candidate[0] for candidate in candidates])
+    starts = np.concatenate([candidate[1] for candidate in candidates])
+    stay_lengths = np.concatenate([candidate[2] for candidate in candidates])
+    order = np.lexsort((starts, prices))
+    if limit is not None:
+        order = order[:limit]
+
+    return [StayQuote(date_start=window_start + timedelta(days=int(starts[i])),
+                      date_end=window_start + timedelta(days=int(starts[i] + stay_lengths[i] - 1)),
+                      stay_length=int(stay_lengths[i]),
+                      final_price=float(prices[i]))
+            for i in order]
@@ -0,0 +1,207 @@
+"""
+Re-pricing of future Bookings after their property's base_price or PricingRules changed.
+
+Bookings keep the final_price they were created with. This job streams the Bookings that have not started yet,
+property by property, prices them again in a process pool and writes back the prices that changed.
+"""
+import math
+from collections import defaultdict
+from datetime import date
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from core.db_router import use_primary
+from core.models import Booking, RentalProperty
+from .dates import date_range
+from .pricing_cache import PricingSnapshot, load_pricing_snapshot
+from .pricing_rules import calculate_final_price
+from .process_pool import imap_unordered
+
+REPRICE_CHUNK_SIZE = 5000
+"""REPRICE_CHUNK_SIZE: Bookings read per query and priced per task."""
+REPRICE_WRITE_BATCH_SIZE = 1000
+"""REPRICE_WRITE_BATCH_SIZE: Bookings per UPDATE statement."""
+MAX_REPORTED_CHANGES = 100
+
+
+class PriceChange(NamedTuple):
+    """New price of a Booking, for the dates it was priced with."""
+    booking: int
+    rental_property: int
+    date_start: date
+    date_end: date
+    previous_price: Optional[float]
+    final_price: float
+
+
+class PropertyRepricing(NamedTuple):
+    """Diff of the Bookings of a property: how many were checked and changed, and their totals before and after."""
+    rental_property: int
+    checked: int
+    changed: int
+    previous_total: float
+    final_total: float
+
+    def __add__(self, other: 'PropertyRepricing') -> 'PropertyRepricing':
+        return PropertyRepricing(rental_property=self.rental_property, checked=self.checked + other.checked,
+                                 changed=self.changed + other.changed,
+                                 previous_total=self.previous_total + other.previous_total,
+                                 final_total=self.final_total + other.final_total)
+
+
+class RepricingReport(NamedTuple):
+    """Totals of a re-pricing, the diff of each property and the first MAX_REPORTED_CHANGES changed Bookings.
+    written counts the changed Bookings actually saved, skipped the ones edited or deleted during the run, both 0
+    in a dry run."""
+    checked: int
+    changed: int
+    written: int
+    skipped: int
+    previous_total: float
+    final_total: float
+    properties: list[PropertyRepricing]
+    changes: list[PriceChange]
+    dry_run: bool
+
+
+def reprice_chunk(snapshot: PricingSnapshot, bookings: list[tuple]) -> tuple[PropertyRepricing, list[PriceChange]]:
+    """Price a chunk of Bookings of a property. Runs in the worker processes, without the database.
+    Args:
+        snapshot: PricingSnapshot of the property.
+        bookings: (id, date_start, date_end, final_price) of its Bookings.
+    Returns:
+        The diff of the chunk and the Bookings whose price changed. A Booking without final_price counts as 0 in
+        the totals and is always changed.
+    """
+    changes = list()
+    previous_total = final_total = 0.0
+    for booking_id, date_start, date_end, previous_price in bookings:
+        final_price = calculate_final_price(days_list=date_range(date_start=date_start, date_end=date_end),
+                                            base_price=snapshot.base_price, pricing_rules=snapshot.rules)
+        previous_total += previous_price or 0.0
+        final_total += final_price
+        if previous_price is None or not math.isclose(previous_price, final_price, rel_tol=1e-9, abs_tol=1e-6):
+            changes.append(PriceChange(booking=booking_id, rental_property=snapshot.rental_property_id,
+                                       date_start=date_start, date_end=date_end, previous_price=previous_price,
+                                       final_price=final_price))
+    diff = PropertyRepricing(rental_property=snapshot.rental_property_id, checked=len(bookings),
+                             changed=len(changes), previous_total=previous_total, final_total=final_total)
+    return diff, changes
+
+
+def iter_booking_chunks(bookings: QuerySet, chunk_size: int) -> Iterator[list[tuple]]:
+    """(id, date_start, date_end, final_price) of the Bookings, in chunks of consecutive ids.
+    Every chunk is its own keyset query, so no cursor stays open on the table while prices are written back.
+    """
+    last_id = 0
+    while True:
+        chunk = list(bookings.filter(id__gt=last_id).order_by('id')
+                     .values_list('id', 'date_start', 'date_end', 'final_price')[:chunk_size])
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1][0]
+
+
+def iter_chunks(rental_property_ids: Iterable[int], first_day: date,
+                chunk_size: int) -> Iterator[tuple[PricingSnapshot, list[tuple]]]:
+    """Tasks of reprice_chunk: the future Bookings of each property, with its current PricingSnapshot."""
+    for rental_property_id in rental_property_ids:
+        snapshot = load_pricing_snapshot(rental_property_id=rental_property_id)
+        bookings = Booking.objects.filter(rental_property=rental_property_id, date_start__gte=first_day)
+        for chunk in iter_booking_chunks(bookings=bookings, chunk_size=chunk_size):
+            yield snapshot, chunk
+
+
+def lock_unchanged_bookings(changes: list[PriceChange]) -> set[int]:
+    """Lock the Bookings of the changes until the end of the transaction, and return the ids of the ones that still
+    have the dates they were priced with. Bookings edited or deleted since they were read are left out."""
+    priced_dates = {change.booking: (change.date_start, change.date_end) for change in changes}
+    unchanged = set()
+    for position in range(0, len(changes), REPRICE_WRITE_BATCH_SIZE):
+        booking_ids = [change.booking for change in changes[position:position + REPRICE_WRITE_BATCH_SIZE]]
+        rows = (Booking.objects.select_for_update().filter(id__in=booking_ids)
+                .values_list('id', 'date_start', 'date_end'))
+        unchanged.update(booking_id for booking_id, date_start, date_end in rows
+                         if priced_dates[booking_id] == (date_start, date_end))
+    return unchanged
+
+
+def write_prices(changes: list[PriceChange]) -> int:
+    """Save the new prices of the Bookings whose dates did not change since they were priced, the others keep
+    their price until the next run. Bookings of a property mostly share a few prices (one per stay length and
+    season), so the Bookings of each shared price are updated with a single UPDATE ... WHERE id IN, and only the
+    prices of a single Booking go through bulk_update and its CASE per row, which is much slower to build and to
+    run. Returns the number of Bookings written.
+    """
+    with transaction.atomic():
+        unchanged = lock_unchanged_bookings(changes=changes)
+        booking_ids_by_price = defaultdict(list)
+        for change in changes:
+            if change.booking in unchanged:
+                booking_ids_by_price[change.final_price].append(change.booking)
+
+        single_prices = list()
+        for final_price, booking_ids in booking_ids_by_price.items():
+            if len(booking_ids) == 1:
+                single_prices.append(Booking(id=booking_ids[0], final_price=final_price))
+                continue
+            for position in range(0, len(booking_ids), REPRICE_WRITE_BATCH_SIZE):
+                Booking.objects.filter(id__in=booking_ids[position:position + REPRICE_WRITE_BATCH_SIZE]).update(
+                    final_price=final_price)
+        Booking.objects.bulk_update(single_prices, fields=['final_price'], batch_size=REPRICE_WRITE_BATCH_SIZE)
+    return len(unchanged)
+
+
+@use_primary()
+def reprice_bookings(rental_property_ids: Optional[Iterable[int]] = None, first_day: Optional[date] = None,
+                     dry_run: bool = False, workers: Optional[int] = None,
+                     chunk_size: int = REPRICE_CHUNK_SIZE) -> RepricingReport:
+    """Price the future Bookings again with the current base_price and PricingRules of their property.
+    Summary:
+        . Read the Bookings starting on or after first_day in chunks, partitioned by property.
+        . Price the chunks in a pool of worker processes.
+        . Write back the changed prices in batches as the chunks complete, unless dry_run.
+    Args:
+        rental_property_ids: The properties to re-price, all of them by default.
+        first_day: Bookings starting before it are left as they are, today by default.
+        dry_run: Only report the diff.
+        workers: Worker processes, see process_pool.get_workers.
+        chunk_size: Bookings per query and per task.
+    Returns:
+        RepricingReport with the totals, the diff of each property and a sample of the changed Bookings.
+    """
+    first_day = first_day or timezone.localdate()
+    rental_properties = RentalProperty.objects.filter(base_price__isnull=False).order_by('id')
+    if rental_property_ids is not None:
+        rental_properties = rental_properties.filter(id__in=list(rental_property_ids))
+
+    diffs = dict()
+    reported_changes = list()
+    pending_writes = list()
+    written = 0
+    tasks = iter_chunks(rental_property_ids=list(rental_properties.values_list('id', flat=True)),
+                        first_day=first_day, chunk_size=chunk_size)
+    for diff, changes in imap_unordered(func=reprice_chunk, tasks=tasks, workers=workers):
+        diffs[diff.rental_property] = diffs[diff.rental_property] + diff if diff.rental_property in diffs else diff
+        reported_changes.extend(changes[:MAX_REPORTED_CHANGES - len(reported_changes)])
+        if dry_run:
+            continue
+        pending_writes.extend(changes)
+        if len(pending_writes) >= chunk_size:
+            written += write_prices(changes=pending_writes)
+            pending_writes = list()
+    if pending_writes:
+        written += write_prices(changes=pending_writes)
+
+    properties = [diffs[rental_property_id] for rental_property_id in sorted(diffs)]
+    changed = sum(diff.changed for diff in properties)
+    return RepricingReport(checked=sum(diff.checked for diff in properties), changed=changed, written=written,
+                           skipped=0 if dry_run else changed - written,
+                           previous_total=sum(diff.previous_total for diff in properties),
+                           final_total=sum(diff.final_total for diff in properties),
+                           properties=properties, changes=sorted(reported_changes), dry_run=dry_run)
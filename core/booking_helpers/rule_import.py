@@ -0,0 +1,225 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from core.models import PricingRule, RentalProperty
+from core.signals import notify_pricing_changed
+from .exceptions import InvalidRuleImportError
+
+IMPORT_FIELDS = ('rental_property', 'price_modifier', 'min_stay_length', 'fixed_price', 'specific_day')
+IMPORT_BATCH_SIZE = 5000
+"""IMPORT_BATCH_SIZE: Rows written per INSERT statement when COPY is not available."""
+MAX_REPORTED_ERRORS = 100
+SKIP = 'skip'
+UPDATE = 'update'
+
+
+@lru_cache(maxsize=4096)
+def parse_day(value: str) -> date:
+    """Parse a day with the DATE_INPUT_FORMATS of the API, like a POST to pricing-rule/ does.
+    Sheets repeat the same days for every property, so parsed days are memoized.
+    """
+    for date_format in settings.REST_FRAMEWORK['DATE_INPUT_FORMATS']:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except (TypeError, ValueError):
+            continue
+    raise ValueError(f'{value!r} is not a date.')
+
+
+def parse_date(value) -> date:
+    if isinstance(value, date):
+        return value
+    return parse_day(value)
+
+
+FIELD_PARSERS = {
+    'rental_property': int,
+    'price_modifier': float,
+    'min_stay_length': int,
+    'fixed_price': float,
+    'specific_day': parse_date,
+}
+"""FIELD_PARSERS: Plain converters, DRF fields are too slow for sheets of hundreds of thousands of rows."""
+
+
+class ImportedRule(NamedTuple):
+    """Row of a sheet, PricingRule instances are only built for the rows written with the ORM."""
+    rental_property: int
+    price_modifier: Optional[float]
+    min_stay_length: Optional[int]
+    fixed_price: Optional[float]
+    specific_day: Optional[date]
+
+    def to_model(self, rule_id: Optional[int] = None) -> PricingRule:
+        return PricingRule(id=rule_id, rental_property_id=self.rental_property, price_modifier=self.price_modifier,
+                           min_stay_length=self.min_stay_length, fixed_price=self.fixed_price,
+                           specific_day=self.specific_day)
+
+
+class RuleImportResult(NamedTuple):
+    created: int
+    updated: int
+    skipped: int
+
+
+def iter_csv_records(lines: Iterable[str]) -> Iterator[dict]:
+    """Records of a CSV sheet, the header names the IMPORT_FIELDS it provides."""
+    return csv.DictReader(lines)
+
+
+def iter_jsonl_records(lines: Iterable[str]) -> Iterator[dict]:
+    """Records of a JSON Lines sheet, blank lines are ignored."""
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+IMPORT_FORMATS = {
+    'csv': iter_csv_records,
+    'jsonl': iter_jsonl_records,
+}
+
+
+def parse_rule(record: dict) -> ImportedRule:
+    """Build an ImportedRule from a record, empty values are null.
+    Raises:
+        ValueError: A value can not be parsed.
+    """
+    values = dict()
+    for field, parser in FIELD_PARSERS.items():
+        value = record.get(field)
+        try:
+            values[field] = None if value is None or value == '' else parser(value)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f'invalid {field} {value!r}.')
+    if values['rental_property'] is None:
+        raise ValueError('rental_property is required.')
+    return ImportedRule(**values)
+
+
+def parse_rules(records: Iterable[dict], using: str = 'default') -> list[ImportedRule]:
+    """Parse and validate every record, and check their properties exist with a single query.
+    Specific-day rules (no min_stay_length) are deduplicated on (rental_property, specific_day), the last row wins.
+    Raises:
+        InvalidRuleImportError: With the errors of the first MAX_REPORTED_ERRORS invalid rows.
+    """
+    rules = dict()
+    errors = list()
+    try:
+        for line, record in enumerate(records, start=1):
+            try:
+                rule = parse_rule(record=record)
+            except (ValueError, AttributeError) as error:
+                errors.append(f'Row {line}: {error}')
+                continue
+            rules[get_special_day_key(rule=rule) or line] = rule
+    except (ValueError, UnicodeDecodeError, csv.Error) as error:
+        errors.append(f'Unreadable file: {error}')
+
+    rental_property_ids = {rule.rental_property for rule in rules.values()}
+    existing_ids = set(RentalProperty.objects.using(using).filter(pk__in=rental_property_ids)
+                       .values_list('id', flat=True))
+    for rental_property_id in sorted(rental_property_ids - existing_ids):
+        errors.append(f'Property {rental_property_id} does not exist.')
+
+    if errors:
+        raise InvalidRuleImportError(errors[:MAX_REPORTED_ERRORS])
+    return list(rules.values())
+
+
+def get_special_day_key(rule: ImportedRule) -> Optional[tuple]:
+    if rule.specific_day is None or rule.min_stay_length is not None:
+        return None
+    return rule.rental_property, rule.specific_day
+
+
+def get_existing_special_days(rules: list[ImportedRule], using: str = 'default') -> dict[tuple, int]:
+    """Id of the existing specific-day rule of each (rental_property, specific_day) of the sheet, with one query.
+    When a day already has several rules, the one with the highest id is kept, as it is the one applied.
+    """
+    keys = {get_special_day_key(rule=rule) for rule in rules} - {None}
+    if not keys:
+        return dict()
+    days = [specific_day for _, specific_day in keys]
+    rows = PricingRule.objects.using(using).filter(
+        rental_property__in={rental_property_id for rental_property_id, _ in keys},
+        specific_day__range=(min(days), max(days)), min_stay_length__isnull=True,
+    ).order_by('id').values_list('id', 'rental_property', 'specific_day')
+    return {(rental_property_id, specific_day): rule_id for rule_id, rental_property_id, specific_day in rows
+            if (rental_property_id, specific_day) in keys}
+
+
+def copy_rules(rules: list[ImportedRule], using: str) -> bool:
+    """Write the rules with PostgreSQL COPY. Returns False when the database does not support it."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(['' if value is None else value for value in rule] for rule in rules)
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        raw_cursor = cursor.cursor
+        if not hasattr(raw_cursor, 'copy_expert'):
+            return False
+        columns = ', '.join(connection.ops.quote_name(PricingRule._meta.get_field(field).column)
+                            for field in IMPORT_FIELDS)
+        raw_cursor.copy_expert(
+            f'COPY {connection.ops.quote_name(PricingRule._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)',
+            buffer)
+    return True
+
+
+def import_pricing_rules(records: Iterable[dict], on_conflict: str = SKIP, using: str = 'default') -> RuleImportResult:
+    """Import a sheet of PricingRules in a single transaction.
+    Summary:
+        . Parse and validate all the records, nothing is written if any of them is invalid.
+        . Look up the existing specific-day rules of the sheet with one query.
+        . Skip or update the rules of days that already have one, according to on_conflict.
+        . Write the new rules with COPY on PostgreSQL, or bulk_create in batches elsewhere.
+        . Notify pricing_changed, bulk writes do not send the model signals.
+    Args:
+        records: Dicts with the IMPORT_FIELDS, from IMPORT_FORMATS.
+        on_conflict: SKIP or UPDATE the existing rule of a (rental_property, specific_day).
+        using: Database alias.
+    Returns:
+        RuleImportResult with the number of created, updated and skipped rules.
+    Raises:
+        InvalidRuleImportError: Some records are invalid.
+    """
+    rules = parse_rules(records=records, using=using)
+
+    with transaction.atomic(using=using):
+        existing = get_existing_special_days(rules=rules, using=using)
+        new_rules, updated_rules, skipped = list(), list(), 0
+        for rule in rules:
+            rule_id = existing.get(get_special_day_key(rule=rule))
+            if rule_id is None:
+                new_rules.append(rule)
+            elif on_conflict == UPDATE:
+                updated_rules.append(rule.to_model(rule_id=rule_id))
+            else:
+                skipped += 1
+
+        if new_rules and not copy_rules(rules=new_rules, using=using):
+            PricingRule.objects.using(using).bulk_create([rule.to_model() for rule in new_rules],
+                                                         batch_size=IMPORT_BATCH_SIZE)
+        if updated_rules:
+            PricingRule.objects.using(using).bulk_update(updated_rules, fields=['price_modifier', 'fixed_price'],
+                                                         batch_size=IMPORT_BATCH_SIZE)
+
+        notify_pricing_changed(rental_property_ids={rule.rental_property for rule in new_rules}
+                               | {rule.rental_property_id for rule in updated_rules},
+                               days={rule.specific_day for rule in new_rules if rule.specific_day}
+                               | {rule.specific_day for rule in updated_rules})
+
+    return RuleImportResult(created=len(new_rules), updated=len(updated_rules), skipped=skipped)
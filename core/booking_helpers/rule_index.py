@@ -0,0 +1,127 @@
+from bisect import bisect_left, bisect_right
+from datetime import date
+from types import MappingProxyType
+from typing import Iterable, NamedTuple, Optional
+
+from django.db.models import Q
+
+from core.models import PricingRule
+
+
+class CompiledRule(NamedTuple):
+    """Compact, read-only copy of a PricingRule holding only the fields the pricing engine needs."""
+    id: Optional[int]
+    price_modifier: Optional[float]
+    min_stay_length: Optional[int]
+    fixed_price: Optional[float]
+    specific_day: Optional[date]
+
+    @classmethod
+    def from_model(cls, rule: PricingRule) -> 'CompiledRule':
+        specific_day = rule.specific_day
+        if hasattr(specific_day, 'date'):
+            specific_day = specific_day.date()
+        return cls(rule.id, rule.price_modifier, rule.min_stay_length, rule.fixed_price, specific_day)
+
+
+RULE_FIELDS = CompiledRule._fields
+
+
+class PricingRuleIndex:
+    """Immutable per-property index of PricingRules. More info at: README.md:MOST RELEVANT RULE
+
+    . Specific day rules are keyed by date. When several rules share a date the latest one (highest id) wins.
+    . Min stay length rules are stored as tiers sorted by min_stay_length, each tier holding the most relevant
+      rule (biggest absolute price_modifier, first created on ties) among all rules with a lower or equal
+      min_stay_length, so the rule for a stay is a single bisect.
+    """
+    __slots__ = ('_special_days', '_special_days_sorted', '_tier_lengths', '_tier_rules')
+
+    def __init__(self, rules: Iterable[CompiledRule]):
+        special_days = dict()
+        min_stay_length_rules = list()
+
+        for position, rule in enumerate(sorted(rules, key=lambda rule: (rule.id is None, rule.id or 0))):
+            if rule.min_stay_length is not None:
+                min_stay_length_rules.append((abs(rule.price_modifier or 0), -position, rule))
+            elif rule.specific_day is not None:
+                special_days[rule.specific_day] = rule
+
+        tier_lengths = list()
+        tier_rules = list()
+        best = None
+        for candidate in sorted(min_stay_length_rules, key=lambda candidate: candidate[2].min_stay_length):
+            if best is None or candidate[:2] > best[:2]:
+                best = candidate
+            min_stay_length = candidate[2].min_stay_length
+            if tier_lengths and tier_lengths[-1] == min_stay_length:
+                tier_rules[-1] = best[2]
+            else:
+                tier_lengths.append(min_stay_length)
+                tier_rules.append(best[2])
+
+        self._special_days = MappingProxyType(special_days)
+        self._special_days_sorted = tuple(sorted(special_days))
+        self._tier_lengths = tuple(tier_lengths)
+        self._tier_rules = tuple(tier_rules)
+
+    def __getstate__(self) -> tuple:
+        return dict(self._special_days), self._special_days_sorted, self._tier_lengths, self._tier_rules
+
+    def __setstate__(self, state: tuple) -> None:
+        special_days, self._special_days_sorted, self._tier_lengths, self._tier_rules = state
+        self._special_days = MappingProxyType(special_days)
+
+    @classmethod
+    def from_rules(cls, pricing_rules: Iterable[PricingRule]) -> 'PricingRuleIndex':
+        """Compile an index from PricingRule instances (or already compiled rules)."""
+        return cls(rule if isinstance(rule, CompiledRule) else CompiledRule.from_model(rule)
+                   for rule in pricing_rules)
+
+    @classmethod
+    def for_property(cls, rental_property_id: int) -> 'PricingRuleIndex':
+        """Compile the index of a RentalProperty with a single query, without instantiating models."""
+        rows = PricingRule.objects.filter(rental_property=rental_property_id).values_list(*RULE_FIELDS)
+        return cls(CompiledRule._make(row) for row in rows)
+
+    @classmethod
+    async def afor_property(cls, rental_property_id: int) -> 'PricingRuleIndex':
+        """Async version of for_property, with the async ORM."""
+        rows = PricingRule.objects.filter(rental_property=rental_property_id).values_list(*RULE_FIELDS)
+        return cls([CompiledRule._make(row) async for row in rows])
+
+    @classmethod
+    def for_properties(cls, rental_property_ids: Iterable[int], check_in: Optional[date] = None,
+                       check_out: Optional[date] = None) -> dict[int, 'PricingRuleIndex']:
+        """Compile the indexes of several RentalProperties with a single query.
+        Args:
+            rental_property_ids: The properties, every one of them gets an index, even if it has no rules.
+            check_in: Optional first day of the stays to be priced, to skip the specific_day rules before it.
+            check_out: Optional last day of the stays to be priced, to skip the specific_day rules after it.
+        Returns:
+            PricingRuleIndex of each property.
+        """
+        rules = {rental_property_id: list() for rental_property_id in rental_property_ids}
+        rows = PricingRule.objects.filter(rental_property__in=rules)
+        if check_in and check_out:
+            rows = rows.filter(Q(min_stay_length__isnull=False) | Q(specific_day__range=(check_in, check_out)))
+        for rental_property_id, *row in rows.values_list('rental_property', *RULE_FIELDS):
+            rules[rental_property_id].append(CompiledRule._make(row))
+        return {rental_property_id: cls(property_rules) for rental_property_id, property_rules in rules.items()}
+
+    @property
+    def special_days(self) -> MappingProxyType:
+        return self._special_days
+
+    def special_day_rules(self, check_in: date, check_out: date) -> list[CompiledRule]:
+        """Specific day rules between check_in and check_out (both included), sorted by date."""
+        start = bisect_left(self._special_days_sorted, check_in)
+        end = bisect_right(self._special_days_sorted, check_out)
+        return [self._special_days[day] for day in self._special_days_sorted[start:end]]
+
+    def min_stay_length_rule(self, total_days: int) -> Optional[CompiledRule]:
+        """Most relevant min stay length rule for a stay of total_days, if any."""
+        position = bisect_right(self._tier_lengths, total_days)
+        if not position:
+            return None
+        return self._tier_rules[position - 1]
@@ -0,0 +1,167 @@
+"""
+What-if simulation of proposed base prices and PricingRules against the stored Bookings.
+
+Every Booking in the window is priced again with the proposed rules of its property, in the process pool of the
+re-pricing job, and compared with the final_price it was booked at. Nothing is written to the database.
+"""
+from datetime import date
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from core.models import Booking, RentalProperty
+from .dates import date_range
+from .exceptions import InvalidPricingProposalError
+from .pricing_cache import PricingSnapshot
+from .pricing_rules import calculate_final_price
+from .process_pool import imap_unordered
+from .repricing import REPRICE_CHUNK_SIZE, iter_booking_chunks
+from .rule_import import MAX_REPORTED_ERRORS, parse_rule
+from .rule_index import CompiledRule, PricingRuleIndex
+
+
+class PropertySimulation(NamedTuple):
+    """Revenue of the Bookings of a property, as booked and with the proposed pricing."""
+    rental_property: int
+    bookings: int
+    nights: int
+    current_revenue: float
+    simulated_revenue: float
+
+    @property
+    def difference(self) -> float:
+        return self.simulated_revenue - self.current_revenue
+
+    def __add__(self, other: 'PropertySimulation') -> 'PropertySimulation':
+        return PropertySimulation(rental_property=self.rental_property, bookings=self.bookings + other.bookings,
+                                  nights=self.nights + other.nights,
+                                  current_revenue=self.current_revenue + other.current_revenue,
+                                  simulated_revenue=self.simulated_revenue + other.simulated_revenue)
+
+
+class SimulationReport(NamedTuple):
+    bookings: int
+    current_revenue: float
+    simulated_revenue: float
+    properties: list[PropertySimulation]
+
+    @property
+    def difference(self) -> float:
+        return self.simulated_revenue - self.current_revenue
+
+
+def parse_proposals(proposals: Iterable[dict]) -> list[PricingSnapshot]:
+    """Build the PricingSnapshot proposed for each property, and check the properties exist with a single query.
+    Args:
+        proposals: Dicts with the rental_property, an optional base_price (the current one by default) and the
+            optional rules replacing its current PricingRules (the current ones by default, an empty list to drop
+            them), with the fields and formats of a rule import.
+    Returns:
+        The proposed PricingSnapshots, the rules of each property are applied in the order they are listed.
+    Raises:
+        InvalidPricingProposalError: With the first MAX_REPORTED_ERRORS errors.
+    """
+    proposed = dict()
+    errors = list()
+    for position, proposal in enumerate(proposals, start=1):
+        try:
+            rental_property_id = int(proposal['rental_property'])
+            base_price = proposal.get('base_price')
+            base_price = None if base_price is None or base_price == '' else float(base_price)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            errors.append(f'Proposal {position}: rental_property is required, it and base_price must be numbers.')
+            continue
+
+        if proposal.get('rules') is None:
+            proposed[rental_property_id] = (base_price, None)
+            continue
+        rules = list()
+        for rule_position, record in enumerate(proposal['rules'], start=1):
+            try:
+                rule = parse_rule(record=dict(record, rental_property=rental_property_id))
+            except (TypeError, ValueError) as error:
+                errors.append(f'Proposal {position}, rule {rule_position}: {error}')
+                continue
+            rules.append(CompiledRule(rule_position, rule.price_modifier, rule.min_stay_length, rule.fixed_price,
+                                      rule.specific_day))
+        proposed[rental_property_id] = (base_price, PricingRuleIndex(rules))
+
+    base_prices = dict(RentalProperty.objects.filter(pk__in=proposed).values_list('id', 'base_price'))
+    current_rules = PricingRuleIndex.for_properties(
+        rental_property_ids=[rental_property_id for rental_property_id, (_, rule_index) in proposed.items()
+                             if rule_index is None and rental_property_id in base_prices])
+    snapshots = list()
+    for rental_property_id, (base_price, rule_index) in sorted(proposed.items()):
+        if rental_property_id not in base_prices:
+            errors.append(f'Property {rental_property_id} does not exist.')
+        elif base_price is None and base_prices[rental_property_id] is None:
+            errors.append(f'Property {rental_property_id} has no base_price.')
+        else:
+            snapshots.append(PricingSnapshot(rental_property_id=rental_property_id,
+                                             base_price=base_price if base_price is not None
+                                             else base_prices[rental_property_id],
+                                             rules=rule_index if rule_index is not None
+                                             else current_rules[rental_property_id]))
+
+    if errors:
+        raise InvalidPricingProposalError(errors[:MAX_REPORTED_ERRORS])
+    return snapshots
+
+
+def simulate_chunk(snapshot: PricingSnapshot, bookings: list[tuple]) -> PropertySimulation:
+    """Revenue of a chunk of Bookings of a property with the proposed pricing. Runs in the worker processes.
+    Args:
+        snapshot: The proposed PricingSnapshot of the property.
+        bookings: (id, date_start, date_end, final_price) of its Bookings, a null final_price counts as 0.
+    """
+    nights = 0
+    current_revenue = simulated_revenue = 0.0
+    for _, date_start, date_end, final_price in bookings:
+        days_list = date_range(date_start=date_start, date_end=date_end)
+        nights += len(days_list)
+        current_revenue += final_price or 0.0
+        simulated_revenue += calculate_final_price(days_list=days_list, base_price=snapshot.base_price,
+                                                   pricing_rules=snapshot.rules)
+    return PropertySimulation(rental_property=snapshot.rental_property_id, bookings=len(bookings), nights=nights,
+                              current_revenue=current_revenue, simulated_revenue=simulated_revenue)
+
+
+def iter_chunks(snapshots: list[PricingSnapshot], first_day: Optional[date], last_day: Optional[date],
+                chunk_size: int) -> Iterator[tuple[PricingSnapshot, list[tuple]]]:
+    """Tasks of simulate_chunk: the Bookings of each property starting in the window."""
+    for snapshot in snapshots:
+        bookings = Booking.objects.filter(rental_property=snapshot.rental_property_id)
+        if first_day:
+            bookings = bookings.filter(date_start__gte=first_day)
+        if last_day:
+            bookings = bookings.filter(date_start__lte=last_day)
+        for chunk in iter_booking_chunks(bookings=bookings, chunk_size=chunk_size):
+            yield snapshot, chunk
+
+
+def simulate_pricing(proposals: Iterable[dict], first_day: Optional[date] = None, last_day: Optional[date] = None,
+                     workers: Optional[int] = None, chunk_size: int = REPRICE_CHUNK_SIZE) -> SimulationReport:
+    """Compare the revenue of the Bookings of some properties with the revenue they would have with other rules.
+    Args:
+        proposals: The proposed pricing of each property, see parse_proposals.
+        first_day: Only Bookings starting on or after it, all of them by default.
+        last_day: Only Bookings starting on or before it, all of them by default.
+        workers: Worker processes, see process_pool.get_workers.
+        chunk_size: Bookings per query and per task.
+    Returns:
+        SimulationReport with the revenue of each property as booked and as simulated.
+    Raises:
+        InvalidPricingProposalError: Some proposals are invalid.
+    """
+    snapshots = parse_proposals(proposals=proposals)
+    totals = {snapshot.rental_property_id: PropertySimulation(rental_property=snapshot.rental_property_id,
+                                                              bookings=0, nights=0, current_revenue=0.0,
+                                                              simulated_revenue=0.0)
+              for snapshot in snapshots}
+    tasks = iter_chunks(snapshots=snapshots, first_day=first_day, last_day=last_day, chunk_size=chunk_size)
+    for simulation in imap_unordered(func=simulate_chunk, tasks=tasks, workers=workers):
+        totals[simulation.rental_property] += simulation
+
+    properties = [totals[rental_property_id] for rental_property_id in sorted(totals)]
+    return SimulationReport(bookings=sum(simulation.bookings for simulation in properties),
+                            current_revenue=sum(simulation.current_revenue for simulation in properties),
+                            simulated_revenue=sum(simulation.simulated_revenue for simulation in properties),
+                            properties=properties)
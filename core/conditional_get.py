@@ -0,0 +1,86 @@
+"""
+Conditional GET of the property and pricing-rule resources.
+
+Every write of a RentalProperty or of its PricingRules bumps the version and modified_at of the property (see
+core.signals), so the state of a resource is known from a single small query on the properties: clients sending
+back its ETag (If-None-Match) get a 304 without any row being loaded or serialized.
+"""
+import hashlib
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from django.db.models import Count, Max, QuerySet, Sum
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import condition
+
+from core.models import RentalProperty
+
+
+class ChangeState(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[datetime]
+
+
+def get_etag(key: str) -> str:
+    return f'"{hashlib.md5(key.encode()).hexdigest()}"'
+
+
+def get_property_state(rental_property_id: int, variant: str = '') -> ChangeState:
+    """State of a property, None values when it does not exist.
+    Args:
+        rental_property_id: The property.
+        variant: What else the response depends on, e.g. the negotiated media type.
+    """
+    row = RentalProperty.objects.filter(pk=rental_property_id).values_list('version', 'modified_at').first()
+    if row is None:
+        return ChangeState(etag=None, last_modified=None)
+    version, modified_at = row
+    return ChangeState(etag=get_etag(f'{rental_property_id}:{version}:{modified_at.timestamp()}:{variant}'),
+                       last_modified=modified_at)
+
+
+def get_properties_state(properties: QuerySet, variant: str = '') -> ChangeState:
+    """State of a set of properties, or of their PricingRules, with one aggregate query.
+    Adding, changing and deleting a property or one of its rules changes the count, the versions or the last
+    modification, so one of them always moves.
+    Args:
+        properties: The (filtered) properties.
+        variant: What else the response depends on, e.g. the negotiated media type and the query string.
+    """
+    state = properties.aggregate(count=Count('id'), versions=Sum('version'), last_modified=Max('modified_at'))
+    last_modified = state['last_modified']
+    key = f'{state["count"]}:{state["versions"]}:{last_modified.timestamp() if last_modified else None}:{variant}'
+    return ChangeState(etag=get_etag(key), last_modified=last_modified)
+
+
+class ConditionalGetMixin:
+    """Answer GET with ETag and Last-Modified, or 304 when the client has the current state, with Django's
+    condition decorator. Views implement get_change_state, computed once per request.
+    Last-Modified has a granularity of one second, two changes within the same second leave it unchanged, so it is
+    only sent along with the ETag, for information: the 304 is decided on If-None-Match alone, If-Modified-Since is
+    ignored.
+    """
+
+    def get_change_state(self, request) -> ChangeState:
+        raise NotImplementedError
+
+    def get_cached_change_state(self, request) -> ChangeState:
+        if not hasattr(self, '_change_state'):
+            self._change_state = self.get_change_state(request)
+        return self._change_state
+
+    def get_variant(self, request) -> str:
+        """The negotiated media type, the browsable API and the JSON of a resource are different representations
+        with different ETags."""
+        return request.accepted_media_type
+
+    def get(self, request, *args, **kwargs):
+        response = condition(
+            etag_func=lambda request, *args, **kwargs: self.get_cached_change_state(request).etag,
+        )(super().get)(request, *args, **kwargs)
+        last_modified = self.get_cached_change_state(request).last_modified
+        if last_modified is not None and response.has_header('ETag'):
+            response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+        patch_vary_headers(response, ('Accept',))
+        return response
@@ -0,0 +1,93 @@
+"""
+Primary/replica routing of the database queries.
+
+Writes always go to the primary (the default alias). Reads go to the REPLICA_DATABASE alias, except when they
+must see the latest data:
+    . Inside a transaction of the primary, e.g. the availability check and the pricing of a new Booking, or the
+      refresh of the price calendar.
+    . In the requests with an unsafe method, and in the requests of a client for REPLICA_PIN_SECONDS after its
+      last write (read-your-writes), see primary_pinning_middleware.
+    . In the blocks wrapped with use_primary.
+"""
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpRequest, HttpResponse
+from django.utils.decorators import sync_and_async_middleware
+
+PRIMARY_COOKIE = 'use_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+
+
+@contextmanager
+def use_primary() -> Iterator[None]:
+    """Read from the primary in the block, for reads that decide what is written. Also usable as a decorator."""
+    token = pinned_to_primary.set(True)
+    try:
+        yield
+    finally:
+        pinned_to_primary.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Database router sending the reads to the replica, when one is configured, and everything else to the
+    primary."""
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        replica = settings.REPLICA_DATABASE
+        if not replica or pinned_to_primary.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        databases = {DEFAULT_DB_ALIAS, settings.REPLICA_DATABASE}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db: str, app_label: str, model_name: Optional[str] = None, **hints) -> Optional[bool]:
+        """The replica gets its schema from the primary."""
+        if settings.REPLICA_DATABASE and db == settings.REPLICA_DATABASE:
+            return False
+        return None
+
+
+def must_use_primary(request: HttpRequest) -> bool:
+    return request.method not in SAFE_METHODS or PRIMARY_COOKIE in request.COOKIES
+
+
+def pin_client(request: HttpRequest, response: HttpResponse) -> None:
+    """After a write, send the next requests of the client to the primary until the replica has caught up."""
+    if request.method not in SAFE_METHODS and settings.REPLICA_DATABASE:
+        response.set_cookie(PRIMARY_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+
+
+@sync_and_async_middleware
+def primary_pinning_middleware(get_response):
+    """Serve the writes, and the reads of a client that just wrote, from the primary."""
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request: HttpRequest) -> HttpResponse:
+            if not must_use_primary(request=request):
+                return await get_response(request)
+            with use_primary():
+                response = await get_response(request)
+            pin_client(request=request, response=response)
+            return response
+    else:
+        def middleware(request: HttpRequest) -> HttpResponse:
+            if not must_use_primary(request=request):
+                return get_response(request)
+            with use_primary():
+                response = get_response(request)
+            pin_client(request=request, response=response)
+            return response
+    return middleware
@@ -0,0 +1,110 @@
+"""
+Fast path of the list endpoints: rows are read with values_list() and turned into dicts by a RowFormatter
+compiled once per serializer and set of fields, instead of building model instances and running the
+to_representation of every ModelSerializer field on every row. The output is the same as the serializer's.
+"""
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
+
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+FIELDS_PARAM = 'fields'
+PASS_THROUGH_FIELDS = (serializers.BooleanField, serializers.CharField, serializers.FloatField,
+                       serializers.IntegerField, serializers.PrimaryKeyRelatedField)
+"""PASS_THROUGH_FIELDS: Serializer fields whose representation is the value read from the database."""
+DATE_DIRECTIVES = {'%d': '{0.day:02d}', '%m': '{0.month:02d}', '%Y': '{0.year}', '%%': '%'}
+
+
+def compile_date_format(date_format: Optional[str]) -> Callable[[date], str]:
+    """Formatter of dates equivalent to a DRF DateField with this format, with str.format templates for the
+    usual directives, which is several times faster than strftime."""
+    if date_format is None:
+        return lambda value: value
+    if date_format.lower() == ISO_8601:
+        return date.isoformat
+    template = list()
+    for part in re.split('(%.)', date_format):
+        if part.startswith('%') and len(part) == 2:
+            if part not in DATE_DIRECTIVES:
+                return lambda value: value.strftime(date_format)
+            template.append(DATE_DIRECTIVES[part])
+        else:
+            template.append(part.replace('{', '{{').replace('}', '}}'))
+    return ''.join(template).format
+
+
+def skip_none(convert: Callable) -> Callable:
+    return lambda value: None if value is None else convert(value)
+
+
+class RowFormatter:
+    """Turns the rows of values_list(*columns, named=True) into the dicts a serializer would output for the
+    given fields. columns also holds the ordering fields the pagination needs, even when they are not output."""
+
+    def __init__(self, serializer_class: type, fields: tuple[str, ...], ordering: tuple[str, ...]):
+        serializer_fields = serializer_class().fields
+        self.columns = tuple(dict.fromkeys(fields + tuple(field.lstrip('-') for field in ordering)))
+        self.converters = list()
+        for position, name in enumerate(fields):
+            field = serializer_fields[name]
+            if isinstance(field, serializers.DateField):
+                output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+                convert = skip_none(compile_date_format(date_format=output_format))
+            elif isinstance(field, PASS_THROUGH_FIELDS):
+                convert = None
+            else:
+                convert = skip_none(field.to_representation)
+            self.converters.append((name, position, convert))
+
+    def format_rows(self, rows: Iterable[tuple]) -> list[dict]:
+        converters = self.converters
+        return [{name: row[position] if convert is None else convert(row[position])
+                 for name, position, convert in converters} for row in rows]
+
+
+@lru_cache(maxsize=256)
+def get_row_formatter(serializer_class: type, fields: tuple[str, ...], ordering: tuple[str, ...],
+                      date_format: Optional[str]) -> RowFormatter:
+    """RowFormatters are compiled once per serializer, fields, ordering and DATE_FORMAT."""
+    return RowFormatter(serializer_class=serializer_class, fields=fields, ordering=ordering)
+
+
+def get_requested_fields(request: Request, available_fields: Iterable[str]) -> tuple[str, ...]:
+    """Sparse fieldset of ?fields=a,b, all the fields of the serializer by default.
+    Raises:
+        ValidationError: Some requested fields do not exist.
+    """
+    available_fields = tuple(available_fields)
+    requested = request.query_params.get(FIELDS_PARAM)
+    if not requested:
+        return available_fields
+    fields = tuple(dict.fromkeys(field.strip() for field in requested.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in available_fields]
+    if unknown or not fields:
+        raise serializers.ValidationError({FIELDS_PARAM: f'Unknown fields {", ".join(unknown)}, use some of '
+                                                         f'{", ".join(available_fields)}.'})
+    return fields
+
+
+class FastListMixin:
+    """List with values_list() rows and a compiled RowFormatter, with the filters and pagination of the view.
+    Only for serializers of plain model fields, as the ModelSerializers of core.serializer."""
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        fields = get_requested_fields(request=request, available_fields=serializer_class().fields)
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        ordering = (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        formatter = get_row_formatter(serializer_class=serializer_class, fields=fields, ordering=ordering,
+                                      date_format=api_settings.DATE_FORMAT)
+
+        rows = self.filter_queryset(self.get_queryset()).values_list(*formatter.columns, named=True)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(formatter.format_rows(rows=page))
+        return Response(formatter.format_rows(rows=rows))
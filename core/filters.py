@@ -0,0 +1,11 @@
+from django_filters import rest_framework as filters
+
+from .models import Booking
+
+
+class BookingFilter(filters.FilterSet):
+    """Filters of the Booking list, shared by the list view, the export view and the export_bookings command."""
+
+    class Meta:
+        model = Booking
+        fields = ('id', 'rental_property', 'date_start', 'date_end', 'final_price')
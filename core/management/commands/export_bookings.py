@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.booking_helpers.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_bookings
+from core.filters import BookingFilter
+from core.models import Booking
+
+
+class Command(BaseCommand):
+    help = 'Stream Bookings as CSV or JSON Lines, with the same filters as the Booking list endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='export_format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help='File to write to, stdout by default.')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument('--filter', dest='filters', action='append', default=list(), metavar='FIELD=VALUE',
+                            help=f'Filter of the Booking list, one of {", ".join(BookingFilter.Meta.fields)}. '
+                                 f'Can be repeated.')
+
+    def handle(self, *args, export_format, output, chunk_size, filters, **options):
+        data = dict()
+        for booking_filter in filters:
+            field, separator, value = booking_filter.partition('=')
+            if not separator or field not in BookingFilter.Meta.fields:
+                raise CommandError(f'Invalid filter {booking_filter}.')
+            data[field] = value
+
+        filterset = BookingFilter(data=data, queryset=Booking.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        lines = export_bookings(bookings=filterset.qs, export_format=export_format, chunk_size=chunk_size)
+        if output is None:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(output, 'w', newline='') as export_file:
+            export_file.writelines(lines)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.booking_helpers.exceptions import InvalidRuleImportError
+from core.booking_helpers.rule_import import IMPORT_FORMATS, SKIP, UPDATE, import_pricing_rules
+
+
+class Command(BaseCommand):
+    help = 'Import PricingRules from CSV or JSON Lines files, in a single transaction.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with a header) or JSON Lines file.')
+        parser.add_argument('--format', dest='import_format', choices=sorted(IMPORT_FORMATS),
+                            help='Format of the file, its extension by default.')
+        parser.add_argument('--on-conflict', choices=(SKIP, UPDATE), default=SKIP,
+                            help='What to do with rules of a (rental_property, specific_day) that already has one.')
+
+    def handle(self, *args, path, import_format, on_conflict, **options):
+        import_format = import_format or path.rpartition('.')[2].lower()
+        if import_format not in IMPORT_FORMATS:
+            raise CommandError(f'Unknown format of {path}, use --format.')
+
+        with open(path, encoding='utf-8-sig', newline='') as sheet:
+            try:
+                result = import_pricing_rules(records=IMPORT_FORMATS[import_format](sheet), on_conflict=on_conflict)
+            except InvalidRuleImportError as error:
+                raise CommandError('\n'.join(error.errors))
+
+        self.stdout.write(f'Created {result.created}, updated {result.updated} and skipped {result.skipped} rules.')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.booking_helpers.price_calendar import extend_price_points, refresh_price_points
+from core.models import RentalProperty
+
+
+class Command(BaseCommand):
+    help = ('Roll the materialized price calendar forward to today plus PRICE_CALENDAR_DAYS, run it daily. '
+            'Changes of rules and base prices are applied as they happen, --rebuild recomputes every night.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--property', dest='rental_property_ids', type=int, action='append',
+                            help='Refresh only this property, can be repeated.')
+        parser.add_argument('--rebuild', action='store_true', help='Recompute every night of the horizon.')
+
+    def handle(self, *args, rental_property_ids, rebuild, **options):
+        rental_properties = RentalProperty.objects.filter(base_price__isnull=False).order_by('id')
+        if rental_property_ids:
+            rental_properties = rental_properties.filter(id__in=rental_property_ids)
+
+        refresh = refresh_price_points if rebuild else extend_price_points
+        written = 0
+        for rental_property_id in rental_properties.values_list('id', flat=True):
+            written += refresh(rental_property_id=rental_property_id)
+        self.stdout.write(f'Wrote {written} price points.')
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.booking_helpers.repricing import REPRICE_CHUNK_SIZE, reprice_bookings
+
+
+class Command(BaseCommand):
+    help = ('Price the Bookings that have not started yet again with the current base_price and PricingRules '
+            'of their property, and report what changed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--property', dest='rental_property_ids', type=int, action='append',
+                            help='Re-price only the Bookings of this property, can be repeated.')
+        parser.add_argument('--from', dest='first_day', help='First date_start to re-price (YYYY-MM-DD), today '
+                                                             'by default.')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without saving them.')
+        parser.add_argument('--workers', type=int, help='Worker processes, REPRICING_WORKERS by default.')
+        parser.add_argument('--chunk-size', type=int, default=REPRICE_CHUNK_SIZE)
+
+    def handle(self, *args, rental_property_ids, first_day, dry_run, workers, chunk_size, **options):
+        try:
+            first_day = datetime.strptime(first_day, '%Y-%m-%d').date() if first_day else None
+        except ValueError:
+            raise CommandError(f'Invalid date {first_day}, use YYYY-MM-DD.')
+
+        report = reprice_bookings(rental_property_ids=rental_property_ids, first_day=first_day, dry_run=dry_run,
+                                  workers=workers, chunk_size=chunk_size)
+
+        for diff in report.properties:
+            if diff.changed:
+                self.stdout.write(f'Property {diff.rental_property}: {diff.changed} of {diff.checked} bookings, '
+                                  f'{diff.previous_total:.2f} -> {diff.final_total:.2f}')
+        if dry_run:
+            self.stdout.write(f'Would change {report.changed} of {report.checked} bookings, '
+                              f'{report.previous_total:.2f} -> {report.final_total:.2f}.')
+            return
+        self.stdout.write(f'Changed {report.written} of {report.checked} bookings, {report.skipped} skipped because '
+                          f'they were edited during the run, {report.previous_total:.2f} -> '
+                          f'{report.final_total:.2f}.')
@@ -0,0 +1,51 @@
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.booking_helpers.exceptions import InvalidPricingProposalError
+from core.booking_helpers.repricing import REPRICE_CHUNK_SIZE
+from core.booking_helpers.simulation import simulate_pricing
+
+
+def parse_option_date(value: str):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        raise CommandError(f'Invalid date {value}, use YYYY-MM-DD.')
+
+
+class Command(BaseCommand):
+    help = ('Compare the revenue of the stored Bookings with their revenue under proposed base prices and '
+            'PricingRules. Nothing is saved.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSON file with a list of {rental_property, base_price, rules}, '
+                                         'see POST pricing-rule/simulate/. Without rules the current '
+                                         'ones are kept.')
+        parser.add_argument('--from', dest='first_day', help='Only Bookings starting on or after (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='last_day', help='Only Bookings starting on or before (YYYY-MM-DD).')
+        parser.add_argument('--workers', type=int, help='Worker processes, REPRICING_WORKERS by default.')
+        parser.add_argument('--chunk-size', type=int, default=REPRICE_CHUNK_SIZE)
+
+    def handle(self, *args, path, first_day, last_day, workers, chunk_size, **options):
+        with open(path) as proposals_file:
+            try:
+                proposals = json.load(proposals_file)
+            except ValueError as error:
+                raise CommandError(f'Unreadable file: {error}')
+        if not isinstance(proposals, list):
+            raise CommandError('The file must hold a list of proposals.')
+
+        try:
+            report = simulate_pricing(proposals=proposals, first_day=parse_option_date(first_day),
+                                      last_day=parse_option_date(last_day), workers=workers, chunk_size=chunk_size)
+        except InvalidPricingProposalError as error:
+            raise CommandError('\n'.join(error.errors))
+
+        for simulation in report.properties:
+            self.stdout.write(f'Property {simulation.rental_property}: {simulation.bookings} bookings, '
+                              f'{simulation.current_revenue:.2f} -> {simulation.simulated_revenue:.2f} '
+                              f'({simulation.difference:+.2f})')
+        self.stdout.write(f'{report.bookings} bookings, {report.current_revenue:.2f} -> '
+                          f'{report.simulated_revenue:.2f} ({report.difference:+.2f}).')
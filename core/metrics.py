@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpRequest, HttpResponse
+from django.utils.decorators import sync_and_async_middleware
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Prometheus histogram with fixed buckets, one series per combination of label values.
+    observe is a lock and a bisect, cheap enough to be left on in production.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...], buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = dict()
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[labelname]) for labelname in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            labels = ','.join(f'{labelname}="{escape(value)}"' for labelname, value in zip(self.labelnames, key))
+            separator = ',' if labels else ''
+            cumulative = 0
+            for bucket, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{labels}{separator}le="{bucket}"}} {cumulative}'
+            yield f'{self.name}_sum{{{labels}}} {total}'
+            yield f'{self.name}_count{{{labels}}} {cumulative}'
+
+
+def escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+request_duration = Histogram(
+    name='http_request_duration_seconds', documentation='Time spent answering requests, per route.',
+    labelnames=('route', 'method', 'status'), buckets=DURATION_BUCKETS)
+request_queries = Histogram(
+    name='http_request_db_queries', documentation='Database queries run by a request, per route.',
+    labelnames=('route', 'method'), buckets=QUERY_COUNT_BUCKETS)
+request_query_duration = Histogram(
+    name='http_request_db_duration_seconds', documentation='Time a request spent in database queries, per route.',
+    labelnames=('route', 'method'), buckets=DURATION_BUCKETS)
+stage_duration = Histogram(
+    name='stage_duration_seconds', documentation='Time spent in each stage of booking and pricing.',
+    labelnames=('stage',), buckets=DURATION_BUCKETS)
+
+REGISTRY = (request_duration, request_queries, request_query_duration, stage_duration)
+
+
+def render_metrics() -> str:
+    """All the metrics of this process in the Prometheus text format."""
+    return '\n'.join(line for histogram in REGISTRY for line in histogram.render()) + '\n'
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """Record the time spent in the block under stage_duration_seconds{stage=...}."""
+    if not settings.METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_duration.observe(time.perf_counter() - started, stage=stage)
+
+
+class QueryCounter:
+    """Queries of a request and the time spent in them."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# Counter of the request being served. asgiref copies the context into its sync_to_async threads, so the queries
+# an ASGI request runs through the connections of those threads are counted too.
+current_query_counter: ContextVar[Optional[QueryCounter]] = ContextVar('current_query_counter', default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    """Database execute_wrapper adding the query to the counter of the current request, if any."""
+    counter = current_query_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter.count += 1
+        counter.duration += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs) -> None:
+    """Wrap every database connection of every thread once, the wrapper survives reconnections."""
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+def record_request(request: HttpRequest, response: HttpResponse, counter: QueryCounter, duration: float) -> None:
+    match = request.resolver_match
+    route = match.route if match else 'unmatched'
+    request_duration.observe(duration, route=route, method=request.method, status=response.status_code)
+    request_queries.observe(counter.count, route=route, method=request.method)
+    request_query_duration.observe(counter.duration, route=route, method=request.method)
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Time every request and count its database queries, labelled with the route pattern that served it.
+    Async requests stay on the event loop, so the async views of an ASGI deployment are measured too.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request: HttpRequest) -> HttpResponse:
+            if not settings.METRICS_ENABLED:
+                return await get_response(request)
+            counter = QueryCounter()
+            token = current_query_counter.set(counter)
+            started = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                current_query_counter.reset(token)
+            record_request(request=request, response=response, counter=counter,
+                           duration=time.perf_counter() - started)
+            return response
+    else:
+        def middleware(request: HttpRequest) -> HttpResponse:
+            if not settings.METRICS_ENABLED:
+                return get_response(request)
+            counter = QueryCounter()
+            token = current_query_counter.set(counter)
+            started = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                current_query_counter.reset(token)
+            record_request(request=request, response=response, counter=counter,
+                           duration=time.perf_counter() - started)
+            return response
+    return middleware
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+        :[GET]:
+    Description: Metrics of this process in the Prometheus text format. Every worker process keeps its own.
+    """
+    return HttpResponse(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
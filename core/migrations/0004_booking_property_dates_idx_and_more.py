@@ -0,0 +1,34 @@
+import django.contrib.postgres.fields.ranges
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+import core.models
+
+
+class Migration(migrations.Migration):
+    """booking_no_overlap is only created on PostgreSQL, existing overlapping Bookings must be fixed before."""
+
+    dependencies = [
+        ('core', '0003_rename_property_rentalproperty_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['rental_property', 'date_start', 'date_end'], name='booking_property_dates_idx'),
+        ),
+        BtreeGistExtension(),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=core.models.PostgresExclusionConstraint(
+                expressions=[
+                    ('rental_property', '='),
+                    (core.models.DateRange('date_start', 'date_end',
+                                           django.contrib.postgres.fields.ranges.RangeBoundary(inclusive_upper=True)),
+                     '&&'),
+                ],
+                name='booking_no_overlap',
+                violation_error_message='The property is not available for the requested days.',
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_booking_date_start_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['date_end'], name='booking_date_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['final_price'], name='booking_final_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pricingrule',
+            index=models.Index(condition=models.Q(('specific_day__isnull', False)),
+                               fields=['rental_property', 'specific_day'], name='pricing_rule_special_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pricingrule',
+            index=models.Index(condition=models.Q(('min_stay_length__isnull', False)),
+                               fields=['rental_property', 'min_stay_length'], name='pricing_rule_min_stay_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rentalproperty',
+            index=models.Index(fields=['name'], name='property_name_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricePoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('price', models.FloatField()),
+                ('rental_property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.rentalproperty')),
+                ('rule', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.pricingrule')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('rental_property', 'day'), name='price_point_property_day_uniq')],
+            },
+        ),
+    ]
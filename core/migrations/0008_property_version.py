@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_price_point'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rentalproperty',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='rentalproperty',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,4 +1,35 @@
-from django.db import models
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeBoundary, RangeOperators
+from django.db import DEFAULT_DB_ALIAS, connections, models
+
+
+class DateRange(models.Func):
+    """daterange(lower, upper, bounds) of PostgreSQL."""
+    function = 'daterange'
+    output_field = DateRangeField()
+
+
+class PostgresExclusionConstraint(ExclusionConstraint):
+    """ExclusionConstraint created and validated on PostgreSQL only, the other databases skip it."""
+
+    def constraint_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().constraint_sql(model, schema_editor)
+
+    def create_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().create_sql(model, schema_editor)
+
+    def remove_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().remove_sql(model, schema_editor)
+
+    def validate(self, model, instance, exclude=None, using=DEFAULT_DB_ALIAS):
+        if connections[using].vendor == 'postgresql':
+            super().validate(model, instance, exclude=exclude, using=using)
 
 
 class RentalProperty(models.Model):
@@ -10,6 +41,15 @@ class RentalProperty(models.Model):
     """name: Name of the property"""
     base_price = models.FloatField(null=True, blank=True)
     """base_price: base price of the property per day"""
+    version = models.PositiveIntegerField(default=0, editable=False)
+    """version: Bumped on every change of the property or of its PricingRules"""
+    modified_at = models.DateTimeField(auto_now=True)
+    """modified_at: Last change of the property or of its PricingRules"""
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='property_name_idx'),
+        ]
 
 
 class PricingRule(models.Model):
@@ -41,6 +81,14 @@ class PricingRule(models.Model):
             return True
         return False
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['rental_property', 'specific_day'], name='pricing_rule_special_day_idx',
+                         condition=models.Q(specific_day__isnull=False)),
+            models.Index(fields=['rental_property', 'min_stay_length'], name='pricing_rule_min_stay_idx',
+                         condition=models.Q(min_stay_length__isnull=False)),
+        ]
+
 
 class Booking(models.Model):
     """
@@ -56,3 +104,45 @@ class Booking(models.Model):
     """date_end: Last date of the booking"""
     final_price = models.FloatField(null=True, blank=True)
     """final_price: Calculated final price"""
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['rental_property', 'date_start', 'date_end'], name='booking_property_dates_idx'),
+            models.Index(fields=['date_start', 'id'], name='booking_date_start_id_idx'),
+            models.Index(fields=['date_end'], name='booking_date_end_idx'),
+            models.Index(fields=['final_price'], name='booking_final_price_idx'),
+        ]
+        constraints = [
+            # Overlapping Bookings of the same property are rejected by the database on PostgreSQL. The GiST
+            # index behind the constraint also answers the availability overlap query.
+            PostgresExclusionConstraint(
+                name='booking_no_overlap',
+                expressions=[
+                    ('rental_property', RangeOperators.EQUAL),
+                    (DateRange('date_start', 'date_end', RangeBoundary(inclusive_upper=True)),
+                     RangeOperators.OVERLAPS),
+                ],
+                violation_error_message='The property is not available for the requested days.',
+            ),
+        ]
+
+
+class PricePoint(models.Model):
+    """
+        Model that represents the materialized price of one night of a property.
+        Nights are kept for a rolling horizon and recomputed when the PricingRules or the base_price change,
+        so the price of a stay is a sum over its nights plus the min_stay_length modifier.
+    """
+    rental_property = models.ForeignKey('core.RentalProperty', blank=False, null=False, on_delete=models.CASCADE)
+    """property: The property this price is for"""
+    day = models.DateField(blank=False, null=False)
+    """day: The night being priced"""
+    price = models.FloatField(blank=False, null=False)
+    """price: Price of the night, the base_price unless a specific_day rule applies"""
+    rule = models.ForeignKey('core.PricingRule', blank=True, null=True, on_delete=models.SET_NULL)
+    """rule: The specific_day rule that sets the price, null for the base_price"""
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['rental_property', 'day'], name='price_point_property_day_uniq'),
+        ]
@@ -0,0 +1,104 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination on the primary key: every page is an indexed range scan, whatever its position."""
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class KeysetCursorPagination(IdCursorPagination):
+    """Keyset pagination on a tuple of non-null columns whose last one is unique.
+    DRF's CursorPagination filters on the first column only and skips the ties with an offset, capped at
+    offset_cutoff, so it loops on long runs of equal values. Here the cursor holds the values of every column of
+    the last row, and the next page starts strictly after that tuple, so no offset is ever needed.
+    """
+    ordering = ('id',)
+    position_separator = ','
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor.reverse if self.cursor else False
+        current_position = self.cursor.position if self.cursor else None
+
+        queryset = queryset.order_by(*(self.reverse_ordering() if reverse else self.ordering))
+        if current_position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(queryset=queryset, position=current_position,
+                                                              reverse=reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > len(self.page)
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = current_position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, current_position is not None
+        if self.page:
+            self.next_position = self._get_position_from_instance(self.page[-1], self.ordering)
+            self.previous_position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            self.next_position = self.previous_position = current_position
+        self.display_page_controls = (self.has_previous or self.has_next) and self.template is not None
+        return self.page
+
+    def reverse_ordering(self) -> tuple[str, ...]:
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering)
+
+    def get_keyset_filter(self, queryset: QuerySet, position: str, reverse: bool) -> Q:
+        """Rows after the position in the (reversed) ordering: (a, b) > (x, y) is a > x OR (a = x AND b > y).
+        Raises:
+            NotFound: The cursor position does not match the ordering.
+        """
+        values = position.split(self.position_separator)
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        keyset_filter, equal = Q(), Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            try:
+                value = queryset.model._meta.get_field(name).to_python(value)
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            keyset_filter |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return keyset_filter
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        return self.position_separator.join(
+            str(instance[field.lstrip('-')] if isinstance(instance, dict) else getattr(instance, field.lstrip('-')))
+            for field in ordering)
+
+
+class BookingCursorPagination(KeysetCursorPagination):
+    """Keyset pagination on (date_start, id), backed by the booking_date_start_id_idx index."""
+    ordering = ('date_start', 'id')
+
+
+class PropertySearchPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,23 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+"""ORJSON_OPTIONS: Keys are converted like json.dumps does, datetimes go through the encoder of DRF."""
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer encoding with orjson when it is installed, several times faster on big lists.
+    Indented output (an indent in the Accept header) goes through json.dumps, as do the types orjson does not
+    know through the encoder of DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type=accepted_media_type, renderer_context=renderer_context)
+        rendered = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        # Escaped like JSONRenderer does, so the output stays a strict javascript subset.
+        return rendered.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
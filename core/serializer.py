@@ -14,7 +14,41 @@ class PropertySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class NightsField(serializers.Field):
+    """Number of nights of a timedelta."""
+
+    def to_representation(self, value):
+        return value.days
+
+
+class PropertyStatsSerializer(PropertySerializer):
+    booking_count = serializers.IntegerField(read_only=True)
+    revenue = serializers.FloatField(read_only=True)
+    booked_nights = NightsField(read_only=True)
+
+
 class BookingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = '__all__'
+
+
+class StayQuoteSerializer(serializers.Serializer):
+    date_start = serializers.DateField()
+    date_end = serializers.DateField()
+    stay_length = serializers.IntegerField()
+    final_price = serializers.FloatField()
+
+
+class CalendarSpanSerializer(serializers.Serializer):
+    date_start = serializers.DateField()
+    date_end = serializers.DateField()
+    days = serializers.IntegerField()
+    status = serializers.CharField()
+
+
+class PropertyOfferSerializer(serializers.Serializer):
+    rental_property = serializers.IntegerField()
+    name = serializers.CharField(allow_null=True)
+    base_price = serializers.FloatField()
+    final_price = serializers.FloatField()
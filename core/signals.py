@@ -0,0 +1,142 @@
+from datetime import date
+from functools import partial
+from typing import Callable, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import DEFERRED, F
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from core.booking_helpers.dates import to_date
+from core.booking_helpers.occupancy import add_booked_days, invalidate_booked_days
+from core.booking_helpers.price_calendar import drop_price_points, refresh_price_points
+from core.booking_helpers.pricing_cache import invalidate_pricing_snapshots
+from core.models import Booking, PricingRule, RentalProperty
+
+pricing_changed = Signal()
+"""pricing_changed: Sent with rental_property_ids when the base_price or the PricingRules of properties change,
+and the days whose specific_day rules changed (None when every day may have changed).
+Writes that skip the model signals (bulk_create, update, ...) must call notify_pricing_changed themselves."""
+
+
+def run_now_and_on_commit(func: Callable, **kwargs) -> None:
+    """Drop cached data right away for the current transaction, and again once it commits,
+    in case a concurrent request cached the old data in between."""
+    func(**kwargs)
+    transaction.on_commit(partial(func, **kwargs))
+
+
+def notify_pricing_changed(rental_property_ids: Iterable[int], sender: type = PricingRule,
+                           days: Optional[Iterable[date]] = None) -> None:
+    rental_property_ids = set(rental_property_ids)
+    if rental_property_ids:
+        pricing_changed.send(sender=sender, rental_property_ids=rental_property_ids,
+                             days=None if days is None else set(days))
+
+
+@receiver(pricing_changed)
+def invalidate_pricing_cache(sender, rental_property_ids: set[int], **kwargs):
+    run_now_and_on_commit(invalidate_pricing_snapshots, rental_property_ids=rental_property_ids)
+
+
+@receiver(pricing_changed)
+def bump_property_versions(sender, rental_property_ids: set[int], **kwargs):
+    """The PricingRules of the properties changed, their own saves bump the version in bump_property_version."""
+    if sender is not RentalProperty:
+        RentalProperty.objects.filter(pk__in=rental_property_ids).update(version=F('version') + 1,
+                                                                         modified_at=timezone.now())
+
+
+@receiver(pricing_changed)
+def refresh_price_calendar(sender, rental_property_ids: set[int], days: Optional[set[date]] = None, **kwargs):
+    """Recompute the nights of the changed rules in the same transaction as the change, so they never disagree.
+    When every night changed they are dropped instead, and materialized again by the refresh_price_calendar job."""
+    for rental_property_id in sorted(rental_property_ids):
+        if days is None:
+            drop_price_points(rental_property_id=rental_property_id)
+        else:
+            refresh_price_points(rental_property_id=rental_property_id, days=days)
+
+
+@receiver(pre_save, sender=PricingRule)
+def remember_previous_rental_property(sender, instance: PricingRule, using: str, **kwargs):
+    """A PricingRule moved to another property or day changes the pricing of both."""
+    instance._previous_rental_property_id = None
+    instance._previous_specific_day = None
+    if instance.pk:
+        instance._previous_rental_property_id, instance._previous_specific_day = (
+            PricingRule.objects.using(using).filter(pk=instance.pk).values_list('rental_property', 'specific_day').first()
+            or (None, None))
+
+
+@receiver(post_save, sender=PricingRule)
+@receiver(post_delete, sender=PricingRule)
+def pricing_rule_changed(sender, instance: PricingRule, origin=None, **kwargs):
+    """Rules deleted by the cascade of their property are skipped: repricing their nights would write PricePoints
+    of the property being deleted, rental_property_deleted notifies the deletion itself."""
+    if getattr(origin, 'model', type(origin)) is RentalProperty:
+        return
+    rental_property_ids = {instance.rental_property_id, getattr(instance, '_previous_rental_property_id', None)}
+    days = {to_date(instance.specific_day) if instance.specific_day else None,
+            getattr(instance, '_previous_specific_day', None)}
+    notify_pricing_changed(rental_property_ids=rental_property_ids - {None}, days=days - {None})
+
+
+@receiver(pre_save, sender=RentalProperty)
+def bump_property_version(sender, instance: RentalProperty, **kwargs):
+    """Together with modified_at, the version identifies the state of the property for conditional requests."""
+    instance.version = (instance.version or 0) + 1
+
+
+@receiver(post_init, sender=RentalProperty)
+def remember_loaded_base_price(sender, instance: RentalProperty, **kwargs):
+    """The base_price the instance was loaded with, so saves know whether it changed without reading the row.
+    A deferred base_price is unknown and counts as changed."""
+    instance._loaded_base_price = instance.__dict__.get('base_price', DEFERRED)
+
+
+@receiver(post_save, sender=RentalProperty)
+def rental_property_saved(sender, instance: RentalProperty, created: bool, **kwargs):
+    """Every night is repriced when the base_price changes, none when only the name does."""
+    loaded_base_price = getattr(instance, '_loaded_base_price', DEFERRED)
+    base_price_changed = created or loaded_base_price is DEFERRED or instance.base_price != loaded_base_price
+    instance._loaded_base_price = instance.__dict__.get('base_price', DEFERRED)
+    notify_pricing_changed(rental_property_ids=[instance.pk], sender=RentalProperty,
+                           days=None if base_price_changed else set())
+
+
+@receiver(post_delete, sender=RentalProperty)
+def rental_property_deleted(sender, instance: RentalProperty, **kwargs):
+    """Its PricePoints are deleted by the cascade."""
+    notify_pricing_changed(rental_property_ids=[instance.pk], sender=RentalProperty, days=set())
+
+
+@receiver(pre_save, sender=Booking)
+def remember_previous_booked_days(sender, instance: Booking, using: str, **kwargs):
+    """A changed Booking frees its previous days."""
+    instance._previous_booked_days = None
+    if instance.pk:
+        instance._previous_booked_days = (
+            Booking.objects.using(using).filter(pk=instance.pk).values_list('rental_property', 'date_start', 'date_end').first())
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance: Booking, created: bool, **kwargs):
+    if created:
+        transaction.on_commit(partial(add_booked_days, rental_property_id=instance.rental_property_id,
+                                      date_start=instance.date_start, date_end=instance.date_end))
+        return
+    previous_booked_days = getattr(instance, '_previous_booked_days', None)
+    if previous_booked_days:
+        rental_property_id, date_start, date_end = previous_booked_days
+        run_now_and_on_commit(invalidate_booked_days, rental_property_id=rental_property_id, date_start=date_start,
+                              date_end=date_end)
+    run_now_and_on_commit(invalidate_booked_days, rental_property_id=instance.rental_property_id,
+                          date_start=instance.date_start, date_end=instance.date_end)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance: Booking, **kwargs):
+    run_now_and_on_commit(invalidate_booked_days, rental_property_id=instance.rental_property_id,
+                          date_start=instance.date_start, date_end=instance.date_end)
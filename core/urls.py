@@ -1,11 +1,24 @@
 from django.urls import path
-from core.views import PricingRuleListView, PricingRuleDetailView, PropertyListView, PropertyDetailView, BookingListView, BookingDetailView
+from core.views import (PricingRuleListView, PricingRuleDetailView, PricingRuleImportView, PricingRuleSimulationView,
+                        PropertyListView, PropertyDetailView, PropertySearchView, PropertyCalendarView,
+                        PropertyAvailabilityView, BookingListView, BookingDetailView, BookingBulkView,
+                        BookingExportView, BookingRepriceView, QuoteView, QuoteSearchView)
 
 urlpatterns = [
     path('pricing-rule/', PricingRuleListView.as_view()),
     path('pricing-rule/<int:pk>', PricingRuleDetailView.as_view()),
+    path('pricing-rule/import/', PricingRuleImportView.as_view()),
+    path('pricing-rule/simulate/', PricingRuleSimulationView.as_view()),
     path('property/', PropertyListView.as_view()),
     path('property/<int:pk>', PropertyDetailView.as_view()),
+    path('property/search/', PropertySearchView.as_view()),
+    path('property/<int:pk>/calendar', PropertyCalendarView.as_view()),
+    path('property/<int:pk>/availability', PropertyAvailabilityView.as_view()),
     path('booking/', BookingListView.as_view()),
-    path('booking/<int:pk>', BookingDetailView.as_view())
+    path('booking/<int:pk>', BookingDetailView.as_view()),
+    path('booking/bulk/', BookingBulkView.as_view()),
+    path('booking/export/<str:export_format>', BookingExportView.as_view()),
+    path('booking/reprice/', BookingRepriceView.as_view()),
+    path('quote/', QuoteView.as_view()),
+    path('quote-search/', QuoteSearchView.as_view()),
 ]
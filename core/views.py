@@ -1,39 +1,240 @@
-import pandas as pd
-from dateutil import parser
+import io
+from datetime import timedelta
+
+from django.db import DataError, IntegrityError, transaction
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
 from django_filters import rest_framework as filters
-from rest_framework import generics, status
+from rest_framework import generics, serializers, status
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 
-from core.serializer import PropertySerializer, PricingRuleSerializer, BookingSerializer
-from .booking_helpers.availability import check_availability, check_reservation_is_valid
-from .booking_helpers.pricing_rules import get_rules_to_apply, apply_rules
+from core.serializer import (PropertySerializer, PricingRuleSerializer, BookingSerializer, StayQuoteSerializer,
+                             CalendarSpanSerializer, PropertyOfferSerializer, PropertyStatsSerializer)
+from .booking_helpers.availability import check_availability, get_availability_calendar
+from .booking_helpers.bookings import BookingRequest, check_booking_change, create_booking, create_bookings
+from .booking_helpers.dates import date_range, to_date
+from .booking_helpers.exceptions import (BookingConflictError, InvalidBookingError, InvalidPricingProposalError,
+                                        InvalidRuleImportError)
+from .booking_helpers.export import EXPORT_FORMATS, export_bookings
+from .booking_helpers.price_calendar import price_stay
+from .booking_helpers.pricing_cache import get_pricing_snapshot
+from .booking_helpers.property_search import get_available_properties, price_offers
+from .booking_helpers.property_stats import annotate_booking_stats
+from .booking_helpers.quote_search import StayQuote, get_occupied_days, search_stay_quotes
+from .booking_helpers.repricing import reprice_bookings
+from .booking_helpers.rule_import import IMPORT_FORMATS, SKIP, UPDATE, import_pricing_rules
+from .booking_helpers.simulation import simulate_pricing
+from .conditional_get import ChangeState, ConditionalGetMixin, get_properties_state, get_property_state
+from .fast_serialization import FastListMixin
+from .filters import BookingFilter
+from .metrics import timed_stage
 from .models import PricingRule, RentalProperty, Booking
+from .pagination import BookingCursorPagination, IdCursorPagination, PropertySearchPagination
 
 
-class PropertyListView(generics.ListCreateAPIView):
+class PropertyListView(ConditionalGetMixin, FastListMixin, generics.ListCreateAPIView):
     """
     List all Propertys, or create a new Property.
+    With ?stats=true every Property also has the booking_count, revenue and booked_nights of its Bookings
+    overlapping the optional date_start/date_end window, read in the same query as the page.
     """
     queryset = RentalProperty.objects.all()
     serializer_class = PropertySerializer
+    pagination_class = IdCursorPagination
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_fields = ('id', 'name')
 
+    def with_stats(self) -> bool:
+        return self.request.method == 'GET' and \
+            str(self.request.query_params.get('stats', False)).lower() in ('true', '1')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.with_stats():
+            return queryset
+        params = self.request.query_params
+        try:
+            window_start = to_date(params['date_start']) if 'date_start' in params else None
+            window_end = to_date(params['date_end']) if 'date_end' in params else None
+        except (ValueError, OverflowError):
+            raise ParseError('date_start and date_end must be valid dates.')
+        return annotate_booking_stats(properties=queryset, window_start=window_start, window_end=window_end)
+
+    def get_serializer_class(self):
+        return PropertyStatsSerializer if self.with_stats() else super().get_serializer_class()
 
-class PropertyDetailView(generics.RetrieveUpdateDestroyAPIView):
+    def get_change_state(self, request) -> ChangeState:
+        """The stats change with the Bookings, which do not bump the properties, so they are never cached."""
+        if self.with_stats():
+            return ChangeState(etag=None, last_modified=None)
+        return get_properties_state(properties=self.filter_queryset(self.get_queryset()),
+                                    variant=f'{self.get_variant(request)}:{request.get_full_path()}')
+
+
+class PropertyDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a Property instance.
     """
     queryset = RentalProperty.objects.all()
     serializer_class = PropertySerializer
 
+    def get_change_state(self, request) -> ChangeState:
+        return get_property_state(rental_property_id=self.kwargs['pk'], variant=self.get_variant(request))
+
+
+class PropertySearchView(generics.GenericAPIView):
+    """
+    Search the Properties available for a stay, with their final price.
+    """
+    serializer_class = PropertyOfferSerializer
+    pagination_class = PropertySearchPagination
+    max_stay_days = 365
+
+    def get(self, request, *args, **kwargs):
+        """
+            :[GET]:
+        Description: Properties free from date_start to date_end, by base_price and cheapest first in a page.
+        Summary:
+            . Filter the available Properties with a single anti-join query and take the page, by base_price.
+            . Load the PricingRules of the page with a single query.
+            . Price the stay in every Property of the page and drop the ones above max_price.
+        Parameters:
+            date_start, date_end, max_price (optional), page, page_size.
+        Responses:
+            '200':
+                Description: Page of available Properties with the final price of the stay. count is the number
+                             of available Properties, max_price filters each page.
+            '400':
+                Description: Bad Request.
+        """
+        params = request.query_params
+        try:
+            days_list = date_range(date_start=params['date_start'], date_end=params['date_end'])
+            max_price = float(params['max_price']) if params.get('max_price') else None
+        except (KeyError, ValueError, OverflowError):
+            return Response({'detail': 'date_start and date_end are required, max_price must be a number.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not days_list:
+            return Response({'detail': 'date_end must not be before date_start.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(days_list) > self.max_stay_days:
+            return Response({'detail': f'The stay must not be longer than {self.max_stay_days} days.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        page = self.paginate_queryset(get_available_properties(check_in=days_list.start, check_out=days_list.end))
+        offers = price_offers(properties=page, check_in=days_list.start, check_out=days_list.end,
+                              max_price=max_price)
+        serializer = self.get_serializer(offers, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class PropertyCalendarView(generics.GenericAPIView):
+    """
+    Availability calendar of a Property.
+    """
+    queryset = RentalProperty.objects.all()
+    serializer_class = CalendarSpanSerializer
+    calendar_days = 365
+    max_window_days = 731
+
+    def get(self, request, *args, **kwargs):
+        """
+            :[GET]:
+        Description: Free and busy days of the Property, in run-length form.
+        Summary:
+            . Read the Bookings overlapping the window with a single ordered query.
+            . Merge them into busy spans and fill the gaps with free spans.
+        Parameters:
+            date_start (default today), date_end (default one year after date_start).
+        Responses:
+            '200':
+                Description: Consecutive spans covering the whole window.
+            '400':
+                Description: Bad Request.
+            '404':
+                Description: Property not found.
+        """
+        params = request.query_params
+        try:
+            window_start = to_date(params['date_start']) if 'date_start' in params else timezone.localdate()
+            window_end = (to_date(params['date_end']) if 'date_end' in params
+                          else window_start + timedelta(days=self.calendar_days - 1))
+        except (ValueError, OverflowError):
+            return Response({'detail': 'date_start and date_end must be valid dates.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        window_days = (window_end - window_start).days + 1
+        if window_days < 1 or window_days > self.max_window_days:
+            return Response({'detail': f'The window must have 1 to {self.max_window_days} days.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if not self.get_queryset().filter(pk=kwargs['pk']).exists():
+            raise Http404
+
+        spans = get_availability_calendar(rental_property_id=kwargs['pk'], window_start=window_start,
+                                          window_end=window_end)
+        serializer = self.get_serializer(spans, many=True)
+        return Response({
+            'rental_property': kwargs['pk'],
+            'date_start': serializers.DateField().to_representation(window_start),
+            'date_end': serializers.DateField().to_representation(window_end),
+            'spans': serializer.data,
+        })
+
+
+class PropertyAvailabilityView(generics.GenericAPIView):
+    """
+    Check if a Property is available for a stay.
+    """
+    queryset = RentalProperty.objects.all()
+
+    def get(self, request, *args, **kwargs):
+        """
+            :[GET]:
+        Description: Availability probe, answered from the cached occupancy bitmaps of the Property.
+        Parameters:
+            date_start, date_end.
+        Responses:
+            '200':
+                Description: available is true if no Booking overlaps the requested days.
+            '400':
+                Description: Bad Request.
+            '404':
+                Description: Property not found.
+        """
+        params = request.query_params
+        try:
+            days_list = date_range(date_start=params['date_start'], date_end=params['date_end'])
+        except (KeyError, ValueError, OverflowError):
+            return Response({'detail': 'date_start and date_end are required.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not days_list:
+            return Response({'detail': 'date_end must not be before date_start.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not self.get_queryset().filter(pk=kwargs['pk']).exists():
+            raise Http404
+
+        available = check_availability(request_data={'rental_property': kwargs['pk'], 'date_start': days_list.start,
+                                                     'date_end': days_list.end})
+        return Response({
+            'rental_property': kwargs['pk'],
+            'date_start': serializers.DateField().to_representation(days_list.start),
+            'date_end': serializers.DateField().to_representation(days_list.end),
+            'available': available,
+        })
+
 
-class PricingRuleListView(generics.ListCreateAPIView):
+class PricingRuleListView(ConditionalGetMixin, FastListMixin, generics.ListCreateAPIView):
     """
     List all PricingRules, or create a new PricingRule.
     """
     queryset = PricingRule.objects.all()
     serializer_class = PricingRuleSerializer
+    pagination_class = IdCursorPagination
+
+    def get_change_state(self, request) -> ChangeState:
+        """Every change of a rule bumps its property, so the state of all the properties covers all the rules."""
+        return get_properties_state(properties=RentalProperty.objects.all(),
+                                    variant=f'{self.get_variant(request)}:{request.get_full_path()}')
 
 
 class PricingRuleDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -44,6 +245,102 @@ class PricingRuleDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = PricingRuleSerializer
 
 
+class PricingRuleImportView(generics.GenericAPIView):
+    """
+    Import a sheet of PricingRules.
+    """
+    queryset = PricingRule.objects.all()
+
+    def post(self, request, *args, **kwargs):
+        """
+            :[POST]:
+        Description: Import the PricingRules of an uploaded CSV or JSON Lines file in a single transaction.
+        Summary:
+            . The file is sent as the multipart field "file", its format is import_format or its extension.
+            . Rules of a (rental_property, specific_day) that already has one are skipped, or updated with
+              on_conflict=update.
+            . Nothing is imported if any row is invalid.
+        Responses:
+            '201':
+                Description: Number of created, updated and skipped rules.
+            '400':
+                Description: Bad Request, with the errors of the invalid rows.
+        """
+        upload = request.data.get('file')
+        if not upload or not hasattr(upload, 'file'):
+            return Response({'detail': 'A file is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        import_format = request.data.get('import_format') or upload.name.rpartition('.')[2].lower()
+        on_conflict = request.data.get('on_conflict', SKIP)
+        if import_format not in IMPORT_FORMATS or on_conflict not in (SKIP, UPDATE):
+            return Response({'detail': f'import_format must be one of {", ".join(IMPORT_FORMATS)} and '
+                                       f'on_conflict one of {SKIP}, {UPDATE}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            result = import_pricing_rules(records=IMPORT_FORMATS[import_format](lines), on_conflict=on_conflict)
+        except InvalidRuleImportError as error:
+            return Response({'errors': error.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result._asdict(), status=status.HTTP_201_CREATED)
+
+
+class PricingRuleSimulationView(generics.GenericAPIView):
+    """
+    Simulate the revenue of proposed PricingRules.
+    """
+    queryset = PricingRule.objects.all()
+    max_properties = 20
+    history_days = 365
+    max_window_days = 731
+
+    def post(self, request, *args, **kwargs):
+        """
+            :[POST]:
+        Description: Price the stored Bookings again with the proposed base_price and PricingRules of their
+        property, and compare their revenue with the final_price they were booked at. Nothing is saved.
+        Summary:
+            . properties: List of {rental_property, base_price (optional), rules (optional)}, the rules replace
+              the current PricingRules of the property and have the fields and formats of a rule import. Without
+              rules the current ones are kept.
+            . date_start, date_end: Only Bookings starting between them. date_start is one year ago and date_end
+              max_window_days after date_start by default.
+            . The simulation runs in the request without a process pool, so it is limited to max_properties and
+              max_window_days. Simulate whole portfolios or histories with the simulate_pricing command.
+        Responses:
+            '200':
+                Description: Bookings, current and simulated revenue, and their difference, in total and per
+                             property.
+            '400':
+                Description: Bad Request, with the errors of the proposals.
+        """
+        data = request.data
+        proposals = data.get('properties') if isinstance(data, dict) else None
+        try:
+            first_day = (to_date(data['date_start']) if data.get('date_start')
+                         else timezone.localdate() - timedelta(days=self.history_days))
+            last_day = (to_date(data['date_end']) if data.get('date_end')
+                        else first_day + timedelta(days=self.max_window_days - 1))
+        except (AttributeError, TypeError, ValueError, OverflowError):
+            return Response({'detail': 'date_start and date_end must be dates.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(proposals, list) or not proposals:
+            return Response({'detail': 'properties must be a list of proposals.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(proposals) > self.max_properties:
+            return Response({'detail': f'Simulate 1 to {self.max_properties} properties, use the simulate_pricing '
+                                       f'command for more.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < (last_day - first_day).days + 1 <= self.max_window_days:
+            return Response({'detail': f'The window must have 1 to {self.max_window_days} days, use the '
+                                       f'simulate_pricing command for more.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            report = simulate_pricing(proposals=proposals, first_day=first_day, last_day=last_day, workers=1)
+        except InvalidPricingProposalError as error:
+            return Response({'errors': error.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(dict(report._asdict(), difference=report.difference,
+                             properties=[dict(simulation._asdict(), difference=simulation.difference)
+                                         for simulation in report.properties]))
+
+
 class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a Booking instance.
@@ -51,15 +348,52 @@ class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
 
+    def update(self, request, *args, **kwargs):
+        """
+            :[PUT, PATCH]:
+        Description: Update a Booking.
+        Summary:
+            . Lock the Property of the Booking and check its new days are valid and available.
+            . On PostgreSQL the booking_no_overlap constraint is the last line of defence.
+        Responses:
+            '200':
+                Description: Booking item successfully updated.
+            '400':
+                Description: Bad Request.
+            '409':
+                Description: The Property is already booked for some of the requested days.
+        """
+        try:
+            with transaction.atomic():
+                return super().update(request, *args, **kwargs)
+        except (BookingConflictError, IntegrityError):
+            return Response({'detail': 'The property is not available for the requested days.'},
+                            status=status.HTTP_409_CONFLICT)
+        except InvalidBookingError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        except DataError:
+            return Response({'detail': 'date_start and date_end must be valid dates.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    def perform_update(self, serializer):
+        booking = serializer.instance
+        data = serializer.validated_data
+        check_booking_change(booking=booking,
+                             rental_property_id=data.get('rental_property', booking.rental_property).pk,
+                             date_start=data.get('date_start', booking.date_start),
+                             date_end=data.get('date_end', booking.date_end))
+        serializer.save()
+
 
-class BookingListView(generics.ListCreateAPIView):
+class BookingListView(FastListMixin, generics.ListCreateAPIView):
     """
     List all Bookings.
     """
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
+    pagination_class = BookingCursorPagination
     filter_backends = (filters.DjangoFilterBackend,)
-    filterset_fields = ('id', 'rental_property', 'date_start', 'date_end', 'final_price')
+    filterset_class = BookingFilter
 
     def post(self, request, *args, **kwargs):
         """
@@ -67,47 +401,281 @@ class BookingListView(generics.ListCreateAPIView):
         Description: Create a new Booking.
         Summary:
             . Check the Booking is valid. Handle Exception.
+            . Lock the Property, so only one Booking per Property is created at a time.
             . Check availability of time_slots for the Booking. Handle Exception.
             . Select the PricingRules to aplly according to requirements.
             . Apply the selected PricingRules and apply to each day.
         Responses:
-            '200':
+            '201':
                 Description: Booking item successfully created.
             '400':
                 Description: Bad Request.
+            '409':
+                Description: The Property is already booked for some of the requested days.
+        """
+        try:
+            with timed_stage('booking.validation'):
+                date_start = to_date(request.data.get('date_start'))
+                date_end = to_date(request.data.get('date_end'))
+        except (TypeError, ValueError, OverflowError):
+            return Response({'detail': 'date_start and date_end must be valid dates.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            booking = create_booking(rental_property_id=request.data.get('rental_property'), date_start=date_start,
+                                     date_end=date_end)
+        except BookingConflictError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_409_CONFLICT)
+        except InvalidBookingError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = BookingSerializer(booking)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class BookingRepriceView(generics.GenericAPIView):
+    """
+    Re-price the future Bookings.
+    """
+    queryset = Booking.objects.all()
+    max_properties = 20
+
+    def post(self, request, *args, **kwargs):
+        """
+            :[POST]:
+        Description: Price the Bookings that have not started yet again with the current base_price and
+        PricingRules of their property.
+        Summary:
+            . rental_property: id or list of ids of the properties to re-price, required.
+            . date_start: Bookings starting before it are left as they are, today by default.
+            . dry_run: Only report the changes.
+            . The job runs in the request without a process pool, so it is limited to max_properties. Whole
+              portfolios take minutes, run them with the reprice_bookings command instead.
+        Responses:
+            '200':
+                Description: Number of checked, changed, written and skipped Bookings, totals before and after,
+                             the diff of each property and a sample of the changed Bookings.
+            '400':
+                Description: Bad Request.
+        """
+        data = request.data
+        try:
+            rental_property_ids = data['rental_property']
+            if not isinstance(rental_property_ids, list):
+                rental_property_ids = [rental_property_ids]
+            rental_property_ids = [int(rental_property_id) for rental_property_id in rental_property_ids]
+            first_day = to_date(data['date_start']) if data.get('date_start') else None
+        except (KeyError, TypeError, ValueError, OverflowError):
+            return Response({'detail': 'rental_property must be ids and date_start a date.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < len(rental_property_ids) <= self.max_properties:
+            return Response({'detail': f'Re-price 1 to {self.max_properties} properties, use the reprice_bookings '
+                                       f'command for more.'}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(data.get('dry_run', False)).lower() in ('true', '1')
+
+        report = reprice_bookings(rental_property_ids=rental_property_ids, first_day=first_day, dry_run=dry_run,
+                                  workers=1)
+        date_field = serializers.DateField()
+        changes = [dict(change._asdict(), date_start=date_field.to_representation(change.date_start),
+                        date_end=date_field.to_representation(change.date_end)) for change in report.changes]
+        return Response(dict(report._asdict(), properties=[diff._asdict() for diff in report.properties],
+                             changes=changes))
+
+
+class BookingExportView(generics.GenericAPIView):
+    """
+    Export Bookings as CSV or JSON Lines.
+    """
+    queryset = Booking.objects.all()
+    filter_backends = (filters.DjangoFilterBackend,)
+    filterset_class = BookingFilter
+
+    def get(self, request, export_format, *args, **kwargs):
+        """
+            :[GET]:
+        Description: Stream every Booking matching the filters of the Booking list, in id order.
+        Summary:
+            . Rows are read chunk by chunk with values_list, no model or serializer is built per Booking.
+            . Each row is written to the response as soon as it is read, memory stays flat with the table size.
+        Responses:
+            '200':
+                Description: CSV (header first) or JSON Lines body.
+            '404':
+                Description: Unknown export format.
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise Http404(f'Unknown export format {export_format}.')
+
+        _, content_type = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            export_bookings(bookings=self.filter_queryset(self.get_queryset()), export_format=export_format),
+            content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="bookings.{export_format}"'
+        return response
+
+
+class BookingBulkView(generics.GenericAPIView):
+    """
+    Create a batch of Bookings.
+    """
+    serializer_class = BookingSerializer
+    max_batch_size = 1000
+
+    def post(self, request, *args, **kwargs):
         """
-        valid_reservation = check_reservation_is_valid(request_data=request.data)
-        if not valid_reservation:
-            # TODO: HANDLE THIS!
-            pass
-
-        available_time_slot = check_availability(request_data=request.data)
-
-        if not available_time_slot:
-            # TODO: HANDLE THIS!
-            pass
-
-        selected_property = RentalProperty.objects.get(pk=request.data.get('rental_property'))
-        property_pricing_rules = PricingRule.objects.filter(rental_property=selected_property.id)
-
-        days_list = pd.date_range(request.data.get('date_start'), request.data.get('date_end'))
-
-        rules_to_apply = get_rules_to_apply(days_list=days_list, pricing_rules=property_pricing_rules)
-
-        if not rules_to_apply:
-            final_price = float(len(days_list) * selected_property.base_price)
-        else:
-            final_price = apply_rules(days_list=days_list, base_price=selected_property.base_price,
-                                      rules_to_apply=rules_to_apply)
-
-        data = {
-            "rental_property": request.data.get('rental_property'),
-            "date_start": parser.parse(request.data.get('date_start')).date(),
-            "date_end": parser.parse(request.data.get('date_end')).date(),
-            "final_price": final_price
-        }
-        serializer = BookingSerializer(data=data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            :[POST]:
+        Description: Create a list of Bookings in a single transaction.
+        Summary:
+            . Check every Booking is valid.
+            . Lock the Properties, load their PricingRules and Bookings once per batch.
+            . Check availability against existing Bookings and the rest of the batch.
+            . Price and save all the available Bookings at once.
+        Responses:
+            '200':
+                Description: One result per Booking, in the same order, with its own status:
+                             201 and the booking, or 400/409 and the detail.
+            '400':
+                Description: The body is not a list of Bookings or is too big.
+            '409':
+                Description: The batch could not be saved because of a concurrent Booking.
+        """
+        if not isinstance(request.data, list) or not 0 < len(request.data) <= self.max_batch_size:
+            return Response({'detail': f'Expected a list of 1 to {self.max_batch_size} bookings.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(request.data)
+        booking_requests = list()
+        positions = list()
+        for position, item in enumerate(request.data):
+            try:
+                booking_requests.append(BookingRequest(rental_property_id=int(item.get('rental_property')),
+                                                       date_start=to_date(item.get('date_start')),
+                                                       date_end=to_date(item.get('date_end'))))
+                positions.append(position)
+            except (AttributeError, TypeError, ValueError, OverflowError):
+                results[position] = {'status': status.HTTP_400_BAD_REQUEST,
+                                     'detail': 'rental_property, date_start and date_end must be valid.'}
+
+        try:
+            booking_results = create_bookings(booking_requests=booking_requests)
+        except BookingConflictError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_409_CONFLICT)
+
+        for position, booking_result in zip(positions, booking_results):
+            if booking_result.booking:
+                results[position] = {'status': status.HTTP_201_CREATED,
+                                     'booking': self.get_serializer(booking_result.booking).data}
+            elif isinstance(booking_result.error, BookingConflictError):
+                results[position] = {'status': status.HTTP_409_CONFLICT, 'detail': str(booking_result.error)}
+            else:
+                results[position] = {'status': status.HTTP_400_BAD_REQUEST, 'detail': str(booking_result.error)}
+
+        return Response({'results': results})
+
+
+class QuoteView(generics.GenericAPIView):
+    """
+    Price a stay in a Property without creating a Booking.
+    """
+    serializer_class = StayQuoteSerializer
+
+    def get(self, request, *args, **kwargs):
+        """
+            :[GET]:
+        Description: Get the final price a Booking would have, without side effects.
+        Summary:
+            . Get the base_price and PricingRules of the Property from the pricing cache.
+            . Select the PricingRules to aplly according to requirements.
+            . Apply the selected PricingRules and apply to each day.
+        Parameters:
+            rental_property, date_start, date_end.
+        Responses:
+            '200':
+                Description: The quote.
+            '400':
+                Description: Bad Request.
+            '404':
+                Description: Property not found.
+        """
+        params = request.query_params
+        try:
+            rental_property_id = int(params['rental_property'])
+            days_list = date_range(date_start=params['date_start'], date_end=params['date_end'])
+        except (KeyError, TypeError, ValueError, OverflowError):
+            return Response({'detail': 'rental_property, date_start and date_end are required.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not days_list:
+            return Response({'detail': 'date_end must not be before date_start.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            snapshot = get_pricing_snapshot(rental_property_id=rental_property_id)
+        except RentalProperty.DoesNotExist:
+            raise Http404
+        if snapshot.base_price is None:
+            return Response({'detail': 'The property has no base_price.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        final_price = price_stay(rental_property_id=rental_property_id, days_list=days_list,
+                                 base_price=snapshot.base_price, rule_index=snapshot.rules)
+        quote = StayQuote(date_start=days_list.start, date_end=days_list.end, stay_length=len(days_list),
+                          final_price=final_price)
+        serializer = self.get_serializer(quote)
+        return Response(serializer.data)
+
+
+class QuoteSearchView(generics.GenericAPIView):
+    """
+    Search the cheapest stays of a Property inside a window of dates.
+    """
+    serializer_class = StayQuoteSerializer
+    max_window_days = 731
+
+    def get(self, request, *args, **kwargs):
+        """
+            :[GET]:
+        Description: Price every stay of the requested lengths inside the window, without creating Bookings.
+        Summary:
+            . Build the nightly prices of the Property for the whole window once.
+            . Answer every start date and stay length with prefix sums.
+            . Skip the stays overlapping an existing Booking, unless include_unavailable is set.
+        Parameters:
+            rental_property, date_start, date_end, stay_length (repeatable), limit, include_unavailable.
+        Responses:
+            '200':
+                Description: List of quotes, cheapest first.
+            '400':
+                Description: Bad Request.
+            '404':
+                Description: Property not found.
+        """
+        params = request.query_params
+        try:
+            rental_property_id = int(params['rental_property'])
+            window_start = to_date(params['date_start'])
+            window_end = to_date(params['date_end'])
+            stay_lengths = [int(stay_length) for stay_length in params.getlist('stay_length')]
+            limit = int(params.get('limit', 10))
+        except (KeyError, ValueError, OverflowError):
+            return Response({'detail': 'rental_property, date_start, date_end and stay_length are required.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        window_days = (window_end - window_start).days + 1
+        if not stay_lengths or window_days < 1 or window_days > self.max_window_days or limit < 1:
+            return Response({'detail': 'Invalid window, stay_length or limit.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            snapshot = get_pricing_snapshot(rental_property_id=rental_property_id)
+        except RentalProperty.DoesNotExist:
+            raise Http404
+        if snapshot.base_price is None:
+            return Response({'detail': 'The property has no base_price.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        occupied_days = None
+        if not params.get('include_unavailable'):
+            occupied_days = get_occupied_days(rental_property_id=rental_property_id, window_start=window_start,
+                                              window_end=window_end)
+
+        quotes = search_stay_quotes(window_start=window_start, window_end=window_end, stay_lengths=stay_lengths,
+                                    base_price=snapshot.base_price, rule_index=snapshot.rules,
+                                    occupied_days=occupied_days, limit=limit)
+        serializer = self.get_serializer(quotes, many=True)
+        return Response(serializer.data)
@@ -15,10 +15,13 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from core import urls as core_urls
+from core import async_urls as core_async_urls, urls as core_urls
+from core.metrics import metrics_view
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(core_urls)),
+    path('api/async/', include(core_async_urls)),
+    path('metrics', metrics_view),
 ]
@@ -48,6 +48,8 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'core.metrics.metrics_middleware',
+    'core.db_router.primary_pinning_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -119,6 +121,38 @@ REST_FRAMEWORK = {
     'DATE_INPUT_FORMATS': [("%d-%m-%Y"), ],
     'DATE_FORMAT': "%d-%m-%Y",
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'core.renderers.FastJSONRenderer',
     ],
 }
+
+# Cache shared by the workers for the pricing snapshots, in-process by default. Pricing snapshots are only cached
+# with a shared backend: point CACHE_URL at one (e.g. rediscache://host:6379/1 or pymemcache://host:11211) so every
+# gunicorn worker sees the version bumps of the others.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Seconds a property's base_price and PricingRules stay cached, they are also dropped on every change.
+PRICING_CACHE_TIMEOUT = env.int('PRICING_CACHE_TIMEOUT', default=60 * 60)
+
+# Nights from today materialized in the PricePoint table, longer stays and stays further away are priced from the
+# rules. Run the refresh_price_calendar command daily to roll the horizon forward.
+PRICE_CALENDAR_DAYS = env.int('PRICE_CALENDAR_DAYS', default=730)
+
+# Worker processes of the re-pricing jobs, 0 starts one per CPU.
+REPRICING_WORKERS = env.int('REPRICING_WORKERS', default=0)
+
+# Alias of a read replica of the default database, see core.db_router. Reads go to it unless they must see the
+# latest writes, a client that wrote reads from the primary for REPLICA_PIN_SECONDS (longer than the replica lag).
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+REPLICA_DATABASE = env.str('REPLICA_DATABASE', default='')
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=5)
+
+# Occupancy bitmaps used by the availability checks: memory budget and lifetime of the in-process cache,
+# and optional alias of a cache shared by all the workers.
+OCCUPANCY_CACHE_MAX_BYTES = env.int('OCCUPANCY_CACHE_MAX_BYTES', default=16 * 1024 * 1024)
+OCCUPANCY_CACHE_TIMEOUT = env.int('OCCUPANCY_CACHE_TIMEOUT', default=60)
+OCCUPANCY_SHARED_CACHE = env.str('OCCUPANCY_SHARED_CACHE', default='')
+
+# Request, query and booking stage metrics served on /metrics, cheap enough to be left on.
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
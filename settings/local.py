@@ -27,4 +27,10 @@ DATABASES = {
     }
 }
 
+# Read replica, the primary itself by default so the routing can be tried locally with two aliases.
+# Tests run it as a mirror of the default test database.
+DATABASES['replica'] = dict(DATABASES['default'], HOST=env.str('REPLICA_DB_HOST', default='localhost'),
+                            TEST={'MIRROR': 'default'})
+REPLICA_DATABASE = 'replica'
+
 
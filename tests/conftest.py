@@ -1,14 +1,40 @@
+from datetime import date
+
 import django
 import pytest
 from dateutil.parser import parse
 from rest_framework.test import APIClient
 django.setup()
 
+from core.booking_helpers.occupancy import occupancy_cache
 from core.models import RentalProperty, PricingRule
 
+from django.core.cache import cache
+from django.db import connection
 from django.core.management import call_command
 
 
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    """Fixtures save properties with explicit ids (property_standard is 1). PostgreSQL sequences do not see them,
+    so generated ids start above the ones the fixtures use."""
+    with django_db_blocker.unblock():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT setval(pg_get_serial_sequence('core_rentalproperty', 'id'), 1000)")
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    occupancy_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def first_bookable_day(monkeypatch):
+    """The booking tests are written on dates of 2022, bookings can not start before today."""
+    monkeypatch.setattr('core.booking_helpers.bookings.get_first_bookable_day', lambda: date(2022, 1, 1))
+
 
 @pytest.fixture
 def property_standard():
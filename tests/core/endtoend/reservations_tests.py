@@ -1,10 +1,15 @@
+from datetime import date
 import json
 from typing import Union
 
 import pytest
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient
 from rest_framework.test import APIClient
 
-from core.models import PricingRule, RentalProperty
+from core.metrics import REGISTRY
+from core.models import Booking, PricingRule, RentalProperty
 
 Fixture = Union
 
@@ -304,3 +309,639 @@ class TestBookingEndpoints:
         response_content = json.loads(response.content)
         expected_final_price = 80.0
         assert response_content.get('final_price') == expected_final_price
+
+
+    @pytest.mark.django_db
+    def test_overlapping_booking_conflict(self, property_standard: Fixture[RentalProperty]):
+        """
+        # Test:
+            . A Booking overlapping an existing one is rejected with 409 and not saved.
+        """
+        property_standard.save()
+
+        url = self.booking_endpoint
+        response = self.client.post(url, {"rental_property": 1, "date_start": "01-01-2022", "date_end": "01-10-2022"})
+        assert response.status_code == 201
+
+        response = self.client.post(url, {"rental_property": 1, "date_start": "01-10-2022", "date_end": "01-12-2022"})
+        assert response.status_code == 409
+        assert Booking.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_invalid_booking(self, property_standard: Fixture[RentalProperty]):
+        """
+        # Test:
+            . Dates in wrong order and unknown properties are rejected with 400.
+        """
+        property_standard.save()
+
+        url = self.booking_endpoint
+        response = self.client.post(url, {"rental_property": 1, "date_start": "01-10-2022", "date_end": "01-01-2022"})
+        assert response.status_code == 400
+
+        response = self.client.post(url, {"rental_property": 2, "date_start": "01-01-2022", "date_end": "01-10-2022"})
+        assert response.status_code == 400
+        assert not Booking.objects.exists()
+
+    @pytest.mark.django_db
+    def test_booking_in_the_past(self, property_standard: Fixture[RentalProperty]):
+        """
+        # Test:
+            . Bookings starting before today are rejected with 400, single or in a batch.
+        """
+        property_standard.save()
+
+        response = self.client.post(self.booking_endpoint, {"rental_property": 1, "date_start": "12-31-2021",
+                                                            "date_end": "01-02-2022"})
+        assert response.status_code == 400
+        assert json.loads(response.content) == {'detail': 'date_start must not be in the past.'}
+
+        response = self.client.post(f'{self.booking_endpoint}bulk/', [
+            {"rental_property": 1, "date_start": "12-31-2021", "date_end": "01-02-2022"},
+        ], format='json')
+        assert [result['status'] for result in json.loads(response.content)['results']] == [400]
+        assert not Booking.objects.exists()
+
+
+    @pytest.mark.django_db
+    def test_bulk_booking(self, property_standard: Fixture[RentalProperty], pricing_rule_1: Fixture[PricingRule]):
+        """
+        # Test:
+            . Every Booking of the batch gets its own result, in the same order.
+            . Bookings overlapping an existing Booking or a previous Booking of the batch are rejected.
+            . Available Bookings are priced like single Bookings.
+        """
+        property_standard.save()
+        pricing_rule_1.save()
+        self.client.post(self.booking_endpoint, {"rental_property": 1, "date_start": "01-01-2022",
+                                                 "date_end": "01-10-2022"})
+
+        response = self.client.post(f'{self.booking_endpoint}bulk/', [
+            {"rental_property": 1, "date_start": "02-01-2022", "date_end": "02-10-2022"},
+            {"rental_property": 1, "date_start": "01-10-2022", "date_end": "01-12-2022"},
+            {"rental_property": 1, "date_start": "02-05-2022", "date_end": "02-06-2022"},
+            {"rental_property": 2, "date_start": "02-05-2022", "date_end": "02-06-2022"},
+            {"rental_property": 1, "date_start": "not a date"},
+        ], format='json')
+
+        results = json.loads(response.content)['results']
+        assert [result['status'] for result in results] == [201, 409, 409, 400, 400]
+        assert results[0]['booking']['final_price'] == 90
+        assert Booking.objects.count() == 2
+
+    @pytest.mark.django_db
+    def test_list_pagination(self, property_standard: Fixture[RentalProperty]):
+        """
+        # Test:
+            . Bookings are listed by date_start, page by page, following the next cursor.
+            . Filters are kept across pages.
+        """
+        property_standard.save()
+        for day in (20, 5, 12, 5):
+            Booking.objects.create(rental_property=property_standard, date_start=date(2022, 1, day),
+                                   date_end=date(2022, 1, day), final_price=10)
+
+        response = self.client.get(self.booking_endpoint, {"rental_property": 1, "page_size": 3})
+        page = json.loads(response.content)
+        assert [booking['date_start'] for booking in page['results']] == ['05-01-2022', '05-01-2022', '12-01-2022']
+
+        page = json.loads(self.client.get(page['next']).content)
+        assert [booking['date_start'] for booking in page['results']] == ['20-01-2022']
+        assert page['next'] is None
+
+    @pytest.mark.django_db
+    def test_list_pagination_ties(self, property_standard: Fixture[RentalProperty]):
+        """
+        # Test:
+            . Bookings sharing a date_start are all listed once, in id order, beyond DRF's offset_cutoff.
+            . The previous cursor walks the same pages back.
+        """
+        property_standard.save()
+        Booking.objects.bulk_create([Booking(rental_property=property_standard, date_start=date(2022, 1, 5),
+                                             date_end=date(2022, 1, 5), final_price=10) for _ in range(1300)])
+
+        page = json.loads(self.client.get(self.booking_endpoint, {"page_size": 100}).content)
+        ids, pages = [booking['id'] for booking in page['results']], [page]
+        while page['next']:
+            page = json.loads(self.client.get(page['next']).content)
+            ids += [booking['id'] for booking in page['results']]
+            pages.append(page)
+        assert ids == sorted(Booking.objects.values_list('id', flat=True))
+        assert len(pages) == 13
+
+        previous = json.loads(self.client.get(pages[-1]['previous']).content)
+        assert previous['results'] == pages[-2]['results']
+        assert self.client.get(self.booking_endpoint, {"cursor": "cD1ub3BlLDE="}).status_code == 404
+
+    @pytest.mark.django_db
+    def test_list_sparse_fields(self, property_standard: Fixture[RentalProperty]):
+        """
+        # Test:
+            . ?fields= lists only the requested fields, the pagination keeps working without its ordering fields.
+            . Unknown fields are rejected.
+        """
+        property_standard.save()
+        for day in (20, 5):
+            Booking.objects.create(rental_property=property_standard, date_start=date(2022, 1, day),
+                                   date_end=date(2022, 1, day), final_price=10)
+
+        page = json.loads(self.client.get(self.booking_endpoint, {"fields": "final_price,date_end",
+                                                                  "page_size": 1}).content)
+        assert page['results'] == [{"final_price": 10.0, "date_end": "05-01-2022"}]
+        page = json.loads(self.client.get(page['next']).content)
+        assert page['results'] == [{"final_price": 10.0, "date_end": "20-01-2022"}]
+
+        response = self.client.get(self.booking_endpoint, {"fields": "final_price,guest"})
+        assert response.status_code == 400
+
+    @pytest.mark.django_db
+    def test_export(self, property_standard: Fixture[RentalProperty]):
+        """
+        # Test:
+            . Bookings are streamed in id order, with the filters of the Booking list.
+            . CSV starts with a header, JSON Lines has one object per Booking.
+        """
+        property_standard.save()
+        RentalProperty.objects.create(id=2, name='Other', base_price=10)
+        for rental_property_id, day in ((1, 5), (2, 6), (1, 7)):
+            Booking.objects.create(rental_property_id=rental_property_id, date_start=date(2022, 1, day),
+                                   date_end=date(2022, 1, day), final_price=10)
+
+        response = self.client.get(f'{self.booking_endpoint}export/csv', {"rental_property": 1})
+        assert response.streaming
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert lines[0] == 'id,rental_property,date_start,date_end,final_price'
+        assert [line.split(',')[2] for line in lines[1:]] == ['05-01-2022', '07-01-2022']
+
+        response = self.client.get(f'{self.booking_endpoint}export/jsonl')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        assert [row['rental_property'] for row in rows] == [1, 2, 1]
+
+        assert self.client.get(f'{self.booking_endpoint}export/xml').status_code == 404
+
+    @pytest.mark.django_db(databases='__all__')
+    def test_update(self, property_standard: Fixture[RentalProperty]):
+        """
+        # Test:
+            . A Booking can be moved to free days, not onto another Booking nor with date_end before date_start.
+        """
+        property_standard.save()
+        first, second = Booking.objects.bulk_create([
+            Booking(rental_property=property_standard, date_start=date(2022, 1, 1), date_end=date(2022, 1, 5)),
+            Booking(rental_property=property_standard, date_start=date(2022, 1, 10), date_end=date(2022, 1, 12)),
+        ])
+        url = f'{self.booking_endpoint}{second.id}'
+
+        response = self.client.patch(url, {"date_start": "06-01-2022"}, format='json')
+        assert response.status_code == 200
+        response = self.client.patch(url, {"date_start": "05-01-2022"}, format='json')
+        assert response.status_code == 409
+        response = self.client.put(url, {"rental_property": 1, "date_start": "20-01-2022", "date_end": "15-01-2022"},
+                                   format='json')
+        assert response.status_code == 400
+        second.refresh_from_db()
+        assert (second.date_start, second.date_end) == (date(2022, 1, 6), date(2022, 1, 12))
+
+    @pytest.mark.django_db
+    def test_reprice(self, property_standard: Fixture[RentalProperty], pricing_rule_1: Fixture[PricingRule]):
+        """
+        # Test:
+            . Bookings starting from date_start get the price of the current rules, a dry run only reports it.
+        """
+        property_standard.save()
+        booking = Booking.objects.create(rental_property=property_standard, date_start=date(2022, 1, 1),
+                                         date_end=date(2022, 1, 10), final_price=100)
+        pricing_rule_1.save()
+        data = {"rental_property": 1, "date_start": "12-01-2021", "dry_run": True}
+
+        report = json.loads(self.client.post(f'{self.booking_endpoint}reprice/', data, format='json').content)
+        assert (report['checked'], report['changed'], report['final_total']) == (1, 1, 90)
+        assert report['changes'] == [{"booking": booking.id, "rental_property": 1, "date_start": "01-01-2022",
+                                      "date_end": "10-01-2022", "previous_price": 100, "final_price": 90}]
+        booking.refresh_from_db()
+        assert booking.final_price == 100
+
+        data['dry_run'] = False
+        self.client.post(f'{self.booking_endpoint}reprice/', data, format='json')
+        booking.refresh_from_db()
+        assert booking.final_price == 90
+
+        response = self.client.post(f'{self.booking_endpoint}reprice/', {"rental_property": "x"}, format='json')
+        assert response.status_code == 400
+        response = self.client.post(f'{self.booking_endpoint}reprice/', {"date_start": "12-01-2021"}, format='json')
+        assert response.status_code == 400
+        response = self.client.post(f'{self.booking_endpoint}reprice/', {"rental_property": list(range(1, 22))},
+                                    format='json')
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestCalendarEndpoints:
+    client = APIClient()
+
+    def test_calendar(self, property_standard: Fixture[RentalProperty]):
+        """
+        # Test:
+            . The calendar covers the whole window with free and busy spans.
+        """
+        property_standard.save()
+        self.client.post('/api/booking/', {"rental_property": 1, "date_start": "01-05-2022", "date_end": "01-10-2022"})
+
+        response = self.client.get('/api/property/1/calendar', {"date_start": "01-01-2022", "date_end": "01-31-2022"})
+
+        assert response.status_code == 200
+        assert json.loads(response.content) == {
+            "rental_property": 1, "date_start": "01-01-2022", "date_end": "31-01-2022",
+            "spans": [
+                {"date_start": "01-01-2022", "date_end": "04-01-2022", "days": 4, "status": "free"},
+                {"date_start": "05-01-2022", "date_end": "10-01-2022", "days": 6, "status": "busy"},
+                {"date_start": "11-01-2022", "date_end": "31-01-2022", "days": 21, "status": "free"},
+            ]
+        }
+
+    def test_unknown_property(self):
+        response = self.client.get('/api/property/1/calendar')
+        assert response.status_code == 404
+
+    def test_availability(self, property_standard: Fixture[RentalProperty], pricing_rule_1: Fixture[PricingRule],
+                          django_assert_num_queries):
+        """
+        # Test:
+            . The probe is answered from the occupancy bitmaps, with a single existence query for the Property
+              once they are cached, and an unknown Property is a 404.
+        """
+        property_standard.save()
+        pricing_rule_1.save()
+        self.client.post('/api/booking/', {"rental_property": 1, "date_start": "01-05-2022", "date_end": "01-10-2022"})
+
+        response = self.client.get('/api/property/1/availability', {"date_start": "01-10-2022",
+                                                                    "date_end": "01-12-2022"})
+        assert json.loads(response.content)['available'] is False
+
+        with django_assert_num_queries(1):
+            response = self.client.get('/api/property/1/availability', {"date_start": "01-11-2022",
+                                                                        "date_end": "01-12-2022"})
+        assert json.loads(response.content)['available'] is True
+        response = self.client.get('/api/property/2/availability', {"date_start": "01-11-2022",
+                                                                    "date_end": "01-12-2022"})
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestPropertySearchEndpoints:
+    search_endpoint = '/api/property/search/'
+    client = APIClient()
+
+    def test_search(self, property_standard: Fixture[RentalProperty], pricing_rule_1: Fixture[PricingRule],
+                    django_assert_max_num_queries):
+        """
+        # Test:
+            . Booked Properties are skipped, the page is taken by base_price before pricing it.
+            . The Properties of the page are priced with their PricingRules, cheapest first, and the ones above
+              max_price are dropped.
+            . The number of queries does not depend on the number of Properties.
+            . The stay length is bounded.
+        """
+        property_standard.save()
+        pricing_rule_1.save()
+        RentalProperty.objects.create(id=2, name='Booked', base_price=5)
+        RentalProperty.objects.create(id=3, name='Cheap', base_price=8)
+        RentalProperty.objects.create(id=4, name='Expensive', base_price=50)
+        self.client.post('/api/booking/', {"rental_property": 2, "date_start": "01-05-2022", "date_end": "01-05-2022"})
+
+        with django_assert_max_num_queries(4):
+            response = self.client.get(self.search_endpoint, {"date_start": "01-01-2022", "date_end": "01-10-2022",
+                                                              "max_price": 100})
+
+        response_content = json.loads(response.content)
+        assert response_content['count'] == 3
+        assert response_content['results'] == [
+            {"rental_property": 3, "name": "Cheap", "base_price": 8.0, "final_price": 80.0},
+            {"rental_property": 1, "name": "Standard", "base_price": 10.0, "final_price": 90.0},
+        ]
+        response = self.client.get(self.search_endpoint, {"date_start": "01-01-2022", "date_end": "01-10-2022",
+                                                          "page_size": 1, "page": 3})
+        assert json.loads(response.content)['results'] == [
+            {"rental_property": 4, "name": "Expensive", "base_price": 50.0, "final_price": 500.0}]
+        response = self.client.get(self.search_endpoint, {"date_start": "01-01-2022", "date_end": "01-01-2023"})
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestPropertyStatsEndpoints:
+    property_endpoint = '/api/property/'
+    client = APIClient()
+
+    def test_stats(self, property_standard: Fixture[RentalProperty], django_assert_num_queries):
+        """
+        # Test:
+            . Every Property of the page has the count, revenue and nights of its Bookings overlapping the window,
+              with the nights clipped to the window.
+            . The page and its stats are read with one query.
+            . Without stats the Properties are listed as usual.
+        """
+        property_standard.save()
+        RentalProperty.objects.create(id=2, name='Empty', base_price=10)
+        for date_start, date_end, final_price in ((date(2022, 1, 1), date(2022, 1, 10), 100),
+                                                  (date(2022, 1, 20), date(2022, 1, 20), 10),
+                                                  (date(2022, 3, 1), date(2022, 3, 2), 20)):
+            Booking.objects.create(rental_property=property_standard, date_start=date_start, date_end=date_end,
+                                   final_price=final_price)
+
+        with django_assert_num_queries(1):
+            response = self.client.get(self.property_endpoint, {"stats": "true", "date_start": "01-05-2022",
+                                                                "date_end": "01-31-2022",
+                                                                "fields": "id,booking_count,revenue,booked_nights"})
+
+        assert json.loads(response.content)['results'] == [
+            {"id": 1, "booking_count": 2, "revenue": 110.0, "booked_nights": 7},
+            {"id": 2, "booking_count": 0, "revenue": 0.0, "booked_nights": 0},
+        ]
+        response = self.client.get(self.property_endpoint, {"stats": "true", "name": "Standard"})
+        assert [(row['booking_count'], row['booked_nights']) for row in json.loads(response.content)['results']] \
+               == [(3, 13)]
+        assert 'revenue' not in json.loads(self.client.get(self.property_endpoint).content)['results'][0]
+        assert self.client.get(self.property_endpoint, {"stats": "true", "date_start": "nope"}).status_code == 400
+
+
+@pytest.mark.django_db
+class TestQuoteEndpoints:
+    quote_endpoint = '/api/quote/'
+    client = APIClient()
+
+    def test_quote(self, property_standard: Fixture[RentalProperty], pricing_rule_1: Fixture[PricingRule],
+                   pricing_rule_3: Fixture[PricingRule]):
+        """
+        # Test:
+            . The quote has the same price as the Booking (Case 3), and no Booking is created.
+            . The quote follows the changes of the PricingRules.
+        """
+        property_standard.save()
+        pricing_rule_1.save()
+        pricing_rule_3.save()
+        params = {"rental_property": 1, "date_start": "01-01-2022", "date_end": "01-10-2022"}
+
+        response = self.client.get(self.quote_endpoint, params)
+        assert response.status_code == 200
+        assert json.loads(response.content) == {"date_start": "01-01-2022", "date_end": "10-01-2022",
+                                                "stay_length": 10, "final_price": 101}
+        assert not Booking.objects.exists()
+
+        pricing_rule_3.fixed_price = 30
+        pricing_rule_3.save()
+        response = self.client.get(self.quote_endpoint, params)
+        assert json.loads(response.content)['final_price'] == 111
+
+        pricing_rule_1.delete()
+        response = self.client.get(self.quote_endpoint, params)
+        assert json.loads(response.content)['final_price'] == 120
+
+    def test_unknown_property(self):
+        response = self.client.get(self.quote_endpoint, {"rental_property": 1, "date_start": "01-01-2022",
+                                                         "date_end": "01-10-2022"})
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestPricingRuleImportEndpoints:
+    import_endpoint = '/api/pricing-rule/import/'
+    client = APIClient()
+
+    def test_import(self, property_standard: Fixture[RentalProperty], pricing_rule_3: Fixture[PricingRule]):
+        """
+        # Test:
+            . Days that already have a specific_day rule are skipped, repeated days of the sheet keep the last row.
+            . Imported rules are applied to the next quotes.
+        """
+        property_standard.save()
+        pricing_rule_3.save()
+        params = {"rental_property": 1, "date_start": "01-01-2022", "date_end": "01-10-2022"}
+        assert json.loads(self.client.get('/api/quote/', params).content)['final_price'] == 110
+
+        sheet = SimpleUploadedFile('rules.csv', b'rental_property,price_modifier,min_stay_length,fixed_price,'
+                                                b'specific_day\n'
+                                                b'1,,,30,04-01-2022\n'
+                                                b'1,,,50,05-01-2022\n'
+                                                b'1,,,40,05-01-2022\n'
+                                                b'1,-10,7,,\n')
+        response = self.client.post(self.import_endpoint, {"file": sheet}, format='multipart')
+
+        assert response.status_code == 201
+        assert json.loads(response.content) == {"created": 2, "updated": 0, "skipped": 1}
+        assert json.loads(self.client.get('/api/quote/', params).content)['final_price'] == 132
+
+    def test_invalid_rows(self, property_standard: Fixture[RentalProperty]):
+        property_standard.save()
+        sheet = SimpleUploadedFile('rules.jsonl', b'{"rental_property": 1, "fixed_price": 30, '
+                                                  b'"specific_day": "04-01-2022"}\n'
+                                                  b'{"rental_property": 1, "fixed_price": "cheap"}\n'
+                                                  b'{"rental_property": 2, "fixed_price": 30}\n')
+
+        response = self.client.post(self.import_endpoint, {"file": sheet}, format='multipart')
+
+        assert response.status_code == 400
+        assert len(json.loads(response.content)['errors']) == 2
+        assert not PricingRule.objects.exists()
+
+    def test_simulate(self, property_standard: Fixture[RentalProperty], pricing_rule_1: Fixture[PricingRule]):
+        """
+        # Test:
+            . Bookings are priced with the proposed rules and compared with their final_price, nothing is saved.
+            . The number of properties and the window are bounded.
+        """
+        property_standard.save()
+        pricing_rule_1.save()
+        Booking.objects.create(rental_property=property_standard, date_start=date(2022, 1, 1),
+                               date_end=date(2022, 1, 10), final_price=90)
+        data = {"date_start": "12-01-2021",
+                "properties": [{"rental_property": 1, "base_price": 12,
+                                "rules": [{"fixed_price": 30, "specific_day": "04-01-2022"}]}]}
+
+        response = self.client.post('/api/pricing-rule/simulate/', data, format='json')
+
+        report = json.loads(response.content)
+        assert (report['bookings'], report['simulated_revenue'], report['difference']) == (1, 138, 48)
+        assert report['properties'][0]['difference'] == 48
+        assert PricingRule.objects.count() == 1
+        response = self.client.post('/api/pricing-rule/simulate/', {"properties": []}, format='json')
+        assert response.status_code == 400
+        data = {"date_start": "01-01-2020", "date_end": "01-01-2023", "properties": [{"rental_property": 1}]}
+        response = self.client.post('/api/pricing-rule/simulate/', data, format='json')
+        assert response.status_code == 400
+        data = {"properties": [{"rental_property": 1}] * 21}
+        response = self.client.post('/api/pricing-rule/simulate/', data, format='json')
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestQuoteSearchEndpoints:
+    quote_search_endpoint = '/api/quote-search/'
+    client = APIClient()
+
+    def test_cheapest_stays(self, property_standard: Fixture[RentalProperty], pricing_rule_1: Fixture[PricingRule],
+                            pricing_rule_3: Fixture[PricingRule]):
+        """
+        # Test:
+            . The cheapest available stays of the window are returned first.
+            . Stays overlapping a Booking are skipped.
+        """
+        property_standard.save()
+        pricing_rule_1.save()
+        pricing_rule_3.save()
+        self.client.post('/api/booking/', {"rental_property": 1, "date_start": "01-08-2022", "date_end": "01-08-2022"})
+
+        response = self.client.get(self.quote_search_endpoint, {"rental_property": 1, "date_start": "01-01-2022",
+                                                                "date_end": "01-10-2022", "stay_length": 7})
+
+        assert response.status_code == 200
+        assert json.loads(response.content) == [
+            {"date_start": "01-01-2022", "date_end": "07-01-2022", "stay_length": 7, "final_price": 74.0},
+        ]
+
+    def test_missing_parameters(self, property_standard: Fixture[RentalProperty]):
+        property_standard.save()
+
+        response = self.client.get(self.quote_search_endpoint, {"rental_property": 1})
+
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestAsyncEndpoints:
+    async_endpoint = '/api/async/'
+    client = APIClient()
+
+    def test_read_endpoints(self, property_standard: Fixture[RentalProperty], pricing_rule_1: Fixture[PricingRule],
+                            pricing_rule_3: Fixture[PricingRule]):
+        """
+        # Test:
+            . The async endpoints answer like the synchronous ones.
+            . Lists are paged by id, following the next url.
+        """
+        property_standard.save()
+        pricing_rule_1.save()
+        pricing_rule_3.save()
+        self.client.post('/api/booking/', {"rental_property": 1, "date_start": "01-01-2022", "date_end": "01-10-2022"})
+        stay = {"date_start": "01-10-2022", "date_end": "01-12-2022"}
+
+        response = self.client.get(f'{self.async_endpoint}quote/', {"rental_property": 1, "date_start": "01-01-2022",
+                                                                    "date_end": "01-10-2022"})
+        assert json.loads(response.content)['final_price'] == 101
+
+        response = self.client.get(f'{self.async_endpoint}property/1/availability', stay)
+        assert json.loads(response.content) == json.loads(self.client.get('/api/property/1/availability',
+                                                                          stay).content)
+
+        page = json.loads(self.client.get(f'{self.async_endpoint}pricing-rule/', {"page_size": 1}).content)
+        assert page['results'][0]['id'] == pricing_rule_1.id
+        page = json.loads(self.client.get(page['next']).content)
+        assert page['results'][0]['id'] == pricing_rule_3.id
+
+        response = self.client.get(f'{self.async_endpoint}booking/', {"rental_property": 1})
+        assert [booking['final_price'] for booking in json.loads(response.content)['results']] == [101]
+        assert self.client.get(f'{self.async_endpoint}booking/', {"rental_property": 2}).status_code == 400
+        assert self.client.get(f'{self.async_endpoint}property/2').status_code == 404
+
+
+@pytest.mark.django_db
+class TestConditionalGetEndpoints:
+    client = APIClient()
+
+    def test_property_detail(self, property_standard: Fixture[RentalProperty], pricing_rule_1: Fixture[PricingRule]):
+        """
+        # Test:
+            . The current ETag is answered with a 304 and no body, Last-Modified is sent along with it.
+            . If-Modified-Since alone is answered in full, Last-Modified cannot tell changes within a second apart.
+            . Saving a PricingRule of the property changes its ETag.
+            . Another negotiated representation (indented JSON) has another ETag, and the response varies on Accept.
+        """
+        property_standard.save()
+        response = self.client.get('/api/property/1')
+        etag = response['ETag']
+        assert response.status_code == 200
+        assert 'Last-Modified' in response
+        assert 'Accept' in response['Vary']
+
+        response = self.client.get('/api/property/1', HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT='application/json; indent=4')
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+        response = self.client.get('/api/property/1', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response.content == b''
+        assert 'Last-Modified' in response
+        response = self.client.get('/api/property/1', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert response.status_code == 200
+
+        pricing_rule_1.save()
+        response = self.client.get('/api/property/1', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+        assert self.client.get('/api/property/2').status_code == 404
+
+    def test_lists(self, property_standard: Fixture[RentalProperty], pricing_rule_1: Fixture[PricingRule]):
+        """
+        # Test:
+            . The lists answer 304 until a property or a rule changes.
+            . The ETag depends on the query string.
+        """
+        property_standard.save()
+        pricing_rule_1.save()
+        etags = {endpoint: self.client.get(endpoint)['ETag'] for endpoint in ('/api/property/', '/api/pricing-rule/')}
+        for endpoint, etag in etags.items():
+            assert self.client.get(endpoint, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        assert self.client.get('/api/property/', {"name": "nope"}, HTTP_IF_NONE_MATCH=etags['/api/property/']) \
+                   .status_code == 200
+
+        pricing_rule_1.delete()
+        for endpoint, etag in etags.items():
+            assert self.client.get(endpoint, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+        etag = self.client.get('/api/property/')['ETag']
+        RentalProperty.objects.create(id=2, name='Another', base_price=10)
+        assert self.client.get('/api/property/', HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+    client = APIClient()
+
+    def test_metrics(self, property_standard: Fixture[RentalProperty]):
+        """
+        # Test:
+            . Requests are measured per route, with their number of queries, and the booking stages are timed.
+            . Async routes are measured too.
+        """
+        property_standard.save()
+        self.client.post('/api/booking/', {"rental_property": 1, "date_start": "01-01-2022", "date_end": "01-10-2022"})
+        self.client.get('/api/async/booking/', {"rental_property": 1})
+
+        response = self.client.get('/metrics')
+
+        assert response.status_code == 200
+        metrics = response.content.decode()
+        for stage in ('booking.validation', 'booking.lock', 'booking.availability', 'booking.rules',
+                      'pricing.rule_selection', 'booking.save'):
+            assert f'stage_duration_seconds_count{{stage="{stage}"}}' in metrics
+        assert 'http_request_duration_seconds_bucket{route="api/booking/",method="POST",status="201",le="+Inf"}' \
+               in metrics
+        assert 'http_request_db_queries_count{route="api/async/booking/",method="GET"}' in metrics
+        assert 'http_request_db_queries_bucket{route="api/async/booking/",method="GET",le="0"} 0' in metrics
+
+    def test_metrics_asgi(self, property_standard: Fixture[RentalProperty]):
+        """
+        # Test:
+            . Under ASGI the views run their queries on the connections of other threads, they are still counted.
+        """
+        for histogram in REGISTRY:
+            histogram.clear()
+        property_standard.save()
+        client = AsyncClient()
+        for path in ('/api/property/1', '/api/async/property/1'):
+            response = async_to_sync(client.get)(path)
+            assert response.status_code == 200
+
+        metrics = self.client.get('/metrics').content.decode()
+        for route in ('api/property/<int:pk>', 'api/async/property/<int:pk>'):
+            assert f'http_request_db_queries_bucket{{route="{route}",method="GET",le="0"}} 0' in metrics
+            assert f'http_request_db_queries_count{{route="{route}",method="GET"}} 1' in metrics
@@ -0,0 +1,109 @@
+from datetime import date
+from typing import Union
+
+import pytest
+
+from core.booking_helpers.availability import BUSY, FREE, check_availability, get_availability_calendar
+from core.booking_helpers.occupancy import OccupancyCache, get_occupied_days_mask, occupancy_cache
+from core.models import Booking, RentalProperty
+
+Fixture = Union
+
+
+@pytest.mark.django_db
+class TestCheckAvailability:
+
+    @pytest.fixture
+    def booked_property(self, property_standard: Fixture[RentalProperty]) -> RentalProperty:
+        property_standard.save()
+        Booking.objects.create(rental_property=property_standard, date_start=date(2022, 1, 5),
+                               date_end=date(2022, 1, 10), final_price=60)
+        return property_standard
+
+    @pytest.mark.parametrize('date_start, date_end, expected', [
+        ('01-01-2022', '01-04-2022', True),
+        ('01-11-2022', '01-15-2022', True),
+        ('01-01-2022', '01-05-2022', False),
+        ('01-10-2022', '01-12-2022', False),
+        ('01-06-2022', '01-07-2022', False),
+        ('01-01-2022', '01-20-2022', False),
+    ])
+    def test_overlaps(self, booked_property: Fixture[RentalProperty], date_start: str, date_end: str,
+                      expected: bool):
+        """
+        . Both ends of a Booking are taken, so touching its first or last day is an overlap.
+        """
+        request_data = {"rental_property": booked_property.id, "date_start": date_start, "date_end": date_end}
+        assert check_availability(request_data=request_data) is expected
+
+    def test_other_property_is_available(self, booked_property: Fixture[RentalProperty]):
+        other_property = RentalProperty.objects.create(name='Other', base_price=10)
+
+        request_data = {"rental_property": other_property.id, "date_start": "01-05-2022", "date_end": "01-10-2022"}
+        assert check_availability(request_data=request_data) is True
+
+
+@pytest.mark.django_db
+class TestAvailabilityCalendar:
+
+    def test_spans(self, property_standard: Fixture[RentalProperty]):
+        """
+        . Consecutive and overlapping Bookings are merged into one busy span.
+        . Bookings are clipped to the window, and the gaps are free spans.
+        """
+        property_standard.save()
+        for date_start, date_end in [(date(2021, 12, 28), date(2022, 1, 2)), (date(2022, 1, 3), date(2022, 1, 4)),
+                                     (date(2022, 1, 10), date(2022, 1, 12)), (date(2022, 1, 30), date(2022, 2, 5))]:
+            Booking.objects.create(rental_property=property_standard, date_start=date_start, date_end=date_end)
+
+        spans = get_availability_calendar(rental_property_id=property_standard.id, window_start=date(2022, 1, 1),
+                                          window_end=date(2022, 1, 31))
+
+        assert [(span.date_start.day, span.date_end.day, span.status) for span in spans] == [
+            (1, 4, BUSY), (5, 9, FREE), (10, 12, BUSY), (13, 29, FREE), (30, 31, BUSY),
+        ]
+        assert sum(span.days for span in spans) == 31
+
+
+@pytest.mark.django_db
+class TestOccupancyBitmaps:
+
+    def test_bitmaps_follow_bookings(self, property_standard: Fixture[RentalProperty],
+                                     django_capture_on_commit_callbacks, django_assert_num_queries):
+        """
+        . Bitmaps are built once per property and year, and kept up to date when Bookings change.
+        . Stays across years check the bitmap of each year.
+        """
+        property_standard.save()
+        request_data = {"rental_property": property_standard.id, "date_start": "12-30-2021", "date_end": "01-02-2022"}
+
+        assert check_availability(request_data=request_data) is True
+        with django_assert_num_queries(0):
+            assert check_availability(request_data=request_data) is True
+
+        with django_capture_on_commit_callbacks(execute=True):
+            booking = Booking.objects.create(rental_property=property_standard, date_start=date(2022, 1, 2),
+                                             date_end=date(2022, 1, 3))
+        with django_assert_num_queries(0):
+            assert check_availability(request_data=request_data) is False
+            assert get_occupied_days_mask(rental_property_id=property_standard.id, check_in=date(2021, 12, 31),
+                                          check_out=date(2022, 1, 4)) == 0b01100
+
+        with django_capture_on_commit_callbacks(execute=True):
+            booking.delete()
+        assert check_availability(request_data=request_data) is True
+        assert occupancy_cache.stats()['entries'] == 2
+
+    def test_lru_eviction(self):
+        """
+        . The least recently used bitmaps are evicted when the cache goes over its memory budget.
+        """
+        cache = OccupancyCache(max_bytes=1000, timeout=60)
+        for year in range(2000, 2010):
+            cache.set((1, year), (1 << 365) - 1)
+            cache.get((1, 2000))
+
+        assert cache.size_bytes <= 1000
+        assert cache.get((1, 2000)) is not None
+        assert cache.get((1, 2001)) is None
+        assert cache.evictions == 10 - len(cache)
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.db_router import PRIMARY_COOKIE, PrimaryReplicaRouter, primary_pinning_middleware, use_primary
+from core.models import Booking
+
+
+class TestPrimaryReplicaRouter:
+    router = PrimaryReplicaRouter()
+
+    def test_routing(self, settings):
+        """
+        . Reads go to the replica, unless they are pinned to the primary. Writes and migrations go to the primary.
+        . Without a replica everything goes to the primary.
+        """
+        settings.REPLICA_DATABASE = 'replica'
+        assert self.router.db_for_read(Booking) == 'replica'
+        with use_primary():
+            assert self.router.db_for_read(Booking) == 'default'
+        assert self.router.db_for_write(Booking) == 'default'
+        assert self.router.allow_migrate('replica', 'core') is False
+
+        settings.REPLICA_DATABASE = ''
+        assert self.router.db_for_read(Booking) == 'default'
+
+    def test_read_your_writes(self, settings):
+        """
+        . Writes are served from the primary and pin the client to it, its next reads skip the replica.
+        """
+        settings.REPLICA_DATABASE = 'replica'
+        routed = list()
+        middleware = primary_pinning_middleware(
+            lambda request: routed.append(self.router.db_for_read(Booking)) or HttpResponse())
+        factory = RequestFactory()
+
+        assert PRIMARY_COOKIE not in middleware(factory.get('/api/booking/')).cookies
+        response = middleware(factory.post('/api/booking/'))
+        assert response.cookies[PRIMARY_COOKIE]['max-age'] == settings.REPLICA_PIN_SECONDS
+        middleware(factory.get('/api/booking/', HTTP_COOKIE=f'{PRIMARY_COOKIE}=1'))
+
+        assert routed == ['replica', 'default', 'default']
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+@pytest.mark.skipif('replica' not in connections, reason='Needs a replica alias, as in settings.local.')
+class TestReplicaReads:
+
+    def test_lists_read_from_replica(self):
+        """
+        . A client that just wrote reads from the primary, other clients from the replica.
+        """
+        writer, reader = APIClient(), APIClient()
+        writer.post('/api/property/', {"name": "Standard", "base_price": 10})
+
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            assert len(json.loads(writer.get('/api/property/').content)['results']) == 1
+        assert not replica_queries
+
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            assert len(json.loads(reader.get('/api/property/').content)['results']) == 1
+        assert replica_queries
@@ -0,0 +1,55 @@
+from datetime import date
+from typing import Union
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from core.fast_serialization import RowFormatter, compile_date_format
+from core.models import Booking, PricingRule, RentalProperty
+from core.renderers import FastJSONRenderer
+from core.serializer import BookingSerializer, PricingRuleSerializer, PropertySerializer
+
+Fixture = Union
+
+
+@pytest.mark.django_db
+class TestFastSerialization:
+
+    @pytest.mark.parametrize('date_format', ('%d-%m-%Y', '%Y/%m/%d %%', 'iso-8601', '%b %d'))
+    def test_compiled_date_format(self, date_format: str):
+        for day in (date(2022, 1, 5), date(999, 12, 31)):
+            expected = day.isoformat() if date_format == 'iso-8601' else day.strftime(date_format)
+            assert compile_date_format(date_format=date_format)(day) == expected
+
+    def test_rows_match_serializers(self, property_standard: Fixture[RentalProperty],
+                                    pricing_rule_1: Fixture[PricingRule], pricing_rule_3: Fixture[PricingRule]):
+        """
+        . Rows are formatted exactly like the ModelSerializers format the instances, null values included.
+        """
+        property_standard.save()
+        pricing_rule_1.save()
+        pricing_rule_3.save()
+        Booking.objects.create(rental_property=property_standard, date_start=date(2022, 1, 5),
+                               date_end=date(2022, 1, 7), final_price=30)
+
+        for model, serializer_class in ((RentalProperty, PropertySerializer), (PricingRule, PricingRuleSerializer),
+                                        (Booking, BookingSerializer)):
+            fields = tuple(serializer_class().fields)
+            formatter = RowFormatter(serializer_class=serializer_class, fields=fields, ordering=('id',))
+            queryset = model.objects.order_by('id')
+            assert (formatter.format_rows(rows=queryset.values_list(*formatter.columns, named=True))
+                    == serializer_class(queryset, many=True).data)
+
+    @pytest.mark.parametrize('with_orjson', (True, False))
+    def test_renderer_matches_json_renderer(self, with_orjson: bool, monkeypatch):
+        """
+        . The output is the same as JSONRenderer's with orjson and without it (the fallback of environments
+          installed without it), dates included.
+        """
+        if with_orjson:
+            pytest.importorskip('orjson')
+        else:
+            monkeypatch.setattr('core.renderers.orjson', None)
+        data = {"results": [{"name": "Casa \u2028 \u00f1", "price": 10.5, "day": None, "date": date(2022, 1, 5)}],
+                1: [True]}
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
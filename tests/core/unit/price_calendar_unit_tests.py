@@ -0,0 +1,131 @@
+from datetime import timedelta
+from typing import Union
+
+import pytest
+from django.utils import timezone
+
+from core.booking_helpers.dates import date_range
+from core.booking_helpers.price_calendar import extend_price_points, get_materialized_price, price_stays
+from core.booking_helpers.pricing_rules import calculate_final_price
+from core.booking_helpers.rule_index import PricingRuleIndex
+from core.models import PricePoint, PricingRule, RentalProperty
+
+Fixture = Union
+
+
+def get_prices(rental_property_id: int) -> dict:
+    return dict(PricePoint.objects.filter(rental_property=rental_property_id).values_list('day', 'price'))
+
+
+@pytest.mark.django_db
+class TestPriceCalendar:
+
+    def test_materialized_price_matches_rules(self, property_standard: Fixture[RentalProperty], settings):
+        """
+        . Stays inside the horizon are priced from the PricePoints like calculate_final_price prices them,
+          including a min_stay_length rule that also overrides a specific_day.
+        . Stays reaching past the horizon are not materialized.
+        """
+        settings.PRICE_CALENDAR_DAYS = 30
+        today = timezone.localdate()
+        property_standard.save()
+        PricingRule.objects.create(rental_property=property_standard, specific_day=today + timedelta(days=2),
+                                   fixed_price=25)
+        PricingRule.objects.create(rental_property=property_standard, specific_day=today + timedelta(days=3),
+                                   price_modifier=50)
+        PricingRule.objects.create(rental_property=property_standard, min_stay_length=7, price_modifier=-10)
+        PricingRule.objects.create(rental_property=property_standard, min_stay_length=10, price_modifier=-30,
+                                   specific_day=today + timedelta(days=4))
+        rule_index = PricingRuleIndex.for_property(rental_property_id=1)
+        extend_price_points(rental_property_id=1)
+
+        assert len(get_prices(rental_property_id=1)) == 30
+        for stay_length in (1, 3, 7, 10, 20):
+            days_list = date_range(date_start=today + timedelta(days=1),
+                                   date_end=today + timedelta(days=stay_length))
+            assert get_materialized_price(rental_property_id=1, days_list=days_list, base_price=10,
+                                          rule_index=rule_index) == pytest.approx(
+                calculate_final_price(days_list=days_list, base_price=10, pricing_rules=rule_index))
+
+        days_list = date_range(date_start=today + timedelta(days=25), date_end=today + timedelta(days=35))
+        assert get_materialized_price(rental_property_id=1, days_list=days_list, base_price=10,
+                                      rule_index=rule_index) is None
+
+    def test_price_stays(self, property_standard: Fixture[RentalProperty], settings, django_assert_num_queries):
+        """
+        . The same stay in several properties is priced like calculate_final_price prices it, with one aggregate
+          for the materialized ones, including one whose min_stay_length rule overrides a specific_day.
+        """
+        settings.PRICE_CALENDAR_DAYS = 30
+        today = timezone.localdate()
+        property_standard.save()
+        RentalProperty.objects.create(id=2, name='Overridden', base_price=20)
+        RentalProperty.objects.create(id=3, name='Not materialized', base_price=30)
+        PricingRule.objects.create(rental_property=property_standard, specific_day=today + timedelta(days=2),
+                                   fixed_price=25)
+        PricingRule.objects.create(rental_property=property_standard, min_stay_length=3, price_modifier=-10)
+        PricingRule.objects.create(rental_property_id=2, min_stay_length=3, price_modifier=-30,
+                                   specific_day=today + timedelta(days=2))
+        for rental_property_id in (1, 2):
+            extend_price_points(rental_property_id=rental_property_id)
+        base_prices = {1: 10, 2: 20, 3: 30}
+        rule_indexes = PricingRuleIndex.for_properties(rental_property_ids=base_prices)
+        days_list = date_range(date_start=today + timedelta(days=1), date_end=today + timedelta(days=5))
+
+        with django_assert_num_queries(3):
+            final_prices = price_stays(days_list=days_list, base_prices=base_prices, rule_indexes=rule_indexes)
+
+        assert final_prices == {rental_property_id: pytest.approx(calculate_final_price(
+            days_list=days_list, base_price=base_price, pricing_rules=rule_indexes[rental_property_id]))
+            for rental_property_id, base_price in base_prices.items()}
+
+    def test_incremental_refresh(self, property_standard: Fixture[RentalProperty], settings,
+                                 django_assert_num_queries):
+        """
+        . A specific_day rule reprices only its night, and the night is back to the base_price once it is deleted.
+        . Moving a rule to another day reprices both nights.
+        . A new base_price drops every night until the job materializes them again, renaming the property
+          reprices none, and neither reads the property row again.
+        """
+        settings.PRICE_CALENDAR_DAYS = 30
+        day = timezone.localdate() + timedelta(days=5)
+        property_standard.save()
+        extend_price_points(rental_property_id=1)
+        rule = PricingRule.objects.create(rental_property=property_standard, specific_day=day, fixed_price=25)
+        prices = get_prices(rental_property_id=1)
+        assert prices[day] == 25
+        assert set(prices.values()) == {10, 25}
+
+        rule.specific_day = day + timedelta(days=1)
+        rule.save()
+        prices = get_prices(rental_property_id=1)
+        assert (prices[day], prices[day + timedelta(days=1)]) == (10, 25)
+
+        rule.delete()
+        assert set(get_prices(rental_property_id=1).values()) == {10}
+
+        property_standard.name = 'Renamed'
+        with django_assert_num_queries(1):
+            property_standard.save()
+        assert PricePoint.objects.filter(rental_property=1).count() == 30
+        property_standard.base_price = 20
+        property_standard.save()
+        assert not PricePoint.objects.filter(rental_property=1).exists()
+        extend_price_points(rental_property_id=1)
+        assert set(get_prices(rental_property_id=1).values()) == {20}
+
+    @pytest.mark.django_db(transaction=True, databases='__all__')
+    def test_property_deletion(self, property_standard: Fixture[RentalProperty], settings):
+        """
+        . Deleting a property with specific_day rules in the horizon deletes its PricePoints with it, the cascade
+          of its rules does not materialize them again.
+        """
+        settings.PRICE_CALENDAR_DAYS = 30
+        property_standard.save()
+        PricingRule.objects.create(rental_property=property_standard,
+                                   specific_day=timezone.localdate() + timedelta(days=2), fixed_price=25)
+
+        property_standard.delete()
+
+        assert not PricePoint.objects.exists()
+        assert not PricingRule.objects.exists()
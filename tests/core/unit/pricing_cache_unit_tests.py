@@ -0,0 +1,69 @@
+from typing import Union
+
+import pytest
+from django.core.cache import cache
+
+from core.booking_helpers.pricing_cache import (get_pricing_snapshot, get_pricing_version, get_snapshot_key,
+                                                get_version_key, invalidate_pricing_snapshots)
+from core.models import PricingRule, RentalProperty
+
+Fixture = Union
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    """A cache shared by every process, as the pricing snapshots need."""
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                   'LOCATION': str(tmp_path)}}
+
+
+@pytest.mark.django_db
+class TestPricingCache:
+
+    def test_versioned_snapshots(self, shared_cache, property_standard: Fixture[RentalProperty],
+                                 pricing_rule_1: Fixture[PricingRule], django_assert_num_queries,
+                                 django_capture_on_commit_callbacks):
+        """
+        . Snapshots are read from the cache until the property or its rules change.
+        . A change bumps the version of the property, the outdated snapshot is left to expire but never read.
+        """
+        property_standard.save()
+        get_pricing_snapshot(rental_property_id=1)
+        with django_assert_num_queries(0):
+            assert get_pricing_snapshot(rental_property_id=1).base_price == 10
+        version = get_pricing_version(rental_property_id=1)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            pricing_rule_1.save()
+
+        assert get_pricing_version(rental_property_id=1) != version
+        assert cache.get(get_snapshot_key(rental_property_id=1, version=version)) is not None
+        rules = get_pricing_snapshot(rental_property_id=1).rules
+        assert rules.min_stay_length_rule(total_days=7).price_modifier == -10
+
+    def test_lost_version_is_not_reused(self, shared_cache, property_standard: Fixture[RentalProperty]):
+        """
+        . Every bump, and a version evicted by the cache, gives a version the property never had.
+        """
+        property_standard.save()
+        versions = {get_pricing_version(rental_property_id=1)}
+        for _ in range(3):
+            invalidate_pricing_snapshots(rental_property_ids=[1, 2])
+            versions.add(get_pricing_version(rental_property_id=1))
+        cache.delete(get_version_key(rental_property_id=1))
+        versions.add(get_pricing_version(rental_property_id=1))
+
+        assert len(versions) == 5
+        assert cache.get(get_version_key(rental_property_id=2)) is None
+
+    def test_per_process_cache_is_not_used(self, property_standard: Fixture[RentalProperty],
+                                           django_assert_num_queries):
+        """
+        . With a per-process cache the bumps of other workers are invisible, snapshots are loaded every time.
+        """
+        property_standard.save()
+        get_pricing_snapshot(rental_property_id=1)
+        RentalProperty.objects.filter(pk=1).update(base_price=20)
+
+        with django_assert_num_queries(2):
+            assert get_pricing_snapshot(rental_property_id=1).base_price == 20
@@ -0,0 +1,127 @@
+from datetime import date
+from typing import Union
+
+import numpy as np
+import pytest
+
+from core.booking_helpers.dates import date_range
+from core.booking_helpers.pricing_rules import get_rules_to_apply, apply_rules
+from core.booking_helpers.quote_search import search_stay_quotes
+from core.booking_helpers.rule_import import UPDATE, RuleImportResult, import_pricing_rules
+from core.booking_helpers.rule_index import CompiledRule, PricingRuleIndex
+from core.models import PricingRule, RentalProperty
+
+Fixture = Union
+
+
+class TestPricingRuleIndex:
+
+    def test_special_day_rules_in_range(self, pricing_rule_3: Fixture[PricingRule],
+                                        pricing_rule_8: Fixture[PricingRule]):
+        """
+        . Only the specific_day rules between check_in and check_out are selected, sorted by date.
+        """
+        index = PricingRuleIndex.from_rules([pricing_rule_8, pricing_rule_3])
+
+        rules = index.special_day_rules(check_in=date(2022, 1, 1), check_out=date(2022, 1, 4))
+        assert [rule.fixed_price for rule in rules] == [20]
+
+        rules = index.special_day_rules(check_in=date(2022, 1, 4), check_out=date(2022, 1, 5))
+        assert [rule.fixed_price for rule in rules] == [20, 30]
+
+        assert index.special_day_rules(check_in=date(2022, 1, 6), check_out=date(2022, 2, 1)) == []
+
+    def test_latest_special_day_rule_wins(self):
+        """
+        . If multiple specific_day rules share a date, the latest one applies.
+        """
+        index = PricingRuleIndex([
+            CompiledRule(2, None, None, 30, date(2022, 1, 4)),
+            CompiledRule(1, None, None, 20, date(2022, 1, 4)),
+        ])
+        assert index.special_days[date(2022, 1, 4)].fixed_price == 30
+
+    def test_min_stay_length_tiers(self, pricing_rule_1: Fixture[PricingRule], pricing_rule_2: Fixture[PricingRule],
+                                   pricing_rule_9: Fixture[PricingRule]):
+        """
+        . The selected min_stay_length rule is the one with the biggest discount among the applying tiers.
+        """
+        index = PricingRuleIndex.from_rules([pricing_rule_2, pricing_rule_9, pricing_rule_1])
+
+        assert index.min_stay_length_rule(total_days=6) is None
+        assert index.min_stay_length_rule(total_days=7).price_modifier == -10
+        assert index.min_stay_length_rule(total_days=10).price_modifier == -20
+        assert index.min_stay_length_rule(total_days=30).price_modifier == -20
+
+    def test_get_rules_to_apply_with_index(self, pricing_rule_1: Fixture[PricingRule],
+                                           pricing_rule_3: Fixture[PricingRule]):
+        """
+        . get_rules_to_apply accepts a compiled index and gives the same price as with model instances.
+        """
+        days_list = date_range('01-01-2022', '01-10-2022')
+        index = PricingRuleIndex.from_rules([pricing_rule_1, pricing_rule_3])
+
+        from_index = get_rules_to_apply(days_list=days_list, pricing_rules=index)
+        from_models = get_rules_to_apply(days_list=days_list, pricing_rules=[pricing_rule_1, pricing_rule_3])
+
+        assert from_index == from_models
+        assert apply_rules(days_list=days_list, base_price=10, rules_to_apply=from_index) == 101
+
+
+class TestQuoteSearch:
+
+    def test_quotes_match_apply_rules(self, pricing_rule_1: Fixture[PricingRule], pricing_rule_3: Fixture[PricingRule],
+                                      pricing_rule_5: Fixture[PricingRule], pricing_rule_9: Fixture[PricingRule]):
+        """
+        . Every quote of the prefix sums search has the same price as get_rules_to_apply + apply_rules.
+        . Double condition rules are honoured.
+        """
+        pricing_rules = [pricing_rule_1, pricing_rule_3, pricing_rule_5, pricing_rule_9]
+        index = PricingRuleIndex.from_rules(pricing_rules)
+
+        quotes = search_stay_quotes(window_start=date(2021, 12, 28), window_end=date(2022, 1, 20),
+                                    stay_lengths=[1, 6, 7, 8, 10], base_price=10, rule_index=index)
+
+        assert len(quotes) == 24 + 19 + 18 + 17 + 15
+        for quote in quotes:
+            days_list = date_range(quote.date_start, quote.date_end)
+            rules_to_apply = get_rules_to_apply(days_list=days_list, pricing_rules=pricing_rules)
+            expected_price = apply_rules(days_list=days_list, base_price=10, rules_to_apply=rules_to_apply)
+            assert quote.final_price == pytest.approx(expected_price)
+
+    def test_quotes_skip_occupied_days(self, pricing_rule_3: Fixture[PricingRule]):
+        """
+        . Stays touching an occupied day are skipped, and the cheapest stays come first.
+        """
+        index = PricingRuleIndex.from_rules([pricing_rule_3])
+        occupied_days = np.array([False, False, False, False, True, False, False])
+
+        quotes = search_stay_quotes(window_start=date(2022, 1, 1), window_end=date(2022, 1, 7), stay_lengths=[2],
+                                    base_price=10, rule_index=index, occupied_days=occupied_days)
+
+        assert [(quote.date_start.day, quote.final_price) for quote in quotes] == [(1, 20), (2, 20), (6, 20),
+                                                                                   (3, 30)]
+
+
+@pytest.mark.django_db
+class TestRuleImport:
+
+    def test_update_existing_days(self, property_standard: Fixture[RentalProperty],
+                                  pricing_rule_3: Fixture[PricingRule], pricing_rule_5: Fixture[PricingRule]):
+        """
+        . With on_conflict=update the existing specific_day rule of the day is changed, no rule is added.
+        . Rules with a min_stay_length are not deduplicated on their specific_day.
+        """
+        property_standard.save()
+        pricing_rule_3.save()
+        pricing_rule_5.save()
+
+        result = import_pricing_rules(records=[
+            {"rental_property": 1, "fixed_price": 25, "specific_day": "04-01-2022"},
+            {"rental_property": 1, "fixed_price": 25, "specific_day": "05-01-2022"},
+        ], on_conflict=UPDATE)
+
+        assert result == RuleImportResult(created=1, updated=1, skipped=0)
+        assert PricingRule.objects.count() == 3
+        pricing_rule_3.refresh_from_db()
+        assert pricing_rule_3.fixed_price == 25
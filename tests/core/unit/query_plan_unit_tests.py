@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+from typing import Callable, Union
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.booking_helpers.availability import get_overlapping_bookings
+from core.booking_helpers.bookings import get_booked_days
+from core.booking_helpers.rule_index import PricingRuleIndex
+from core.models import PricingRule, RentalProperty
+
+Fixture = Union
+client = APIClient()
+
+HOT_PATHS = [
+    (lambda: PricingRuleIndex.for_property(rental_property_id=1), ('core_pricingrule_rental_property_id',)),
+    (lambda: PricingRuleIndex.for_properties(rental_property_ids=[1, 2], check_in=date(2022, 1, 1),
+                                             check_out=date(2022, 1, 31)),
+     ('pricing_rule_special_day_idx', 'pricing_rule_min_stay_idx')),
+    (lambda: get_overlapping_bookings(rental_property_id=1, check_in=date(2022, 1, 1),
+                                      check_out=date(2022, 1, 31)).exists(),
+     ('booking_no_overlap', 'booking_property_dates_idx')),
+    (lambda: get_booked_days(requested_days={1: (date(2022, 1, 1), date(2022, 1, 31))}),
+     ('booking_property_dates_idx',)),
+    (lambda: client.get('/api/property/', {"name": "Standard"}), ('property_name_idx',)),
+    (lambda: client.get('/api/booking/', {"page_size": 10}), ('booking_date_start_id_idx',)),
+    (lambda: client.get('/api/booking/', {"rental_property": 1}), ('booking_property_dates_idx',)),
+    (lambda: client.get('/api/booking/', {"date_end": "2022-01-01"}), ('booking_date_end_idx',)),
+    (lambda: client.get('/api/booking/', {"final_price": 10}), ('booking_final_price_idx',)),
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='Query plans are only checked on PostgreSQL.')
+class TestQueryPlans:
+
+    @pytest.mark.parametrize('run_queries, index_names', HOT_PATHS)
+    def test_hot_paths_use_index(self, property_standard: Fixture[RentalProperty], run_queries: Callable,
+                                 index_names: tuple[str, ...]):
+        """
+        . The queries the pricing and booking code and the list filters actually run are captured and the SELECTs
+          explained, one of them is answered by the expected index (any of index_names) and none scans a whole
+          table.
+        . Sequential scans are disabled for the test, test tables are too small for the planner to prefer an index.
+          The property gets a few years of specific_day rules, so the planner sees how selective their dates are.
+        """
+        property_standard.save()
+        PricingRule.objects.bulk_create(
+            PricingRule(rental_property=property_standard, specific_day=date(2020, 1, 1) + timedelta(days=day),
+                        fixed_price=20)
+            for day in range(2000))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_pricingrule')
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+        with CaptureQueriesContext(connection) as context:
+            run_queries()
+        plans = list()
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if not query['sql'].lstrip().upper().startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN {query["sql"]}')
+                plans.append('\n'.join(row[0] for row in cursor.fetchall()))
+
+        assert any(index_name in plan for plan in plans for index_name in index_names), plans
+        assert not any('Seq Scan' in plan for plan in plans), plans
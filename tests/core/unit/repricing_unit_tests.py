@@ -0,0 +1,98 @@
+from datetime import date
+from typing import Union
+
+import pytest
+
+from core.booking_helpers.repricing import PriceChange, reprice_bookings, write_prices
+from core.models import Booking, PricingRule, RentalProperty
+
+Fixture = Union
+
+
+@pytest.mark.django_db
+class TestRepricing:
+
+    @pytest.fixture
+    def bookings(self, property_standard: Fixture[RentalProperty], pricing_rule_1: Fixture[PricingRule]) -> list:
+        """Bookings priced before pricing_rule_1 was added, two of them starting before 2022."""
+        property_standard.save()
+        RentalProperty.objects.create(id=2, name='Other', base_price=20)
+        bookings = Booking.objects.bulk_create(
+            Booking(rental_property_id=rental_property_id, date_start=date_start, date_end=date_end,
+                    final_price=final_price)
+            for rental_property_id, date_start, date_end, final_price in (
+                (1, date(2021, 12, 1), date(2021, 12, 10), 100),
+                (1, date(2022, 1, 1), date(2022, 1, 10), 100),
+                (1, date(2022, 2, 1), date(2022, 2, 2), 20),
+                (1, date(2022, 3, 1), date(2022, 3, 7), 70),
+                (2, date(2021, 12, 1), date(2021, 12, 1), 10),
+                (2, date(2022, 1, 1), date(2022, 1, 1), 10),
+            ))
+        pricing_rule_1.save()
+        return bookings
+
+    @pytest.mark.parametrize('workers', (1, 2))
+    def test_reprice_future_bookings(self, bookings: list, workers: int):
+        """
+        . Bookings starting on or after first_day are priced with the current rules, in or out of the pool.
+        . The report holds the diff of each property and the changed Bookings.
+        """
+        report = reprice_bookings(first_day=date(2022, 1, 1), workers=workers, chunk_size=2)
+
+        assert (report.checked, report.changed, report.written, report.skipped) == (4, 3, 3, 0)
+        assert (report.previous_total, report.final_total) == (200, 193)
+        assert [(diff.rental_property, diff.checked, diff.changed) for diff in report.properties] == [(1, 3, 2),
+                                                                                                     (2, 1, 1)]
+        assert report.changes == [PriceChange(booking=bookings[1].id, rental_property=1, date_start=date(2022, 1, 1),
+                                              date_end=date(2022, 1, 10), previous_price=100, final_price=90),
+                                  PriceChange(booking=bookings[3].id, rental_property=1, date_start=date(2022, 3, 1),
+                                              date_end=date(2022, 3, 7), previous_price=70, final_price=63),
+                                  PriceChange(booking=bookings[5].id, rental_property=2, date_start=date(2022, 1, 1),
+                                              date_end=date(2022, 1, 1), previous_price=10, final_price=20)]
+        assert list(Booking.objects.order_by('id').values_list('final_price', flat=True)) == [100, 90, 20, 63, 10, 20]
+
+    def test_dry_run(self, bookings: list):
+        """
+        . A dry run only reports, and can be limited to some properties.
+        """
+        report = reprice_bookings(rental_property_ids=[1], first_day=date(2022, 1, 1), dry_run=True, workers=1)
+
+        assert (report.checked, report.changed, report.written, report.dry_run) == (3, 2, 0, True)
+        assert list(Booking.objects.order_by('id').values_list('final_price', flat=True)) == [100, 100, 20, 70, 10, 10]
+
+    def test_booking_without_price(self, bookings: list):
+        """
+        . A Booking whose final_price was cleared counts as 0 before and is priced again.
+        """
+        Booking.objects.filter(pk=bookings[2].pk).update(final_price=None)
+
+        report = reprice_bookings(rental_property_ids=[1], first_day=date(2022, 1, 1), workers=1)
+
+        assert (report.checked, report.changed, report.previous_total) == (3, 3, 170)
+        assert PriceChange(booking=bookings[2].id, rental_property=1, date_start=date(2022, 2, 1),
+                           date_end=date(2022, 2, 2), previous_price=None, final_price=20) in report.changes
+        assert Booking.objects.get(pk=bookings[2].pk).final_price == 20
+
+    def test_edited_booking_keeps_its_price(self, bookings: list):
+        """
+        . A Booking whose dates changed after it was priced is not written with the price of its old dates.
+        """
+        report = reprice_bookings(rental_property_ids=[1], first_day=date(2022, 1, 1), dry_run=True, workers=1)
+        Booking.objects.filter(pk=bookings[1].pk).update(date_end=date(2022, 1, 2))
+
+        assert write_prices(changes=report.changes) == 1
+        assert list(Booking.objects.filter(rental_property=1).order_by('id').values_list('final_price', flat=True)) \
+               == [100, 100, 20, 63]
+
+    def test_report_skipped_bookings(self, bookings: list, monkeypatch):
+        """
+        . A Booking edited while the job runs is reported as skipped, not as written.
+        """
+        def write_after_edit(changes: list[PriceChange]) -> int:
+            Booking.objects.filter(pk=bookings[1].pk).update(date_end=date(2022, 1, 2))
+            return write_prices(changes=changes)
+        monkeypatch.setattr('core.booking_helpers.repricing.write_prices', write_after_edit)
+
+        report = reprice_bookings(rental_property_ids=[1], first_day=date(2022, 1, 1), workers=1)
+
+        assert (report.changed, report.written, report.skipped) == (2, 1, 1)
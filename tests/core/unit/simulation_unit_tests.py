@@ -0,0 +1,81 @@
+from datetime import date
+from typing import Union
+
+import pytest
+
+from core.booking_helpers.exceptions import InvalidPricingProposalError
+from core.booking_helpers.simulation import simulate_pricing
+from core.models import Booking, PricingRule, RentalProperty
+
+Fixture = Union
+
+
+@pytest.mark.django_db
+class TestSimulation:
+
+    @pytest.mark.parametrize('workers', (1, 2))
+    def test_simulate_proposed_rules(self, property_standard: Fixture[RentalProperty],
+                                     pricing_rule_1: Fixture[PricingRule], workers: int):
+        """
+        . Bookings in the window are priced with the proposed rules instead of the current ones.
+        . The proposed base_price defaults to the current one, nothing is saved.
+        """
+        property_standard.save()
+        pricing_rule_1.save()
+        RentalProperty.objects.create(id=2, name='Other', base_price=20)
+        Booking.objects.bulk_create([
+            Booking(rental_property_id=1, date_start=date(2022, 1, 1), date_end=date(2022, 1, 10), final_price=90),
+            Booking(rental_property_id=1, date_start=date(2022, 2, 1), date_end=date(2022, 2, 2), final_price=20),
+            Booking(rental_property_id=1, date_start=date(2023, 1, 1), date_end=date(2023, 1, 1), final_price=10),
+            Booking(rental_property_id=2, date_start=date(2022, 1, 1), date_end=date(2022, 1, 2), final_price=40),
+        ])
+
+        report = simulate_pricing(proposals=[
+            {"rental_property": 1, "rules": [{"fixed_price": 5, "specific_day": "02-02-2022"},
+                                             {"min_stay_length": 5, "price_modifier": -50}]},
+            {"rental_property": 2, "base_price": 25},
+        ], last_day=date(2022, 12, 31), workers=workers)
+
+        assert [tuple(simulation) for simulation in report.properties] == [(1, 2, 12, 110, 65), (2, 1, 2, 40, 50)]
+        assert (report.bookings, report.difference) == (3, -35)
+        assert PricingRule.objects.count() == 1
+
+    def test_current_rules_by_default(self, property_standard: Fixture[RentalProperty],
+                                      pricing_rule_1: Fixture[PricingRule]):
+        """
+        . A proposal without rules keeps the current rules of the property, an empty list drops them.
+        """
+        property_standard.save()
+        pricing_rule_1.save()
+        Booking.objects.create(rental_property_id=1, date_start=date(2022, 1, 1), date_end=date(2022, 1, 10),
+                               final_price=90)
+
+        report = simulate_pricing(proposals=[{"rental_property": 1, "base_price": 12}], workers=1)
+        assert (report.simulated_revenue, report.difference) == pytest.approx((108, 18))
+
+        report = simulate_pricing(proposals=[{"rental_property": 1, "base_price": 12, "rules": []}], workers=1)
+        assert (report.simulated_revenue, report.difference) == pytest.approx((120, 30))
+
+    def test_booking_without_price(self, property_standard: Fixture[RentalProperty]):
+        """
+        . A Booking whose final_price was cleared counts as 0 in the current revenue.
+        """
+        property_standard.save()
+        Booking.objects.create(rental_property_id=1, date_start=date(2022, 1, 1), date_end=date(2022, 1, 2),
+                               final_price=None)
+
+        report = simulate_pricing(proposals=[{"rental_property": 1}], workers=1)
+
+        assert [tuple(simulation) for simulation in report.properties] == [(1, 1, 2, 0, 20)]
+
+    def test_invalid_proposals(self, property_standard: Fixture[RentalProperty]):
+        """
+        . Every invalid rule and unknown property is reported.
+        """
+        property_standard.save()
+        with pytest.raises(InvalidPricingProposalError) as error:
+            simulate_pricing(proposals=[{"rental_property": 1, "rules": [{"specific_day": "2022-13-01"}]},
+                                        {"rental_property": 5}, {"base_price": 10}], workers=1)
+        assert error.value.errors == ["Proposal 1, rule 1: invalid specific_day '2022-13-01'.",
+                                      'Proposal 3: rental_property is required, it and base_price must be numbers.',
+                                      'Property 5 does not exist.']